@@ -0,0 +1,137 @@
+"""
+Estimate what each gateway profile costs at startup in a big event server: the guild payload
+received for it is parsed into a connection state, then the memory kept and the time spent are
+compared.
+
+Without the members intent Discord only sends a handful of members, and presences only come
+with the presences intent.
+
+Usage: python -m benchmarks.gateway_profiles [--members 100000] [--channels 200]
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import discord
+from discord.state import ConnectionState
+
+from hacksquad_bot.main import EXTENSION_INTENTS
+from hacksquad_bot.utils.gateway import GatewayProfile
+
+GUILD_ID = 1_000_000_000_000_000
+
+
+def make_member(i: int) -> Dict[str, Any]:
+    return {
+        "user": {
+            "id": str(GUILD_ID + 1 + i),
+            "username": f"hacker{i}",
+            "discriminator": "0",
+            "global_name": f"Hacker {i}",
+            "avatar": None,
+        },
+        "nick": None,
+        "roles": [],
+        "joined_at": "2022-10-01T10:00:00.000000+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def make_guild(
+    members: int, channels: int, profile: GatewayProfile, *, joined_members: int = 50
+) -> Dict[str, Any]:
+    sent = members if profile.chunk_guilds_at_startup else min(members, joined_members)
+    return {
+        "id": str(GUILD_ID),
+        "name": "HackSquad",
+        "owner_id": str(GUILD_ID + 1),
+        "member_count": members,
+        "large": members > 250,
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0}],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "channels": [
+            {
+                "id": str(GUILD_ID + 10_000_000 + i),
+                "type": 0,
+                "name": f"channel-{i}",
+                "position": i,
+            }
+            for i in range(channels)
+        ],
+        "members": [make_member(i) for i in range(sent)],
+        "presences": (
+            [
+                {
+                    "user": {"id": str(GUILD_ID + 1 + i)},
+                    "status": "online",
+                    "client_status": {"desktop": "online"},
+                    "activities": [],
+                }
+                for i in range(sent)
+            ]
+            if profile.intents.presences
+            else []
+        ),
+        "voice_states": [],
+        "threads": [],
+    }
+
+
+def measure(profile: GatewayProfile, members: int, channels: int) -> List[str]:
+    state = ConnectionState(
+        dispatch=lambda *_: None,
+        handlers={},
+        hooks={},
+        http=None,  # type: ignore
+        **profile.client_options(),
+    )
+    data = make_guild(members, channels, profile)
+
+    started_at = time.perf_counter()
+    discord.Guild(data=data, state=state)  # type: ignore
+    elapsed = time.perf_counter() - started_at
+
+    # Traced separately, tracing slows the parsing down a lot
+    tracemalloc.start()
+    guild = discord.Guild(data=data, state=state)  # type: ignore
+    kept, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return [
+        profile.name,
+        str(profile.intents.value),
+        str(len(data["members"])),
+        str(len(guild.members)),
+        f"{kept / 2**20:.1f}",
+        f"{elapsed * 1000:.0f}",
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--channels", type=int, default=200)
+    args = parser.parse_args()
+
+    required = discord.Intents.none()
+    for intents in EXTENSION_INTENTS.values():
+        required |= intents
+
+    header = ["profile", "intents", "received", "cached", "MiB", "parse ms"]
+    rows = [
+        measure(GatewayProfile.build(name, required), args.members, args.channels)
+        for name in ("minimal", "members", "full")
+    ]
+    print(f"One guild of {args.members} members and {args.channels} channels")
+    for row in (header, *rows):
+        print(" ".join(f"{cell:>10}" for cell in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare the peak memory and the time of loading the large upstream lists (the leaderboard and
+the contributors) with the whole payload decoded at once, and decoded while it is downloaded.
+
+The upstream stand-in runs in a child process, so that only the bot's allocations are traced.
+
+Usage: python -m benchmarks.json_streaming [--teams 50000] [--contributors 50000]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+import tracemalloc
+from typing import List
+
+from benchmarks.load import _serve
+from benchmarks.mock_api import add_arguments, settings_from_arguments
+
+
+async def run() -> None:
+    # Imported once the environment points to the stand-in, since it is read at import time
+    from hacksquad_bot.cogs.hacksquad.utils import Requester
+    from hacksquad_bot.utils import fastjson
+
+    requester = Requester()
+    await requester.start()
+    # Opens the connections, so that it is not accounted to the first measure
+    await requester._fetch("leaderboard", "")
+
+    print(f"Buffered backend: {fastjson.BACKEND}, stream backend: {fastjson.STREAM_BACKEND}")
+    print(f"{'list':>18} {'path':>10} {'items':>7} {'peak MiB':>9} {'kept MiB':>9} {'ms':>7}")
+    for namespace in ("leaderboard", "contributors_mini"):
+        for streaming in (False, True):
+            fastjson.STREAMING = streaming
+            # Timed without tracing, which slows the allocations down a lot
+            started_at = time.perf_counter()
+            await requester._fetch(namespace, "")
+            elapsed = time.perf_counter() - started_at
+
+            tracemalloc.start()
+            items, _ = await requester._fetch(namespace, "")
+            kept, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{namespace:>18} {'streaming' if streaming else 'buffered':>10} "
+                f"{len(items):>7} {peak / 2**20:>9.1f} {kept / 2**20:>9.1f} {elapsed * 1000:>7.0f}"
+            )
+            del items
+    await requester.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    args = parser.parse_args()
+    settings = settings_from_arguments(args)._replace(latency=0)
+
+    urls: "multiprocessing.Queue[List[str]]" = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(settings, urls), daemon=True)
+    server.start()
+    try:
+        hacksquad, novu = urls.get(timeout=600)
+        os.environ["HACKSQUAD_URL"] = hacksquad
+        os.environ["NOVU_CONTRIBUTORS_URL"] = novu
+        os.environ.setdefault("CACHE_SNAPSHOT_INTERVAL", "0")
+        asyncio.run(run())
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
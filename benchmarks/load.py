@@ -0,0 +1,253 @@
+"""
+Load-test the `HackSquad` cog against a local stand-in of the upstream APIs.
+
+The stand-in runs in a child process, so that its CPU and memory are not accounted to the bot.
+Commands and autocompletions are called with fake interactions by concurrent workers, then the
+latency percentiles, throughput, allocations and peak RSS are reported.
+
+Usage: python -m benchmarks.load [--requests 20000] [--concurrency 200] [--latency 50]
+       [--teams 50000] [--contributors 50000] [--tracemalloc]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from benchmarks.mock_api import (
+    MockAPI,
+    MockSettings,
+    add_arguments,
+    contributor_handle,
+    settings_from_arguments,
+    team_slug,
+)
+
+SEARCH_WORDS = ("Team", "Rocket", "Squad", "Hackers", "Crew", "tema", "rockt")
+
+
+class FakeResponse:
+    def __init__(self) -> None:
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **_: Any) -> None:
+        self._done = True
+
+    async def send_message(self, *_: Any, **kwargs: Any) -> None:
+        self._done = True
+        _serialize(kwargs)
+
+
+class FakeFollowup:
+    async def send(self, *_: Any, **kwargs: Any) -> None:
+        _serialize(kwargs)
+
+
+class FakeInteraction:
+    """
+    Just enough of `discord.Interaction` for the cog's commands.
+    """
+
+    def __init__(self) -> None:
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.extras: Dict[str, Any] = {}
+
+
+def _serialize(kwargs: Dict[str, Any]) -> None:
+    # Sending a message serializes its embed, which is part of the rendering cost
+    if (embed := kwargs.get("embed")) is not None:
+        embed.to_dict()
+
+
+def _serve(settings: MockSettings, urls: "multiprocessing.Queue[List[str]]") -> None:
+    async def serve() -> None:
+        api = MockAPI(settings)
+        urls.put(await api.start())
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def _skewed(count: int, rng: random.Random) -> int:
+    # Popular teams and heroes are asked for much more often than the others
+    return min(int(count * rng.random() ** 3), count - 1)
+
+
+def make_operations(
+    cog: Any, settings: MockSettings, rng: random.Random
+) -> List[Tuple[str, int, Callable[[], Awaitable[Any]]]]:
+    """
+    The (name, weight, call) of every operation of the mix.
+    """
+    pages = max(settings.teams // 10, 1)
+
+    def command(callback: Any, **kwargs: Callable[[], Any]) -> Callable[[], Awaitable[Any]]:
+        return lambda: callback.callback(
+            cog, FakeInteraction(), **{name: value() for name, value in kwargs.items()}
+        )
+
+    def autocomplete(callback: Any, current: Callable[[], str]) -> Callable[[], Awaitable[Any]]:
+        return lambda: callback(FakeInteraction(), current())
+
+    def prefix(text: str) -> str:
+        return text[: rng.randint(1, len(text))]
+
+    return [
+        ("/leaderboard", 10, command(cog.leaderboard, page=lambda: _skewed(pages, rng) + 1)),
+        (
+            "/team",
+            20,
+            command(cog.team, team_slug=lambda: team_slug(_skewed(settings.teams, rng))),
+        ),
+        ("/search", 5, command(cog.search_team, query=lambda: rng.choice(SEARCH_WORDS))),
+        (
+            "/hero",
+            10,
+            command(
+                cog.hero, hero=lambda: contributor_handle(_skewed(settings.contributors, rng))
+            ),
+        ),
+        ("/randomhero", 5, command(cog.randomhero)),
+        ("/teamstats deletions", 1, command(cog.team_stats_deletion_ratio, min_prs=lambda: 5)),
+        ("/teamstats per member", 1, command(cog.team_stats_prs_per_member)),
+        ("/teamstats active", 1, command(cog.team_stats_most_active)),
+        (
+            "team autocomplete",
+            30,
+            autocomplete(
+                cog.team_slug_autocomplete,
+                lambda: prefix(f"Team {_skewed(settings.teams, rng)}"),
+            ),
+        ),
+        (
+            "hero autocomplete",
+            20,
+            autocomplete(
+                cog.hero_autocomplete,
+                lambda: prefix(contributor_handle(_skewed(settings.contributors, rng))),
+            ),
+        ),
+    ]
+
+
+def percentile(latencies: List[float], q: float) -> float:
+    return latencies[min(int(q * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+
+
+async def run(args: argparse.Namespace, settings: MockSettings) -> None:
+    # Imported once the environment points to the stand-in, since it is read at import time
+    from hacksquad_bot.cogs.hacksquad.core import HackSquad
+    from hacksquad_bot.cogs.hacksquad.utils import Requester
+
+    await Requester().start()
+    cog = HackSquad(None)  # type: ignore
+    await cog.cog_load()
+
+    rng = random.Random(args.seed)
+    operations = make_operations(cog, settings, rng)
+    names = [name for name, _, _ in operations]
+    weights = [weight for _, weight, _ in operations]
+    calls = {name: call for name, _, call in operations}
+
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    remaining = args.requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            name = rng.choices(names, weights)[0]
+            started_at = time.perf_counter()
+            try:
+                await calls[name]()
+            except Exception:
+                errors[name] += 1
+            latencies[name].append(time.perf_counter() - started_at)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started_at
+    blocks_after = sys.getallocatedblocks()
+
+    print(f"{args.requests} operations, {args.concurrency} workers, {elapsed:.2f}s")
+    print(f"{'operation':>20} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in names:
+        values = sorted(latencies[name])
+        print(
+            f"{name:>20} {len(values):>7} {errors[name]:>7} "
+            f"{percentile(values, 0.5) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f}"
+        )
+    every = sorted(value for values in latencies.values() for value in values)
+    print(
+        f"{'all':>20} {len(every):>7} {sum(errors.values()):>7} "
+        f"{percentile(every, 0.5) * 1000:>9.2f} {percentile(every, 0.99) * 1000:>9.2f}"
+    )
+
+    print(f"throughput: {args.requests / elapsed:.0f} operations/s")
+    print(f"allocated blocks: {blocks_after - blocks_before:+d}")
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"traced memory: {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB")
+    # ru_maxrss is in KiB on Linux
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    for namespace, stats in Requester().cache_stats().items():
+        print(
+            f"cache {namespace}: {stats['hits']} hits, {stats['stale_hits']} stale, "
+            f"{stats['misses']} misses, {stats['entries']} entries, "
+            f"{stats['bytes'] / 2**20:.1f} MiB"
+        )
+
+    await cog.cog_unload()
+    await Requester().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tracemalloc", action="store_true", help="trace allocations, slows everything down"
+    )
+    args = parser.parse_args()
+    settings = settings_from_arguments(args)
+
+    urls: "multiprocessing.Queue[List[str]]" = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(settings, urls), daemon=True)
+    server.start()
+    try:
+        hacksquad, novu = urls.get(timeout=600)
+        os.environ["HACKSQUAD_URL"] = hacksquad
+        os.environ["NOVU_CONTRIBUTORS_URL"] = novu
+        # The governor and the snapshots are not what is measured here, unless asked for
+        os.environ.setdefault("UPSTREAM_RATE", "1000000")
+        os.environ.setdefault("UPSTREAM_BURST", "1000000")
+        os.environ.setdefault("UPSTREAM_MAX_CONCURRENCY", "1000")
+        os.environ.setdefault("CACHE_SNAPSHOT_INTERVAL", "0")
+        os.environ.setdefault(
+            "LIVE_LEADERBOARD_PATH", os.path.join(tempfile.mkdtemp(), "live.json")
+        )
+        asyncio.run(run(args, settings))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+A local stand-in for the HackSquad and Novu contributors APIs, serving synthetic payloads.
+
+Usage: python -m benchmarks.mock_api [--teams 50000] [--contributors 50000] [--latency 50]
+
+Point the bot at it with HACKSQUAD_URL=http://127.0.0.1:8081 and
+NOVU_CONTRIBUTORS_URL=http://127.0.0.1:8082.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from aiohttp import web
+
+START = datetime(2022, 10, 1)
+
+
+class MockSettings(NamedTuple):
+    teams: int = 50_000
+    "Number of teams in the leaderboard"
+
+    prs_per_team: int = 50
+    "Average number of PRs of a team"
+
+    contributors: int = 50_000
+    "Number of contributors"
+
+    pulls_per_contributor: int = 2_000
+    "Average number of pulls of a contributor"
+
+    latency: float = 0.05
+    "Delay (in seconds) added to every response"
+
+    validators: bool = True
+    "Whether responses carry an ETag and conditional requests are answered with 304"
+
+
+def team_slug(index: int) -> str:
+    return f"team-{index}"
+
+
+def contributor_handle(index: int) -> str:
+    return f"contributor-{index}"
+
+
+def _timestamp(rng: random.Random) -> str:
+    moment = START + timedelta(seconds=rng.randrange(31 * 24 * 3600))
+    return moment.isoformat(timespec="milliseconds") + "Z"
+
+
+def make_leaderboard(settings: MockSettings) -> Dict[str, Any]:
+    rng = random.Random(0)
+    return {
+        "teams": [
+            {
+                "id": f"cl{i:022d}",
+                "name": f"Team {i} {rng.choice(('Rocket', 'Squad', 'Hackers', 'Crew'))}",
+                "score": rng.randrange(200),
+                "slug": team_slug(i),
+            }
+            for i in range(settings.teams)
+        ]
+    }
+
+
+def make_contributors_mini(settings: MockSettings) -> Dict[str, Any]:
+    rng = random.Random(1)
+    return {
+        "list": [
+            {
+                "_id": f"{i:024x}",
+                "github": contributor_handle(i),
+                "name": f"Contributor {i}",
+                "avatar_url": f"https://avatars.githubusercontent.com/u/{i}",
+                "totalPulls": rng.randrange(1, 2 * settings.pulls_per_contributor),
+            }
+            for i in range(settings.contributors)
+        ]
+    }
+
+
+def make_team(settings: MockSettings, slug: str) -> Dict[str, Any]:
+    rng = random.Random(slug)
+    users = [
+        {
+            "createdAt": _timestamp(rng),
+            "id": f"user-{slug}-{i}",
+            "name": f"Member {i}",
+            "emailVerified": True,
+            "image": f"https://avatars.githubusercontent.com/u/{i}",
+            "moderator": False,
+            "handle": f"{slug}-member-{i}",
+            "teamId": slug,
+            "disqualified": False,
+            "githubUserId": None,
+        }
+        for i in range(rng.randint(1, 5))
+    ]
+    prs = [
+        {
+            "id": f"pr-{slug}-{i}",
+            "createdAt": _timestamp(rng),
+            "title": f"Fix the thing number {i}",
+            "url": f"https://github.com/org/repo{i % 50}/pull/{i}",
+            **({"status": "DELETED"} if rng.random() < 0.1 else {}),
+        }
+        for i in range(rng.randint(0, 2 * settings.prs_per_team))
+    ]
+    return {
+        "team": {
+            "id": slug,
+            "name": f"Team {slug}",
+            "score": len(prs),
+            "slug": slug,
+            "ownerId": users[0]["id"],
+            "githubTeamId": None,
+            "allowAutoAssign": True,
+            "disqualified": False,
+            # The real API sends the PRs as a stringified list
+            "prs": json.dumps(prs),
+            "users": users,
+        }
+    }
+
+
+def make_contributor(settings: MockSettings, github: str) -> Dict[str, Any]:
+    rng = random.Random(github)
+    pulls = [
+        {
+            "url": f"https://api.github.com/repos/novuhq/novu/pulls/{i}",
+            "html_url": f"https://github.com/novuhq/novu/pull/{i}",
+            "number": i,
+            "state": rng.choice(("open", "closed")),
+            "locked": False,
+            "title": f"feat: improve the thing number {i}",
+            "created_at": _timestamp(rng),
+            "updated_at": _timestamp(rng),
+            "closed_at": _timestamp(rng) if rng.random() < 0.5 else None,
+            "merged_at": None,
+        }
+        for i in range(rng.randint(1, 2 * settings.pulls_per_contributor))
+    ]
+    return {
+        "github": github,
+        "name": github.title(),
+        "avatar_url": f"https://avatars.githubusercontent.com/{github}",
+        "bio": "Writing code",
+        "created_at": _timestamp(rng),
+        "totalPulls": len(pulls),
+        "totalLast3MonthsPulls": len(pulls) // 3,
+        "pulls": pulls,
+    }
+
+
+class MockAPI:
+    """
+    Serve both APIs, each on its own port so that they are seen as different hosts.
+    """
+
+    def __init__(self, settings: MockSettings) -> None:
+        self.settings = settings
+        self.leaderboard = json.dumps(make_leaderboard(settings))
+        self.contributors_mini = json.dumps(make_contributors_mini(settings))
+        # Generating the large payloads costs more than serving them, keep the recent ones
+        self.team = lru_cache(maxsize=4096)(
+            lambda slug: json.dumps(make_team(self.settings, slug))
+        )
+        self.contributor = lru_cache(maxsize=1024)(
+            lambda github: json.dumps(make_contributor(self.settings, github))
+        )
+        self.requests = 0
+        self.not_modified = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _respond(self, body: str, request: Optional[web.Request] = None) -> web.Response:
+        self.requests += 1
+        if self.settings.latency:
+            await asyncio.sleep(self.settings.latency)
+        if request is None or not self.settings.validators:
+            return web.Response(text=body, content_type="application/json")
+        etag = f'"{hashlib.blake2b(body.encode(), digest_size=8).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def _leaderboard(self, request: web.Request) -> web.Response:
+        return await self._respond(self.leaderboard, request)
+
+    async def _team(self, request: web.Request) -> web.Response:
+        slug = request.query.get("id", "")
+        if not slug.startswith("team-"):
+            return web.Response(status=404)
+        return await self._respond(self.team(slug))
+
+    async def _contributors_mini(self, request: web.Request) -> web.Response:
+        return await self._respond(self.contributors_mini, request)
+
+    async def _contributor(self, request: web.Request) -> web.Response:
+        # The real API answers unknown contributors with `null`
+        github = request.match_info["github"]
+        if not github.startswith("contributor-"):
+            return await self._respond("null")
+        return await self._respond(self.contributor(github))
+
+    async def start(self, host: str = "127.0.0.1", ports: Tuple[int, int] = (0, 0)) -> List[str]:
+        """
+        Start serving.
+
+        Returns
+        -------
+        List[str]
+            The base URLs of the HackSquad API and of the Novu contributors API.
+        """
+        app = web.Application()
+        app.router.add_get("/api/leaderboard", self._leaderboard)
+        app.router.add_get("/api/team/", self._team)
+        app.router.add_get("/contributors-mini", self._contributors_mini)
+        app.router.add_get("/contributor/{github}", self._contributor)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        urls = []
+        for port in ports:
+            site = web.TCPSite(self._runner, host, port)
+            await site.start()
+            bound_port = site._server.sockets[0].getsockname()[1]  # type: ignore
+            urls.append(f"http://{host}:{bound_port}")
+        return urls
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockSettings._field_defaults
+    parser.add_argument("--teams", type=int, default=defaults["teams"])
+    parser.add_argument("--prs-per-team", type=int, default=defaults["prs_per_team"])
+    parser.add_argument("--contributors", type=int, default=defaults["contributors"])
+    parser.add_argument(
+        "--pulls-per-contributor", type=int, default=defaults["pulls_per_contributor"]
+    )
+    parser.add_argument(
+        "--latency", type=float, default=defaults["latency"] * 1000, help="in milliseconds"
+    )
+    parser.add_argument(
+        "--no-validators",
+        dest="validators",
+        action="store_false",
+        help="send no ETag and ignore conditional requests",
+    )
+
+
+def settings_from_arguments(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        teams=args.teams,
+        prs_per_team=args.prs_per_team,
+        contributors=args.contributors,
+        pulls_per_contributor=args.pulls_per_contributor,
+        latency=args.latency / 1000,
+        validators=args.validators,
+    )
+
+
+async def serve(settings: MockSettings, ports: Tuple[int, int]) -> None:
+    api = MockAPI(settings)
+    hacksquad, novu = await api.start(ports=ports)
+    print(f"HACKSQUAD_URL={hacksquad} NOVU_CONTRIBUTORS_URL={novu}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--hacksquad-port", type=int, default=8081)
+    parser.add_argument("--novu-port", type=int, default=8082)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(settings_from_arguments(args), (args.hacksquad_port, args.novu_port)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
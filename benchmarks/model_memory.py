@@ -0,0 +1,138 @@
+"""
+Compare the resident size of a warmed cache made of plain dicts (the previous TypedDict
+payloads) against the slotted models.
+
+Usage: python -m benchmarks.model_memory [--teams 20000] [--contributors 20000] [--pulls 2000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from dateutil.parser import isoparse
+
+from hacksquad_bot.cogs.hacksquad.models import NovuContributor, NovuContributorMini, PartialTeam
+
+
+def make_payloads(teams: int, contributors: int, pulls: int) -> Dict[str, Any]:
+    return {
+        "leaderboard": [
+            {"id": f"cl{i:022d}", "name": f"Team {i}", "score": i % 300, "slug": f"team-{i}"}
+            for i in range(teams)
+        ],
+        "contributors_mini": [
+            {
+                "_id": f"{i:024x}",
+                "github": f"user{i}",
+                "avatar_url": f"https://avatars.githubusercontent.com/u/{i}?v=4",
+                "name": f"User {i}",
+                "totalPulls": i % 50,
+            }
+            for i in range(contributors)
+        ],
+        "contributor": {
+            "github": "user0",
+            "name": "User 0",
+            "avatar_url": "https://avatars.githubusercontent.com/u/0?v=4",
+            "bio": None,
+            "totalPulls": pulls,
+            "totalLast3MonthsPulls": pulls // 4,
+            "created_at": "2020-01-01T00:00:00Z",
+            "pulls": [
+                {
+                    "url": f"https://api.github.com/repos/novuhq/novu/pulls/{i}",
+                    "html_url": f"https://github.com/novuhq/novu/pull/{i}",
+                    "number": i,
+                    "state": "closed" if i % 3 else "open",
+                    "locked": False,
+                    "title": f"Pull request {i}",
+                    "created_at": "2022-10-01T10:00:00Z",
+                    "updated_at": "2022-10-02T10:00:00Z",
+                    "closed_at": "2022-10-03T10:00:00Z" if i % 3 else None,
+                    "merged_at": "2022-10-03T10:00:00Z" if i % 3 else None,
+                }
+                for i in range(pulls)
+            ],
+        },
+    }
+
+
+def as_dicts(payloads: Dict[str, Any]) -> List[Any]:
+    # What the previous TypedDict parsing kept in the cache
+    return [
+        [
+            {
+                "place": None,
+                "id": t["id"],
+                "name": t["name"],
+                "score": t["score"],
+                "slug": t["slug"],
+            }
+            for t in payloads["leaderboard"]
+        ],
+        [
+            {
+                "_id": c["_id"],
+                "github": c["github"],
+                "avatar_url": c["avatar_url"],
+                "name": c.get("name"),
+                "total_pulls": c.get("totalPulls"),
+            }
+            for c in payloads["contributors_mini"]
+        ],
+        {
+            **{k: v for k, v in payloads["contributor"].items() if k != "pulls"},
+            "created_at": isoparse(payloads["contributor"]["created_at"]),
+            "pulls": [
+                {
+                    **pull,
+                    **{
+                        field: isoparse(pull[field])
+                        for field in ("created_at", "updated_at", "closed_at", "merged_at")
+                        if pull[field]
+                    },
+                }
+                for pull in payloads["contributor"]["pulls"]
+            ],
+        },
+    ]
+
+
+def as_models(payloads: Dict[str, Any]) -> List[Any]:
+    return [
+        [PartialTeam.from_payload(t) for t in payloads["leaderboard"]],
+        [NovuContributorMini.from_payload(c) for c in payloads["contributors_mini"]],
+        NovuContributor.from_payload(payloads["contributor"]),
+    ]
+
+
+def measure(build: Callable[[Dict[str, Any]], Any], payloads: Dict[str, Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = build(payloads)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--teams", type=int, default=20000)
+    parser.add_argument("--contributors", type=int, default=20000)
+    parser.add_argument("--pulls", type=int, default=2000)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.teams, args.contributors, args.pulls)
+    dicts = measure(as_dicts, payloads)
+    models = measure(as_models, payloads)
+    print(f"    dicts: {dicts / 1024 / 1024:7.2f} MiB")
+    print(
+        f"   models: {models / 1024 / 1024:7.2f} MiB ({(1 - models / dicts) * 100:.0f}% smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
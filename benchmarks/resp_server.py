@@ -0,0 +1,123 @@
+"""
+A tiny in-memory server speaking the Redis protocol, enough to run the bot's redis cache
+backend without a Redis install: PING, AUTH, SELECT, GET, SET (EX, PX, NX, XX) and DEL.
+
+Usage: python -m benchmarks.resp_server [--port 6379]
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class RESPServer:
+    def __init__(self) -> None:
+        self._values: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.commands = 0
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        stored = self._values.get(key)
+        if stored is None:
+            return None
+        value, expires_at = stored
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    def _set(self, arguments: List[bytes]) -> bytes:
+        key, value, *options = arguments
+        expires_at: Optional[float] = None
+        condition = None
+        options_iter = iter(options)
+        for option in options_iter:
+            option = option.upper()
+            if option == b"EX":
+                expires_at = time.monotonic() + int(next(options_iter))
+            elif option == b"PX":
+                expires_at = time.monotonic() + int(next(options_iter)) / 1000
+            elif option in (b"NX", b"XX"):
+                condition = option
+            else:
+                return b"-ERR syntax error\r\n"
+        exists = self._get(key) is not None
+        if (condition == b"NX" and exists) or (condition == b"XX" and not exists):
+            return b"$-1\r\n"
+        self._values[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+    def _execute(self, command: List[bytes]) -> bytes:
+        self.commands += 1
+        name, arguments = command[0].upper(), command[1:]
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"GET":
+            value = self._get(arguments[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            return self._set(arguments)
+        if name == b"DEL":
+            removed = sum(self._values.pop(key, None) is not None for key in arguments)
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                if not line.startswith(b"*"):
+                    # Inline commands, as sent by telnet
+                    command = line.split()
+                else:
+                    command = []
+                    for _ in range(int(line[1:])):
+                        length = int((await reader.readline())[1:])
+                        command.append((await reader.readexactly(length + 2))[:-2])
+                if command:
+                    writer.write(self._execute(command))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """
+        Start listening, returning the bound port.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def serve(port: int) -> None:
+    server = RESPServer()
+    port = await server.start(port=port)
+    print(
+        f"CACHE_BACKEND=redis CACHE_BACKEND_URL=redis://127.0.0.1:{port}/0"
+        f" CACHE_BACKEND_SECRET={secrets.token_hex(16)}"
+    )
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
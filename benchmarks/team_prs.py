@@ -0,0 +1,80 @@
+"""
+Compare the decoding of a team's stringified PR list: `ast.literal_eval` + building every PR,
+against the lazy decoder used by `Requester.fetch_team` and the stats shown by /team.
+
+Usage: python -m benchmarks.team_prs [--prs 5000] [--repeat 20]
+"""
+
+import argparse
+import ast
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from dateutil.parser import isoparse
+
+from hacksquad_bot.cogs.hacksquad.models import PR, PRStatus, compute_pr_stats, decode_prs
+from hacksquad_bot.utils import fastjson
+
+
+def make_prs(count: int) -> str:
+    start = datetime(2022, 10, 1)
+    return json.dumps(
+        [
+            {
+                "id": f"cl{i:022d}",
+                "createdAt": (start + timedelta(minutes=i)).isoformat(timespec="milliseconds")
+                + "Z",
+                "title": f"Fix the thing number {i} in the {random.choice('abcdef')} module",
+                "url": f"https://github.com/org/repo{i % 50}/pull/{i}",
+                **({"status": "DELETED"} if random.random() < 0.1 else {}),
+            }
+            for i in range(count)
+        ]
+    )
+
+
+def previous_path(prs: str) -> None:
+    raw = ast.literal_eval(prs)
+    decoded = [
+        PR(
+            id=pr["id"],
+            created_at=isoparse(pr["createdAt"]),
+            title=pr["title"],
+            url=pr["url"],
+            status=(
+                PRStatus.DELETED
+                if pr.get("status", "ACCEPTED") == "DELETED"
+                else PRStatus.ACCEPTED
+            ),
+        )
+        for pr in raw
+    ]
+    decoded.sort(key=lambda pr: pr["created_at"])
+    accepted = [pr for pr in decoded if pr["status"] == PRStatus.ACCEPTED]
+    [pr for pr in decoded if pr["status"] == PRStatus.DELETED]
+    accepted[-3:]
+
+
+def current_path(prs: str) -> None:
+    decoded = decode_prs(prs)
+    stats = compute_pr_stats(decoded)
+    [decoded[position] for position in stats.last_accepted]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prs", type=int, default=5000, help="number of PRs of the team")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    prs = make_prs(args.prs)
+    print(f"{args.prs} PRs, {len(prs) / 1024:.0f} KiB payload, JSON backend: {fastjson.BACKEND}")
+    for name, func in (("literal_eval + all PRs", previous_path), ("lazy decoder", current_path)):
+        seconds = min(timeit.repeat(lambda: func(prs), number=1, repeat=args.repeat))
+        print(f"{name:>24}: {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare building a contributor with every timestamp parsed by `isoparse` (the previous
+behaviour) against the lazy timestamps, for what `/hero` reads and for a full read.
+
+Usage: python -m benchmarks.timestamps [--pulls 3000] [--repeat 20]
+"""
+
+import argparse
+import timeit
+from typing import Any, Dict
+
+from dateutil.parser import isoparse
+
+from hacksquad_bot.cogs.hacksquad.models import NovuContributor
+
+
+def make_contributor(pulls: int) -> Dict[str, Any]:
+    return {
+        "github": "someone",
+        "name": "Someone",
+        "avatar_url": "https://avatars.githubusercontent.com/u/1?v=4",
+        "bio": None,
+        "totalPulls": pulls,
+        "totalLast3MonthsPulls": pulls // 4,
+        "created_at": "2020-01-01T00:00:00.000Z",
+        "pulls": [
+            {
+                "url": f"https://api.github.com/repos/novuhq/novu/pulls/{i}",
+                "html_url": f"https://github.com/novuhq/novu/pull/{i}",
+                "number": i,
+                "state": "closed",
+                "locked": False,
+                "title": f"Pull request {i}",
+                "created_at": f"2022-10-{i % 28 + 1:02d}T10:00:00Z",
+                "updated_at": f"2022-10-{i % 28 + 1:02d}T11:00:00Z",
+                "closed_at": f"2022-10-{i % 28 + 1:02d}T12:00:00Z" if i % 3 else None,
+                "merged_at": f"2022-10-{i % 28 + 1:02d}T12:00:00Z" if i % 3 else None,
+            }
+            for i in range(pulls)
+        ],
+    }
+
+
+def eager_isoparse(payload: Dict[str, Any]) -> None:
+    isoparse(payload["created_at"])
+    for pull in payload["pulls"]:
+        for field in ("created_at", "updated_at", "closed_at", "merged_at"):
+            if pull[field]:
+                isoparse(pull[field])
+
+
+def lazy_hero(payload: Dict[str, Any]) -> None:
+    # `/hero` reads the last 3 pulls and no timestamp
+    contributor = NovuContributor.from_payload(payload)
+    [(pull.title, pull.url) for pull in contributor.pulls[-3:]]
+
+
+def lazy_full(payload: Dict[str, Any]) -> None:
+    contributor = NovuContributor.from_payload(payload)
+    contributor.created_at
+    for pull in contributor.pulls:
+        pull.created_at, pull.updated_at, pull.closed_at, pull.merged_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pulls", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = make_contributor(args.pulls)
+    print(f"{args.pulls} pulls")
+    for name, func in (
+        ("isoparse every timestamp", eager_isoparse),
+        ("lazy, /hero usage", lazy_hero),
+        ("lazy, every timestamp", lazy_full),
+    ):
+        seconds = min(timeit.repeat(lambda: func(payload), number=1, repeat=args.repeat))
+        print(f"{name:>26}: {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
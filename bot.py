@@ -1,12 +1,24 @@
 import contextlib
 import os
 
-from hacksquad_bot.main import HackSquadBot
-
+# Loaded first, since the bot's modules read their settings when they are imported
 with contextlib.suppress(ImportError):
     from dotenv import load_dotenv  # type: ignore
 
     load_dotenv()
 
-bot = HackSquadBot()
-bot.run(os.environ["TOKEN"])
+# Light on purpose: the heavy modules are only imported by the mode that needs them, after the
+# startup profile started timing
+from hacksquad_bot.cluster import CLUSTER_COUNT, ClusterLauncher  # noqa: E402
+
+if __name__ == "__main__":
+    if CLUSTER_COUNT > 1:
+        import discord
+
+        discord.utils.setup_logging()
+        ClusterLauncher(os.environ["TOKEN"]).run()
+    else:
+        from hacksquad_bot.main import HackSquadBot
+
+        bot = HackSquadBot()
+        bot.run(os.environ["TOKEN"])
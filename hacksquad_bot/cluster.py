@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Imported first, so that the startup profile of a cluster covers its imports
+from hacksquad_bot.utils.startup import STARTUP  # noqa: F401
+
+CLUSTER_COUNT = int(os.environ.get("CLUSTER_COUNT") or 1)
+"Number of worker processes the shards are split across. 1 runs the bot in this process."
+
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT") or 0)
+"Total number of shards. 0 uses the number recommended by Discord."
+
+IDENTIFY_INTERVAL = 5.0
+"Discord allows one identify per 5 seconds per concurrency bucket"
+
+# Restarts of a cluster that keeps crashing are delayed more and more, up to this
+_MAX_RESTART_DELAY = 300.0
+# A cluster that ran this long without crashing is considered healthy again
+_HEALTHY_UPTIME = 60.0
+
+ClusterHandler = Callable[..., Awaitable[Any]]
+"A coroutine function run when another cluster broadcasts its operation"
+
+
+class ClusterClient:
+    """
+    The side of the IPC channel living in a cluster: broadcasts operations to the other clusters
+    and runs the ones they broadcast.
+    """
+
+    def __init__(self, cluster_id: int, cluster_count: int, connection: Connection) -> None:
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self._connection = connection
+        self._send_lock = threading.Lock()
+        self.handlers: Dict[str, ClusterHandler] = {}
+
+    def add_handler(self, operation: str, handler: ClusterHandler) -> None:
+        self.handlers[operation] = handler
+
+    def remove_handler(self, operation: str) -> None:
+        self.handlers.pop(operation, None)
+
+    def broadcast(self, operation: str, **payload: Any) -> None:
+        """
+        Run an operation on every other cluster. The handlers are not awaited.
+        """
+        with self._send_lock:
+            self._connection.send(("broadcast", operation, payload))
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        threading.Thread(target=self._listen, args=(loop,), daemon=True).start()
+
+    def _listen(self, loop: asyncio.AbstractEventLoop) -> None:
+        while True:
+            try:
+                operation, payload = self._connection.recv()
+            except (EOFError, OSError):
+                return
+            loop.call_soon_threadsafe(
+                lambda o=operation, p=payload: loop.create_task(self._run(o, p))
+            )
+
+    async def _run(self, operation: str, payload: Dict[str, Any]) -> None:
+        handler = self.handlers.get(operation)
+        if handler is None:
+            logging.warning('Cluster %s has no handler for "%s"', self.cluster_id, operation)
+            return
+        try:
+            await handler(**payload)
+        except Exception:
+            logging.exception('Cluster %s could not run "%s"', self.cluster_id, operation)
+
+
+def _raise_keyboard_interrupt(*_: Any) -> None:
+    # Lets `Client.run` close the bot properly
+    raise KeyboardInterrupt
+
+
+def _run_cluster(
+    cluster_id: int,
+    cluster_count: int,
+    shard_ids: List[int],
+    shard_count: int,
+    token: str,
+    connection: Connection,
+) -> None:
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    # Files and ports cannot be shared between clusters
+    for variable, default in (
+        ("CACHE_SNAPSHOT_PATH", "cache.sqlite3"),
+        ("LIVE_LEADERBOARD_PATH", "live_leaderboards.json"),
+    ):
+        os.environ[variable] = f"{os.environ.get(variable) or default}.cluster{cluster_id}"
+    if port := int(os.environ.get("METRICS_PORT") or 0):
+        os.environ["METRICS_PORT"] = str(port + cluster_id)
+
+    from hacksquad_bot.main import HackSquadBot
+
+    cluster = ClusterClient(cluster_id, cluster_count, connection)
+    bot = HackSquadBot(shard_ids=shard_ids, shard_count=shard_count, cluster=cluster)
+    bot.run(token)
+
+
+class _Worker:
+    def __init__(self, cluster_id: int, shard_ids: List[int]) -> None:
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.connection: Optional[Connection] = None
+        self.started_at = 0.0
+        self.restart_at: Optional[float] = None
+        self.restart_delay = 1.0
+        self.restarts = 0
+
+
+class ClusterLauncher:
+    """
+    Split the shards across worker processes, each running its own bot and event loop.
+
+    Crashed clusters are restarted with an increasing delay, and operations broadcast by a
+    cluster are relayed to the other ones.
+    """
+
+    def __init__(
+        self, token: str, cluster_count: int = CLUSTER_COUNT, shard_count: int = SHARD_COUNT
+    ) -> None:
+        self.token = token
+        self.cluster_count = cluster_count
+        self.shard_count = shard_count
+        self.max_concurrency = 1
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._stopping = False
+
+    async def _fetch_gateway(self) -> Tuple[int, int]:
+        # The launcher does not run a bot, it only needs discord.py here
+        import discord
+
+        http = discord.http.HTTPClient(asyncio.get_running_loop())
+        try:
+            await http.static_login(self.token)
+            # Requested directly, as `get_bot_gateway` drops the session start limit before 2.4
+            gateway = await http.request(discord.http.Route("GET", "/gateway/bot"))
+        finally:
+            await http.close()
+        return gateway["shards"], gateway["session_start_limit"]["max_concurrency"]
+
+    def _assign_shards(self) -> List[List[int]]:
+        # Contiguous ranges, since the identify buckets are made of consecutive shard IDs
+        per_cluster, extra = divmod(self.shard_count, self.cluster_count)
+        assignments: List[List[int]] = []
+        start = 0
+        for cluster_id in range(self.cluster_count):
+            size = per_cluster + (cluster_id < extra)
+            assignments.append(list(range(start, start + size)))
+            start += size
+        return [shard_ids for shard_ids in assignments if shard_ids]
+
+    def _start(self, worker: _Worker) -> None:
+        parent, child = self._context.Pipe()
+        worker.connection = parent
+        worker.process = self._context.Process(
+            target=_run_cluster,
+            args=(
+                worker.cluster_id,
+                len(self._workers),
+                worker.shard_ids,
+                self.shard_count,
+                self.token,
+                child,
+            ),
+            name=f"cluster-{worker.cluster_id}",
+        )
+        worker.process.start()
+        child.close()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        logging.info(
+            "Started cluster %s (pid %s) with shards %s",
+            worker.cluster_id,
+            worker.process.pid,
+            worker.shard_ids,
+        )
+
+    def _relay(self, origin: _Worker) -> None:
+        try:
+            _, operation, payload = origin.connection.recv()  # type: ignore
+        except (EOFError, OSError):
+            return
+        for worker in self._workers:
+            if worker is not origin and worker.process and worker.process.is_alive():
+                try:
+                    worker.connection.send((operation, payload))  # type: ignore
+                except (BrokenPipeError, OSError):
+                    logging.warning(
+                        "Could not relay %s to cluster %s", operation, worker.cluster_id
+                    )
+
+    def _on_exit(self, worker: _Worker) -> None:
+        process = worker.process
+        assert process is not None
+        process.join()
+        if worker.connection:
+            worker.connection.close()
+        worker.process = worker.connection = None
+
+        if self._stopping or process.exitcode == 0:
+            logging.info("Cluster %s stopped", worker.cluster_id)
+            return
+
+        if time.monotonic() - worker.started_at >= _HEALTHY_UPTIME:
+            worker.restart_delay = 1.0
+        logging.warning(
+            "Cluster %s exited with code %s, restarting it in %.0fs",
+            worker.cluster_id,
+            process.exitcode,
+            worker.restart_delay,
+        )
+        worker.restart_at = time.monotonic() + worker.restart_delay
+        worker.restart_delay = min(worker.restart_delay * 2, _MAX_RESTART_DELAY)
+        worker.restarts += 1
+
+    def _stop(self, *_: Any) -> None:
+        self._stopping = True
+
+    def _supervise(self) -> None:
+        while not self._stopping:
+            now = time.monotonic()
+            for worker in self._workers:
+                if worker.restart_at is not None and worker.restart_at <= now:
+                    self._start(worker)
+            running = [worker for worker in self._workers if worker.process]
+            if not running and all(worker.restart_at is None for worker in self._workers):
+                return
+
+            waitables: Dict[Any, Tuple[str, _Worker]] = {}
+            for worker in running:
+                waitables[worker.process.sentinel] = ("exit", worker)  # type: ignore
+                waitables[worker.connection] = ("message", worker)
+            for ready in wait(list(waitables), timeout=1):
+                kind, worker = waitables[ready]
+                if kind == "message":
+                    if worker.connection:
+                        self._relay(worker)
+                elif worker.process:
+                    self._on_exit(worker)
+
+    def _shutdown(self) -> None:
+        for worker in self._workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + 30
+        for worker in self._workers:
+            if worker.process:
+                worker.process.join(max(deadline - time.monotonic(), 0))
+                if worker.process.is_alive():
+                    worker.process.kill()
+
+    def run(self) -> None:
+        """
+        Start the clusters and supervise them until interrupted.
+        """
+        recommended, self.max_concurrency = asyncio.run(self._fetch_gateway())
+        self.shard_count = self.shard_count or recommended
+        self._workers = [
+            _Worker(cluster_id, shard_ids)
+            for cluster_id, shard_ids in enumerate(self._assign_shards())
+        ]
+        logging.info("Running %s shards in %s clusters", self.shard_count, len(self._workers))
+
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        try:
+            # Clusters identify their shards one after the other, as they share the same limit
+            next_start = time.monotonic()
+            for worker in self._workers:
+                worker.restart_at = next_start
+                next_start += len(worker.shard_ids) * IDENTIFY_INTERVAL / self.max_concurrency
+            self._supervise()
+        finally:
+            self._shutdown()
@@ -1,8 +1,14 @@
 from hacksquad_bot.main import HackSquadBot
 
 from .core import HackSquad
+from .utils import Requester
 
 
 async def setup(bot: HackSquadBot):
+    await Requester().start()
     cog = HackSquad(bot)
     await bot.add_cog(cog)
+
+
+async def teardown(bot: HackSquadBot):
+    await Requester().close()
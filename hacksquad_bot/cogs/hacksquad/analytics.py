@@ -0,0 +1,84 @@
+import heapq
+import operator
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from .models import Team
+
+
+class TeamColumns:
+    """
+    The aggregates of every team fetched so far, stored column-wise.
+
+    Each team is a row, updated whenever its details are fetched. Numbers are kept in compact
+    arrays, so that cross-team questions are answered by a few passes over whole columns
+    instead of walking through every team and its PRs.
+    """
+
+    def __init__(self) -> None:
+        self._rows: Dict[str, int] = {}
+        "The row of each team, by slug"
+
+        self.slugs: List[str] = []
+        self.names: List[str] = []
+        self.accepted = array("I")
+        self.deleted = array("I")
+        self.members = array("I")
+        self.accepted_times: List["array[float]"] = []
+        "When the accepted PRs of each team have been created, sorted"
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    def update(self, team: Team) -> None:
+        stats = team.stats
+        row = self._rows.get(team.slug)
+        if row is None:
+            self._rows[team.slug] = len(self.slugs)
+            self.slugs.append(team.slug)
+            self.names.append(team.name)
+            self.accepted.append(stats.accepted)
+            self.deleted.append(stats.deleted)
+            self.members.append(len(team.users))
+            self.accepted_times.append(stats.accepted_times)
+            return
+        self.names[row] = team.name
+        self.accepted[row] = stats.accepted
+        self.deleted[row] = stats.deleted
+        self.members[row] = len(team.users)
+        self.accepted_times[row] = stats.accepted_times
+
+    def _top(self, values: Sequence[float], count: int) -> List[Tuple[str, str, float]]:
+        rows = heapq.nlargest(count, range(len(values)), key=values.__getitem__)
+        return [(self.names[row], self.slugs[row], values[row]) for row in rows]
+
+    def deletion_ratios(self, count: int, min_prs: int = 1) -> List[Tuple[str, str, float]]:
+        """
+        The (name, slug, percentage of deleted PRs) of the teams deleting the most, among
+        those with at least `min_prs` PRs.
+        """
+        totals = array("I", map(operator.add, self.accepted, self.deleted))
+        # Teams below the threshold get a negative ratio, which keeps them out of the top
+        ratios = [
+            deleted * 100 / total if total >= min_prs and total else -1.0
+            for deleted, total in zip(self.deleted, totals)
+        ]
+        return [top for top in self._top(ratios, count) if top[2] >= 0]
+
+    def prs_per_member(self, count: int) -> List[Tuple[str, str, float]]:
+        """
+        The (name, slug, accepted PRs per member) of the teams doing the most per member.
+        """
+        ratios = list(map(operator.truediv, self.accepted, (max(m, 1) for m in self.members)))
+        return self._top(ratios, count)
+
+    def most_active(self, count: int, period: float = 24 * 3600) -> List[Tuple[str, str, float]]:
+        """
+        The (name, slug, accepted PRs) of the teams with the most accepted PRs created during
+        the last `period` seconds.
+        """
+        since = time.time() - period
+        recent = [len(times) - bisect_left(times, since) for times in self.accepted_times]
+        return [top for top in self._top(recent, count) if top[2] > 0]
@@ -1,16 +1,28 @@
+import asyncio
 import logging
+import os
 import random
-from typing import List, TypedDict
+from datetime import timedelta
+from typing import List, Tuple
 
 import discord
 from discord import Interaction, app_commands
-from discord.ext import commands
-from rapidfuzz import process
+from discord.ext import commands, tasks
 
 from hacksquad_bot.cogs.hacksquad.utils import Requester
 from hacksquad_bot.main import HackSquadBot
-
-from .utils import HACKSQUAD_COLOR, NovuContributor, PRStatus, Requester, ResponseError
+from hacksquad_bot.utils.governor import CircuitOpenError
+from hacksquad_bot.utils.metrics import METRICS
+from hacksquad_bot.utils.persistence import CACHE_SNAPSHOT_INTERVAL
+
+from .analytics import TeamColumns
+from .live import LiveLeaderboardScheduler
+from .models import NovuContributor, NovuContributorMini, PartialTeam, Team
+from .prefetch import RandomHeroPool
+from .ranking import TEAMS_PER_PAGE, LeaderboardRanking
+from .search import AutocompleteIndex, DerivedIndex, FuzzySearchEngine
+from .utils import HACKSQUAD_COLOR, Requester, ResponseError
+from .warmer import TeamWarmer
 
 SOME_RANDOM_ASS_QUOTES = [
     "Seriously... If you're gonna win, can you... give me one of your shirt?",
@@ -36,9 +48,113 @@ SOME_RANDOM_ASS_QUOTES = [
 ]
 
 
+CACHE_REFRESH_INTERVAL = float(os.environ.get("CACHE_REFRESH_INTERVAL") or 60)
+"How often (in seconds) hot cache entries are checked for refresh. 0 disables the refresh."
+
+CACHE_REFRESH_AHEAD = timedelta(seconds=float(os.environ.get("CACHE_REFRESH_AHEAD") or 120))
+"How long before their expiration hot cache entries are refreshed"
+
+
 class HackSquad(commands.Cog):
     def __init__(self, bot: HackSquadBot) -> None:
         self.bot = bot
+        self.team_index: DerivedIndex[List[PartialTeam], AutocompleteIndex] = DerivedIndex(
+            lambda teams: AutocompleteIndex((team.name, team.slug) for team in teams)
+        )
+        self.team_search: DerivedIndex[List[PartialTeam], FuzzySearchEngine] = DerivedIndex(
+            lambda teams: FuzzySearchEngine((team.name, team.slug) for team in teams)
+        )
+        self.leaderboard_ranking: DerivedIndex[
+            List[PartialTeam], LeaderboardRanking
+        ] = DerivedIndex(LeaderboardRanking)
+        self.hero_index: DerivedIndex[List[NovuContributorMini], AutocompleteIndex] = DerivedIndex(
+            lambda contributors: AutocompleteIndex(
+                (contributor.github, contributor.github) for contributor in contributors
+            )
+        )
+        self.live_leaderboards = LiveLeaderboardScheduler(bot, self.live_leaderboard_embed)
+        self.random_heroes = RandomHeroPool(self.hero_embed_formatter)
+        self.team_warmer = TeamWarmer()
+        self.team_columns = TeamColumns()
+
+    async def _on_leaderboard_refresh(self, _: str, teams: List[PartialTeam]) -> None:
+        await self.team_index.update(teams)
+        await self.team_search.update(teams)
+        ranking = await self.leaderboard_ranking.update(teams)
+        self.live_leaderboards.notify(ranking)
+        self.team_warmer.notify(ranking)
+
+    async def _on_contributors_mini_refresh(
+        self, _: str, contributors: List[NovuContributorMini]
+    ) -> None:
+        await self.hero_index.update(contributors)
+
+    async def _on_team_refresh(self, _: str, team: Team) -> None:
+        # Aggregated before the team becomes visible, so that /team finds them ready
+        await asyncio.to_thread(getattr, team, "stats")
+        self.team_columns.update(team)
+
+    async def cog_load(self) -> None:
+        await self.live_leaderboards.start()
+        await self.random_heroes.start()
+        Requester().add_refresh_listener("leaderboard", self._on_leaderboard_refresh)
+        Requester().add_refresh_listener("contributors_mini", self._on_contributors_mini_refresh)
+        Requester().add_refresh_listener("team", self._on_team_refresh)
+
+        # The cache may already be warm from the startup snapshot. A reload starts cold: it
+        # re-imports the Requester along with its cache
+        if (teams := Requester().peek("leaderboard")) is not None:
+            await self._on_leaderboard_refresh("", teams)
+        if (contributors := Requester().peek("contributors_mini")) is not None:
+            await self._on_contributors_mini_refresh("", contributors)
+        for slug, team in Requester().peek_all("team"):
+            await self._on_team_refresh(slug, team)
+        if CACHE_REFRESH_INTERVAL > 0:
+            self.refresh_cache.change_interval(seconds=CACHE_REFRESH_INTERVAL)
+            self.refresh_cache.start()
+        if CACHE_SNAPSHOT_INTERVAL > 0:
+            self.snapshot_cache.change_interval(seconds=CACHE_SNAPSHOT_INTERVAL)
+            self.snapshot_cache.start()
+
+    async def cog_unload(self) -> None:
+        self.refresh_cache.cancel()
+        self.snapshot_cache.cancel()
+        await self.live_leaderboards.stop()
+        await self.random_heroes.stop()
+        await self.team_warmer.stop()
+        Requester().remove_refresh_listener("leaderboard", self._on_leaderboard_refresh)
+        Requester().remove_refresh_listener(
+            "contributors_mini", self._on_contributors_mini_refresh
+        )
+        Requester().remove_refresh_listener("team", self._on_team_refresh)
+
+    @tasks.loop(minutes=1)
+    async def refresh_cache(self) -> None:
+        """
+        Refresh the cache entries users keep asking for before they expire.
+        """
+        # A failing upstream must not stop the loop for good
+        try:
+            if self.live_leaderboards.messages:
+                # Live leaderboards are viewers too: keep the leaderboard hot for them
+                await Requester().fetch_leaderboard()
+        except Exception:
+            logging.exception("Could not refresh the leaderboard of the live leaderboards")
+        try:
+            if refreshed := await Requester().refresh_hot_entries(CACHE_REFRESH_AHEAD):
+                logging.debug("Refreshed %s cache entries ahead of their expiration", refreshed)
+        except Exception:
+            logging.exception("Could not refresh the hot cache entries")
+
+    @tasks.loop(minutes=5)
+    async def snapshot_cache(self) -> None:
+        """
+        Persist the cache so that the bot restarts warm.
+        """
+        try:
+            await Requester().save_snapshot()
+        except Exception:
+            logging.exception("Could not snapshot the cache")
 
     @app_commands.command(description="Ping pong")
     # @app_commands.describe()
@@ -47,9 +163,9 @@ class HackSquad(commands.Cog):
 
     @staticmethod
     def hero_embed_formatter(contributor: NovuContributor) -> discord.Embed:
-        name = f"Hero: {contributor['name']}" or "Name not found"
+        name = f"Hero: {contributor.name}" or "Name not found"
 
-        last_3_pulls = contributor["pulls"][-3:]
+        last_3_pulls = contributor.pulls[-3:]
 
         embed = discord.Embed(
             title=f"{name}",
@@ -57,23 +173,23 @@ class HackSquad(commands.Cog):
         )
         embed.add_field(
             name="GitHub",
-            value=f"[{contributor['github']}](https://github.com/{contributor['github']})",
+            value=f"[{contributor.github}](https://github.com/{contributor.github})",
         )
-        embed.add_field(name="Total PRs", value=contributor["total_pulls"])
+        embed.add_field(name="Total PRs", value=contributor.total_pulls)
         embed.add_field(
-            name="Total PRs in the last 3 months", value=contributor["total_last_3_months_pulls"]
+            name="Total PRs in the last 3 months", value=contributor.total_last_3_months_pulls
         )
 
         if last_3_pulls:
             embed.description = f"**{len(last_3_pulls)} last PRs:**\n\n" + "\n".join(
-                f"[{pr['title']}]({pr['url']})" for pr in last_3_pulls
+                f"[{pr.title}]({pr.url})" for pr in last_3_pulls
             )
         else:
             embed.description = "No PRs found..."
 
-        embed.set_thumbnail(url=contributor["avatar_url"])
+        embed.set_thumbnail(url=contributor.avatar_url)
         embed.set_footer(
-            text=f"A Novu Hero: {contributor['bio'] or 'No bio'}",
+            text=f"A Novu Hero: {contributor.bio or 'No bio'}",
             icon_url="https://i.imgur.com/zXAbZMC.png",
         )
 
@@ -90,51 +206,84 @@ class HackSquad(commands.Cog):
         if page <= 0:
             await interaction.response.send_message("The page cannot be negative or 0.")
             return
-        await interaction.response.defer()
-
-        page -= 1
-
-        class MinifiedPartialTeam(TypedDict):
-            place: int
-            name: str
-            score: int
-            slug: str
+        with METRICS.phase("defer"):
+            await interaction.response.defer()
 
         results = await Requester().fetch_leaderboard()
-        results.sort(key=lambda x: x["score"], reverse=True)
-
-        teams: List[MinifiedPartialTeam] = [
-            MinifiedPartialTeam(
-                place=place, name=result["name"], score=result["score"], slug=result["slug"]
-            )
-            for place, result in enumerate(results, 1)
-        ]
+        ranking = await self.leaderboard_ranking.get(results)
 
-        list_of_teams = [teams[x : x + 10] for x in range(0, len(teams), 10)]
+        await interaction.followup.send(
+            embed=self.leaderboard_embed(ranking, page, random.choice(SOME_RANDOM_ASS_QUOTES))
+        )
 
-        # sourcery skip: min-max-identity
-        if page >= len(list_of_teams):
-            # Last page
-            page = len(list_of_teams) - 1
+    @staticmethod
+    def leaderboard_embed(ranking: LeaderboardRanking, page: int, footer: str) -> discord.Embed:
+        page, description = ranking.page(page)
 
-        teams = list_of_teams[page]
         embed = discord.Embed(
             title="Leaderboard - HackSquad 2022",
             color=HACKSQUAD_COLOR,
             url="https://hacksquad.dev/leaderboard",
+            description=description,
+        )
+        embed.set_footer(
+            text=f"Page {page}/{len(ranking.pages)}\n{footer}",
+            icon_url="https://i.imgur.com/kDynel4.png",
         )
+        return embed
 
-        embed.description = "\n".join(
-            f"`{team['place']}` : [`{team['name']}`](https://hacksquad.dev/team/{team['slug']}) with a score of **{team['score']}** PRs  (Slug: `{team['slug']}`)"
-            for team in teams
+    @classmethod
+    def live_leaderboard_embed(cls, ranking: LeaderboardRanking, page: int) -> discord.Embed:
+        embed = cls.leaderboard_embed(ranking, page, "Live leaderboard, last updated")
+        embed.timestamp = discord.utils.utcnow()
+        return embed
+
+    live_leaderboard = app_commands.Group(
+        name="liveleaderboard",
+        description="A leaderboard message that updates itself.",
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_messages=True),
+    )
+
+    @live_leaderboard.command(name="start")
+    @app_commands.describe(page="The page to show.")
+    async def live_leaderboard_start(
+        self, interaction: Interaction, *, page: app_commands.Range[int, 1, None] = 1
+    ):
+        """
+        Post a leaderboard in this channel that updates itself when the standings move.
+        """
+        with METRICS.phase("defer"):
+            await interaction.response.defer(ephemeral=True)
+
+        results = await Requester().fetch_leaderboard()
+        ranking = await self.leaderboard_ranking.get(results)
+        embed = self.live_leaderboard_embed(ranking, page)
+
+        # Sent as a regular message, since interaction messages cannot be edited after 15 minutes
+        message = await interaction.channel.send(embed=embed)  # type: ignore
+        replaced = interaction.channel_id in self.live_leaderboards.messages
+        await self.live_leaderboards.register(
+            message.channel.id, message.id, page, embed.description  # type: ignore
         )
 
-        embed.set_footer(
-            text=f"Page {page + 1}/{len(list_of_teams)}\n{random.choice(SOME_RANDOM_ASS_QUOTES)}",
-            icon_url="https://i.imgur.com/kDynel4.png",
+        await interaction.followup.send(
+            "Live leaderboard started"
+            + (", the previous one won't be updated anymore." if replaced else "."),
+            ephemeral=True,
         )
 
-        await interaction.followup.send(embed=embed)
+    @live_leaderboard.command(name="stop")
+    async def live_leaderboard_stop(self, interaction: Interaction):
+        """
+        Stop updating the live leaderboard of this channel.
+        """
+        if await self.live_leaderboards.unregister(interaction.channel_id):  # type: ignore
+            await interaction.response.send_message("Live leaderboard stopped.", ephemeral=True)
+        else:
+            await interaction.response.send_message(
+                "There is no live leaderboard in this channel.", ephemeral=True
+            )
 
     @app_commands.command()
     @app_commands.describe(
@@ -146,46 +295,49 @@ class HackSquad(commands.Cog):
 
         Use the "Slug" as the team's name.
         """
-        await interaction.response.defer()
+        with METRICS.phase("defer"):
+            await interaction.response.defer()
 
         results = await Requester().fetch_team(team_slug)
 
         embed = discord.Embed(
-            title=f"Team: {results['name']}",
-            url=f"https://hacksquad.dev/team/{results['slug']}",
+            title=f"Team: {results.name}",
+            url=f"https://hacksquad.dev/team/{results.slug}",
             color=HACKSQUAD_COLOR,
         )
 
-        if results["owner"]:
-            embed.set_thumbnail(url=results["owner"]["image"])
-            embed.add_field(name="Created By", value=results["owner"]["name"])
+        if results.owner:
+            embed.set_thumbnail(url=results.owner.image)
+            embed.add_field(name="Created By", value=results.owner.name)
 
-        embed.add_field(name="Team ID", value=results["id"])
-        embed.add_field(name="Team slug", value=results["slug"])
-        embed.add_field(name="Disqualified", value="Yes" if results["disqualified"] else "No")
+        embed.add_field(name="Team ID", value=results.id)
+        embed.add_field(name="Team slug", value=results.slug)
+        embed.add_field(name="Disqualified", value="Yes" if results.disqualified else "No")
+        # Only from the ranking at hand, a team page is not worth a leaderboard fetch
+        if (ranking := self.leaderboard_ranking.peek()) is not None and (
+            place := ranking.places.get(results.slug)
+        ):
+            embed.add_field(name="Place", value=f"{place} of {len(ranking)}")
 
         embed.add_field(
-            name=f"Members ({len(results['users'])})",
+            name=f"Members ({len(results.users)})",
             value=(
                 "\n".join(
-                    f"- [{user['name']}](https://github.com/{user['handle']}) ({user['handle']})"
-                    for user in results["users"]
+                    f"- [{user.name}](https://github.com/{user.handle}) ({user.handle})"
+                    for user in results.users
                 )
             ),
         )
 
-        results["prs"].sort(key=lambda x: x["created_at"])
+        total_prs = results.prs
+        stats = results.stats
 
-        total_prs = results["prs"]
-        accepted = [pr for pr in results["prs"] if pr["status"] == PRStatus.ACCEPTED]
-        deleted = [pr for pr in results["prs"] if pr["status"] == PRStatus.DELETED]
+        prs_ratio = round(stats.deletion_ratio, 1)
+        embed.description = f"The team `{results.name}` has realized a total of `{len(total_prs)}` pull requests, out of which `{stats.accepted}` are accepted and `{stats.deleted}` are deleted from the competition.\n(Deletion ratio: `{prs_ratio}%`)"
 
-        prs_ratio = round((len(deleted) / len(total_prs)) * 100, 1)
-        embed.description = f"The team `{results['name']}` has realized a total of `{len(total_prs)}` pull requests, out of which `{len(accepted)}` are accepted and `{len(deleted)}` are deleted from the competition.\n(Deletion ratio: `{prs_ratio}%`)"
+        last_3_prs = [total_prs[position] for position in stats.last_accepted]
 
-        last_3_prs = accepted[-3:]
-
-        if prs_str := "\n".join([f"**[{pr['title']}]({pr['url']})**" for pr in last_3_prs]):
+        if prs_str := "\n".join([f"**[{pr.title}]({pr.url})**" for pr in last_3_prs]):
             embed.description += f"\n\n**{len(last_3_prs)} last accepted PRs:**\n{prs_str}"
 
         await interaction.followup.send(embed=embed)
@@ -194,12 +346,60 @@ class HackSquad(commands.Cog):
     async def team_slug_autocomplete(
         self, _: discord.Interaction, current: str
     ) -> List[app_commands.Choice[str]]:
-        result = await Requester().fetch_leaderboard()
-        return [
-            app_commands.Choice(name=team["name"], value=team["slug"])
-            for team in result
-            if current.lower() in team["name"].lower()
-        ][:25]
+        index = await self.team_index.get(await Requester().fetch_leaderboard())
+        return [app_commands.Choice(name=name, value=slug) for name, slug in index.search(current)]
+
+    def team_stats_embed(
+        self, title: str, rows: List[Tuple[str, str, float]], value_format: str
+    ) -> discord.Embed:
+        embed = discord.Embed(title=title, color=HACKSQUAD_COLOR)
+        embed.description = (
+            "\n".join(
+                f"`{place}` : [`{name}`](https://hacksquad.dev/team/{slug}) with "
+                + value_format.format(value)
+                for place, (name, slug, value) in enumerate(rows, 1)
+            )
+            or "No team matches yet."
+        )
+        embed.set_footer(text=f"Based on the {len(self.team_columns)} teams looked at so far")
+        return embed
+
+    team_stats = app_commands.Group(
+        name="teamstats", description="Compare the teams looked at so far."
+    )
+
+    @team_stats.command(name="deletion_ratio")
+    @app_commands.describe(min_prs="Ignore the teams with fewer PRs than this.")
+    async def team_stats_deletion_ratio(
+        self, interaction: Interaction, *, min_prs: app_commands.Range[int, 1, None] = 5
+    ):
+        """
+        Show the teams with the highest share of deleted PRs.
+        """
+        rows = self.team_columns.deletion_ratios(TEAMS_PER_PAGE, min_prs)
+        await interaction.response.send_message(
+            embed=self.team_stats_embed("Highest deletion ratios", rows, "**{:.1f}%** deleted")
+        )
+
+    @team_stats.command(name="prs_per_member")
+    async def team_stats_prs_per_member(self, interaction: Interaction):
+        """
+        Show the teams with the most accepted PRs per member.
+        """
+        rows = self.team_columns.prs_per_member(TEAMS_PER_PAGE)
+        await interaction.response.send_message(
+            embed=self.team_stats_embed("Most PRs per member", rows, "**{:.1f}** PRs per member")
+        )
+
+    @team_stats.command(name="most_active")
+    async def team_stats_most_active(self, interaction: Interaction):
+        """
+        Show the teams with the most accepted PRs created in the last 24 hours.
+        """
+        rows = self.team_columns.most_active(TEAMS_PER_PAGE)
+        await interaction.response.send_message(
+            embed=self.team_stats_embed("Most active in the last 24 hours", rows, "**{:.0f}** PRs")
+        )
 
     @app_commands.command(name="search")
     @app_commands.describe(query="Your search query")
@@ -207,11 +407,14 @@ class HackSquad(commands.Cog):
         """
         Try to search for a team in the leaderboard.
         """
-        await interaction.response.defer()
+        with METRICS.phase("defer"):
+            await interaction.response.defer()
 
         results = await Requester().fetch_leaderboard()
 
-        matching = process.extract(query, [team["name"] for team in results], limit=10)
+        # Scoring every team takes a while on big leaderboards, keep the event loop free
+        engine = await self.team_search.get(results)
+        matching = await asyncio.to_thread(engine.search, query, 10)
 
         if not matching:
             await interaction.followup.send("No results were found.")
@@ -223,8 +426,8 @@ class HackSquad(commands.Cog):
         )
 
         embed.description = "\n".join(
-            f"`{place}` - `{match[0]}` (Percentage Match: `{round(match[1], 1)}%`)"
-            for place, match in enumerate(matching, 1)
+            f"`{place}` - `{name}` (Slug: `{slug}`, Percentage Match: `{round(score, 1)}%`)"
+            for place, (name, slug, score) in enumerate(matching, 1)
         )
 
         # list_str = "\n\n".join(
@@ -240,7 +443,8 @@ class HackSquad(commands.Cog):
         """
         Show the details of an hero that have contributed to Novu.
         """
-        await interaction.response.defer()
+        with METRICS.phase("defer"):
+            await interaction.response.defer()
 
         contributor = await Requester().fetch_contributor(hero)
 
@@ -250,23 +454,26 @@ class HackSquad(commands.Cog):
     async def hero_autocomplete(
         self, _: discord.Interaction, current: str
     ) -> List[app_commands.Choice[str]]:
-        result = await Requester().fetch_contributors_mini()
+        index = await self.hero_index.get(await Requester().fetch_contributors_mini())
         return [
-            app_commands.Choice(name=contributor["github"], value=contributor["github"])
-            for contributor in result
-            if current.lower() in contributor["github"].lower()
-        ][:25]
+            app_commands.Choice(name=github, value=github) for github, _ in index.search(current)
+        ]
 
     @app_commands.command()
     async def randomhero(self, interaction: Interaction):
         """
         Show the details of a random hero who have contributed to Novu.
         """
-        await interaction.response.defer()
+        # Usually answered right away from the pool, only fetched when the pool ran dry
+        if (embed := self.random_heroes.take()) is not None:
+            await interaction.response.send_message(embed=embed)
+            return
+
+        with METRICS.phase("defer"):
+            await interaction.response.defer()
 
-        contributors = await Requester().fetch_contributors_mini()
-        random_contributor = random.choice(contributors)
-        contributor = await Requester().fetch_contributor(random_contributor["github"])
+        random_contributor = await self.random_heroes.pick()
+        contributor = await Requester().fetch_contributor(random_contributor.github)
 
         await interaction.followup.send(content="", embed=self.hero_embed_formatter(contributor))
 
@@ -285,5 +492,12 @@ class HackSquad(commands.Cog):
                     f"An unexpected error happened with the HackSquad API: Status code: {error.original.code}"
                 )
             return
+        if isinstance(error, app_commands.CommandInvokeError) and isinstance(
+            error.original, CircuitOpenError
+        ):
+            await interaction.followup.send(
+                "The HackSquad API is having trouble right now, please try again in a bit."
+            )
+            return
         logging.exception(error)
         await interaction.followup.send(f"Unexpected error:\n\n```py\n{error}\n```")
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import discord
+
+from hacksquad_bot.main import HackSquadBot
+
+from .ranking import LeaderboardRanking
+
+LIVE_LEADERBOARD_EDIT_INTERVAL = float(os.environ.get("LIVE_LEADERBOARD_EDIT_INTERVAL") or 30)
+"Minimum time (in seconds) between two edits of the live leaderboard of a channel"
+
+LIVE_LEADERBOARD_PATH = os.environ.get("LIVE_LEADERBOARD_PATH") or "live_leaderboards.json"
+"Where the live leaderboard messages are remembered across restarts"
+
+
+class LiveMessage:
+    __slots__ = ("channel_id", "message_id", "page", "description", "version", "edited_at")
+
+    def __init__(
+        self, channel_id: int, message_id: int, page: int, description: Optional[str] = None
+    ) -> None:
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.page = page
+        self.description = description
+        "What the message currently shows"
+
+        self.version = 0
+        "The version of the ranking the message is known to be up to date with"
+
+        self.edited_at = 0.0
+        "When the message has last been edited, as a monotonic time"
+
+
+class LiveLeaderboardScheduler:
+    """
+    Keep live leaderboard messages up to date, one per channel.
+
+    Rankings are coalesced: when several arrive while edits are pending, only the latest one is
+    applied. A message is only edited when its page actually changed, and at most once every
+    `edit_interval` seconds. The pages of a ranking version are only compared once per message.
+    """
+
+    def __init__(
+        self,
+        bot: HackSquadBot,
+        render: Callable[[LeaderboardRanking, int], discord.Embed],
+        *,
+        edit_interval: float = LIVE_LEADERBOARD_EDIT_INTERVAL,
+        path: str = LIVE_LEADERBOARD_PATH,
+    ) -> None:
+        self.bot = bot
+        self.render = render
+        self.edit_interval = edit_interval
+        self.path = path
+
+        self.messages: Dict[int, LiveMessage] = {}
+        self._ranking: Optional[LeaderboardRanking] = None
+        self._wake = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        self.edits = 0
+        "Number of edited messages"
+
+        self.skipped = 0
+        "Number of messages left untouched as their page did not change"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as file:
+            for message in json.load(file):
+                self.messages[message["channel_id"]] = LiveMessage(
+                    message["channel_id"], message["message_id"], message["page"]
+                )
+
+    def _save(self, messages: List[Dict[str, int]]) -> None:
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(messages, file)
+
+    async def _persist(self) -> None:
+        messages = [
+            {"channel_id": m.channel_id, "message_id": m.message_id, "page": m.page}
+            for m in self.messages.values()
+        ]
+        try:
+            await asyncio.to_thread(self._save, messages)
+        except OSError:
+            logging.exception("Could not save the live leaderboards")
+
+    async def start(self) -> None:
+        try:
+            await asyncio.to_thread(self._load)
+        except (OSError, ValueError, KeyError):
+            logging.exception("Could not load the live leaderboards")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def register(
+        self, channel_id: int, message_id: int, page: int, description: str
+    ) -> None:
+        """
+        Make a message the live leaderboard of its channel, replacing the previous one.
+        """
+        message = LiveMessage(channel_id, message_id, page, description)
+        message.edited_at = time.monotonic()
+        self.messages[channel_id] = message
+        await self._persist()
+
+    async def unregister(self, channel_id: int) -> bool:
+        if self.messages.pop(channel_id, None) is None:
+            return False
+        await self._persist()
+        return True
+
+    def notify(self, ranking: LeaderboardRanking) -> None:
+        """
+        Schedule the live messages to show `ranking`.
+        """
+        self._ranking = ranking
+        self._wake.set()
+
+    async def _run(self) -> None:
+        timeout: Optional[float] = None
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                timeout = await self._flush()
+            except Exception:
+                logging.exception("Could not update the live leaderboards")
+                timeout = self.edit_interval
+
+    async def _flush(self) -> Optional[float]:
+        """
+        Edit the messages that are outdated and allowed to be edited.
+
+        Returns
+        -------
+        Optional[float]
+            In how many seconds the remaining outdated messages can be edited, if any.
+        """
+        ranking = self._ranking
+        if ranking is None:
+            return None
+
+        now = time.monotonic()
+        next_due: Optional[float] = None
+        to_edit: List[LiveMessage] = []
+        for message in list(self.messages.values()):
+            if message.version == ranking.version:
+                continue
+            _, description = ranking.page(message.page)
+            if description == message.description:
+                message.version = ranking.version
+                self.skipped += 1
+                continue
+            wait = message.edited_at + self.edit_interval - now
+            if wait > 0:
+                next_due = wait if next_due is None else min(next_due, wait)
+                continue
+            to_edit.append(message)
+
+        await asyncio.gather(*(self._edit(message, ranking) for message in to_edit))
+        return next_due
+
+    async def _edit(self, message: LiveMessage, ranking: LeaderboardRanking) -> None:
+        embed = self.render(ranking, message.page)
+        message.edited_at = time.monotonic()
+        try:
+            await (
+                self.bot.get_partial_messageable(message.channel_id)
+                .get_partial_message(message.message_id)
+                .edit(embed=embed)
+            )
+        except (discord.NotFound, discord.Forbidden):
+            # The message or our access to the channel is gone, stop updating it
+            await self.unregister(message.channel_id)
+            return
+        except discord.HTTPException:
+            logging.exception("Could not edit the live leaderboard of %s", message.channel_id)
+            return
+        message.description = embed.description
+        message.version = ranking.version
+        self.edits += 1
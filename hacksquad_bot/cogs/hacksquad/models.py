@@ -0,0 +1,521 @@
+import ast
+import sys
+from array import array
+from datetime import datetime
+from enum import Enum, auto
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from hacksquad_bot.utils import fastjson
+from hacksquad_bot.utils.lazy import LazyList
+from hacksquad_bot.utils.timestamps import LazyTimestamp, parse_timestamp
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Values repeated across many records (handles, states...) are stored only once
+    return sys.intern(value) if value is not None else None
+
+
+class Model:
+    """
+    Base of the cached models.
+
+    Models are slotted to keep the cache small, and still support `model["field"]` lookups.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def _fields(cls) -> Iterator[str]:
+        for klass in reversed(cls.__mro__):
+            yield from klass.__dict__.get("__slots__", ())
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __repr__(self) -> str:
+        fields = " ".join(f"{field}={getattr(self, field)!r}" for field in self._fields())
+        return f"<{self.__class__.__name__} {fields}>"
+
+
+class User(Model):
+    __slots__ = (
+        "_created_at",
+        "id",
+        "name",
+        "email_verified",
+        "image",
+        "moderator",
+        "handle",
+        "team_id",
+        "disqualified",
+        "github_user_id",
+    )
+
+    created_at: datetime = LazyTimestamp("_created_at")  # type: ignore
+    "When the user has been created"
+
+    id: str
+    "Unique ID of the user"
+
+    name: str
+    "The name of the user"
+
+    email_verified: bool
+    "If the user's email has been verified"
+
+    image: str
+    "An URL to the user's GitHub's image"
+
+    moderator: bool
+    "If the user is a moderator of the event"
+
+    handle: str
+    "The GitHub handle/name"
+
+    team_id: str
+    "ID of team the user has joined"
+
+    disqualified: bool
+    "If the user has been disqualified during the event"
+
+    github_user_id: Optional[Any]
+    "An unknown value"
+
+    def __init__(
+        self,
+        *,
+        created_at: Union[str, datetime],
+        id: str,
+        name: str,
+        email_verified: bool,
+        image: str,
+        moderator: bool,
+        handle: str,
+        team_id: str,
+        disqualified: bool,
+        github_user_id: Optional[Any],
+    ) -> None:
+        self.created_at = created_at
+        self.id = id
+        self.name = name
+        self.email_verified = email_verified
+        self.image = image
+        self.moderator = moderator
+        self.handle = handle
+        self.team_id = team_id
+        self.disqualified = disqualified
+        self.github_user_id = github_user_id
+
+    @classmethod
+    def from_payload(cls, user: Dict[str, Any]) -> "User":
+        return cls(
+            created_at=user["createdAt"],
+            id=user["id"],
+            name=user["name"],
+            email_verified=user["emailVerified"],
+            image=user["image"],
+            moderator=user["moderator"],
+            handle=_intern(user["handle"]),  # type: ignore
+            team_id=_intern(user["teamId"]),  # type: ignore
+            disqualified=user["disqualified"],
+            github_user_id=user["githubUserId"],
+        )
+
+
+class PartialTeam(Model):
+    __slots__ = ("place", "id", "name", "score", "slug")
+
+    place: Optional[int]
+    "The place of the team in the leaderboard"
+
+    id: str
+    "The team's unique ID"
+
+    name: str
+    "The team's name"
+
+    score: int
+    "The team's score/total PRs"
+
+    slug: str
+    "The unique slug of the team"
+
+    def __init__(self, *, place: Optional[int], id: str, name: str, score: int, slug: str) -> None:
+        self.place = place
+        self.id = id
+        self.name = name
+        self.score = score
+        self.slug = slug
+
+    @classmethod
+    def from_payload(cls, team: Dict[str, Any]) -> "PartialTeam":
+        return cls(
+            place=None,
+            id=team["id"],
+            name=team["name"],
+            score=team["score"],
+            slug=_intern(team["slug"]),  # type: ignore
+        )
+
+
+class PRStatus(Enum):
+    ACCEPTED = auto()
+    DELETED = auto()
+
+    @classmethod
+    def from_payload(cls, pr: Dict[str, Any]) -> "PRStatus":
+        return cls.DELETED if pr.get("status", "ACCEPTED") == "DELETED" else cls.ACCEPTED
+
+
+class PR(Model):
+    __slots__ = ("id", "_created_at", "title", "url", "status")
+
+    id: str
+    "ID of pull request in HackSquad"
+
+    created_at: datetime = LazyTimestamp("_created_at")  # type: ignore
+    "When the PR has been created"
+
+    title: str
+    "The PR's title"
+
+    url: str
+    "The PR's URL"
+
+    status: PRStatus
+
+    def __init__(
+        self, *, id: str, created_at: Union[str, datetime], title: str, url: str, status: PRStatus
+    ) -> None:
+        self.id = id
+        self.created_at = created_at
+        self.title = title
+        self.url = url
+        self.status = status
+
+    @classmethod
+    def from_payload(cls, pr: Dict[str, Any]) -> "PR":
+        return cls(
+            id=pr["id"],
+            created_at=pr["createdAt"],
+            title=pr["title"],
+            url=pr["url"],
+            status=PRStatus.from_payload(pr),
+        )
+
+
+class PRList(LazyList[PR]):
+    """
+    The PRs of a team, only turned into `PR` objects when accessed.
+    """
+
+    __slots__ = ()
+
+
+class PRStats(NamedTuple):
+    """
+    Aggregates of the PRs of a team, computed in a single pass over them.
+    """
+
+    accepted: int
+    deleted: int
+
+    last_accepted: Tuple[int, ...]
+    "Positions of the most recently created accepted PRs, oldest first"
+
+    accepted_times: "array[float]"
+    "When the accepted PRs have been created, as sorted UNIX timestamps"
+
+    @property
+    def total(self) -> int:
+        return self.accepted + self.deleted
+
+    @property
+    def deletion_ratio(self) -> float:
+        """
+        The percentage of deleted PRs, 0 for a team without PRs.
+        """
+        return self.deleted / self.total * 100 if self.total else 0.0
+
+
+def compute_pr_stats(prs: PRList, last: int = 3) -> PRStats:
+    accepted: List[Tuple[str, int]] = []
+    deleted = 0
+    for position, pr in enumerate(prs.raw):
+        if PRStatus.from_payload(pr) is PRStatus.DELETED:
+            deleted += 1
+        else:
+            accepted.append((pr["createdAt"], position))
+    # ISO-8601 timestamps from the same API sort chronologically as strings
+    accepted.sort()
+    return PRStats(
+        accepted=len(accepted),
+        deleted=deleted,
+        last_accepted=tuple(position for _, position in accepted[-last:]) if last else (),
+        accepted_times=array(
+            "d", (parse_timestamp(created_at).timestamp() for created_at, _ in accepted)
+        ),
+    )
+
+
+def decode_prs(prs: str) -> PRList:
+    """
+    Decode the stringified PR list of a team.
+
+    The list is parsed by the fastest available JSON backend, falling back to a Python literal
+    parser for payloads that are not valid JSON.
+    """
+    try:
+        raw = fastjson.loads(prs)
+    except ValueError:
+        raw = ast.literal_eval(prs)
+    return PRList(raw, PR.from_payload)
+
+
+class Team(PartialTeam):
+    __slots__ = (
+        "owner_id",
+        "owner",
+        "prs",
+        "github_team_id",
+        "allow_auto_assign",
+        "disqualified",
+        "users",
+        "_stats",
+    )
+
+    owner_id: str
+    "The ID of the owner of the team"
+
+    owner: Optional[User]
+    "The owner, as a User object. Can be optional."
+
+    prs: PRList
+    "The PRs realized by the team"
+
+    github_team_id: Optional[Any]
+    "An unknown value"
+
+    allow_auto_assign: bool
+    "If the team allows auto assignment of members"
+
+    disqualified: bool
+    "If the team has been disqualified during the event"
+
+    users: List[User]
+
+    def __init__(
+        self,
+        *,
+        place: Optional[int],
+        id: str,
+        name: str,
+        score: int,
+        slug: str,
+        owner_id: str,
+        owner: Optional[User],
+        prs: PRList,
+        github_team_id: Optional[Any],
+        allow_auto_assign: bool,
+        disqualified: bool,
+        users: List[User],
+    ) -> None:
+        super().__init__(place=place, id=id, name=name, score=score, slug=slug)
+        self.owner_id = owner_id
+        self.owner = owner
+        self.prs = prs
+        self.github_team_id = github_team_id
+        self.allow_auto_assign = allow_auto_assign
+        self.disqualified = disqualified
+        self.users = users
+        self._stats: Optional[PRStats] = None
+
+    @property
+    def stats(self) -> PRStats:
+        """
+        Aggregates of the PRs, computed on first access and kept with the team.
+        """
+        # Teams restored from an older snapshot do not have the slot set
+        if getattr(self, "_stats", None) is None:
+            self._stats = compute_pr_stats(self.prs)
+        return self._stats  # type: ignore
+
+    @classmethod
+    def from_payload(cls, team: Dict[str, Any]) -> "Team":
+        users = [User.from_payload(user) for user in team["users"]]
+        return cls(
+            place=None,
+            id=team["id"],
+            name=team["name"],
+            score=team["score"],
+            slug=_intern(team["slug"]),  # type: ignore
+            owner_id=team["ownerId"],
+            # The owner is one of the members, share the same object
+            owner=next((user for user in users if user.id == team["ownerId"]), None),
+            # The PRs are sent as a stringified list, only decoded into PR objects when needed
+            prs=decode_prs(team["prs"]),
+            github_team_id=team["githubTeamId"],
+            allow_auto_assign=team["allowAutoAssign"],
+            disqualified=team["disqualified"],
+            users=users,
+        )
+
+
+class NovuPR(Model):
+    __slots__ = (
+        "gh_api_url",
+        "url",
+        "pr_number",
+        "state",
+        "locked",
+        "title",
+        "_created_at",
+        "_updated_at",
+        "_closed_at",
+        "_merged_at",
+    )
+
+    gh_api_url: str
+    url: str
+    pr_number: int
+    state: str
+    locked: bool
+    title: str
+    created_at: datetime = LazyTimestamp("_created_at")  # type: ignore
+    updated_at: Optional[datetime] = LazyTimestamp("_updated_at")  # type: ignore
+    closed_at: Optional[datetime] = LazyTimestamp("_closed_at")  # type: ignore
+    merged_at: Optional[datetime] = LazyTimestamp("_merged_at")  # type: ignore
+
+    def __init__(
+        self,
+        *,
+        gh_api_url: str,
+        url: str,
+        pr_number: int,
+        state: str,
+        locked: bool,
+        title: str,
+        created_at: Union[str, datetime],
+        updated_at: Union[str, datetime, None],
+        closed_at: Union[str, datetime, None],
+        merged_at: Union[str, datetime, None],
+    ) -> None:
+        self.gh_api_url = gh_api_url
+        self.url = url
+        self.pr_number = pr_number
+        self.state = state
+        self.locked = locked
+        self.title = title
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.closed_at = closed_at
+        self.merged_at = merged_at
+
+    @classmethod
+    def from_payload(cls, pull: Dict[str, Any]) -> "NovuPR":
+        return cls(
+            gh_api_url=pull["url"],
+            url=pull["html_url"],
+            pr_number=pull["number"],
+            state=_intern(pull["state"]),  # type: ignore
+            locked=pull["locked"],
+            title=pull["title"],
+            created_at=pull["created_at"],
+            updated_at=pull["updated_at"],
+            closed_at=pull["closed_at"],
+            merged_at=pull["merged_at"],
+        )
+
+
+class NovuContributor(Model):
+    __slots__ = (
+        "github",
+        "name",
+        "avatar_url",
+        "total_last_3_months_pulls",
+        "total_pulls",
+        "bio",
+        "_created_at",
+        "pulls",
+    )
+
+    github: str
+    name: Optional[str]
+    avatar_url: str
+    total_last_3_months_pulls: Optional[int]
+    total_pulls: Optional[int]
+    bio: Optional[str]
+    created_at: datetime = LazyTimestamp("_created_at")  # type: ignore
+    pulls: List[NovuPR]
+
+    def __init__(
+        self,
+        *,
+        github: str,
+        name: Optional[str],
+        avatar_url: str,
+        total_last_3_months_pulls: Optional[int],
+        total_pulls: Optional[int],
+        bio: Optional[str],
+        created_at: Union[str, datetime],
+        pulls: List[NovuPR],
+    ) -> None:
+        self.github = github
+        self.name = name
+        self.avatar_url = avatar_url
+        self.total_last_3_months_pulls = total_last_3_months_pulls
+        self.total_pulls = total_pulls
+        self.bio = bio
+        self.created_at = created_at
+        self.pulls = pulls
+
+    @classmethod
+    def from_payload(cls, contributor: Dict[str, Any]) -> "NovuContributor":
+        return cls(
+            github=_intern(contributor["github"]),  # type: ignore
+            name=contributor.get("name"),
+            avatar_url=contributor["avatar_url"],
+            total_last_3_months_pulls=contributor.get("totalLast3MonthsPulls"),
+            total_pulls=contributor.get("totalPulls"),
+            bio=contributor["bio"],
+            created_at=contributor["created_at"],
+            pulls=[NovuPR.from_payload(pull) for pull in contributor["pulls"]],
+        )
+
+
+class NovuContributorMini(Model):
+    __slots__ = ("_id", "github", "name", "avatar_url", "total_pulls")
+
+    _id: str
+    github: str
+    name: Optional[str]
+    avatar_url: str
+    total_pulls: Optional[int]
+
+    def __init__(
+        self,
+        *,
+        _id: str,
+        github: str,
+        name: Optional[str],
+        avatar_url: str,
+        total_pulls: Optional[int],
+    ) -> None:
+        self._id = _id
+        self.github = github
+        self.name = name
+        self.avatar_url = avatar_url
+        self.total_pulls = total_pulls
+
+    @classmethod
+    def from_payload(cls, contributor: Dict[str, Any]) -> "NovuContributorMini":
+        return cls(
+            _id=contributor["_id"],
+            github=_intern(contributor["github"]),  # type: ignore
+            name=contributor.get("name"),
+            avatar_url=contributor["avatar_url"],
+            total_pulls=contributor.get("totalPulls"),
+        )
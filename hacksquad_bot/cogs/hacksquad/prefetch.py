@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from itertools import accumulate
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+import discord
+
+from hacksquad_bot.utils.governor import CircuitOpenError
+from hacksquad_bot.utils.metrics import METRICS
+
+from .models import NovuContributor, NovuContributorMini
+from .search import DerivedIndex
+from .utils import Requester, ResponseError
+
+RANDOM_HERO_POOL_SIZE = int(os.environ.get("RANDOM_HERO_POOL_SIZE") or 10)
+"How many random heroes are kept ready for /randomhero. 0 disables the pool."
+
+RANDOM_HERO_POOL_CONCURRENCY = int(os.environ.get("RANDOM_HERO_POOL_CONCURRENCY") or 2)
+"How many heroes are fetched at the same time to refill the pool"
+
+RANDOM_HERO_POOL_INTERVAL = float(os.environ.get("RANDOM_HERO_POOL_INTERVAL") or 1)
+"Minimum time (in seconds) between two fetches started to refill the pool"
+
+RANDOM_HERO_POOL_MAX_AGE = float(os.environ.get("RANDOM_HERO_POOL_MAX_AGE") or 900)
+"How long (in seconds) a hero waits in the pool before being considered outdated"
+
+RANDOM_HERO_WEIGHTED = os.environ.get("RANDOM_HERO_WEIGHTED") == "1"
+"Whether heroes with more PRs are picked more often"
+
+# Waited after a failed fetch, so that a broken upstream is not hammered
+_FAILURE_DELAY = 30.0
+
+
+def _cumulative_weights(contributors: List[NovuContributorMini]) -> List[int]:
+    # Heroes without PRs still get a chance
+    return list(accumulate(max(contributor.total_pulls or 0, 1) for contributor in contributors))
+
+
+class RandomHeroPool:
+    """
+    Keep a reservoir of random heroes, fully fetched and rendered, so that /randomhero answers
+    without waiting for upstream.
+
+    The pool is refilled in the background as heroes are taken out, by at most `concurrency`
+    fetches at a time and one new fetch every `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[NovuContributor], discord.Embed],
+        *,
+        size: int = RANDOM_HERO_POOL_SIZE,
+        concurrency: int = RANDOM_HERO_POOL_CONCURRENCY,
+        interval: float = RANDOM_HERO_POOL_INTERVAL,
+        max_age: float = RANDOM_HERO_POOL_MAX_AGE,
+        weighted: bool = RANDOM_HERO_WEIGHTED,
+    ) -> None:
+        self.render = render
+        self.size = size
+        self.interval = interval
+        self.max_age = max_age
+        self.weighted = weighted
+
+        self._heroes: Deque[Tuple[float, discord.Embed]] = deque()
+        "The rendered heroes, with when they have been fetched as a monotonic time"
+
+        self._weights: DerivedIndex[List[NovuContributorMini], List[int]] = DerivedIndex(
+            _cumulative_weights
+        )
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self._pending = 0
+        self._wake = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._fetches: Set["asyncio.Task[None]"] = set()
+
+    def __len__(self) -> int:
+        return len(self._heroes)
+
+    async def start(self) -> None:
+        if self.size > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for fetch in self._fetches:
+            fetch.cancel()
+
+    def _drop_outdated(self) -> None:
+        oldest_allowed = time.monotonic() - self.max_age
+        while self._heroes and self._heroes[0][0] < oldest_allowed:
+            self._heroes.popleft()
+
+    def take(self) -> Optional[discord.Embed]:
+        """
+        Take a hero out of the pool, if one is ready.
+        """
+        self._drop_outdated()
+        self._wake.set()
+        if not self._heroes:
+            METRICS.increment("random_hero_pool_total", outcome="miss")
+            return None
+        METRICS.increment("random_hero_pool_total", outcome="hit")
+        return self._heroes.popleft()[1]
+
+    async def pick(self) -> NovuContributorMini:
+        """
+        Pick a random hero, weighted by their number of PRs if the pool is weighted.
+        """
+        contributors = await Requester().fetch_contributors_mini()
+        if not self.weighted:
+            return random.choice(contributors)
+        weights = await self._weights.get(contributors)
+        return random.choices(contributors, cum_weights=weights)[0]
+
+    async def _fetch(self) -> None:
+        try:
+            async with self._semaphore:
+                contributor = await Requester().fetch_contributor((await self.pick()).github)
+                self._heroes.append((time.monotonic(), self.render(contributor)))
+        except ResponseError as error:
+            # A hero missing upstream is not a reason to slow down
+            logging.debug("Could not prefetch a random hero: %r", error)
+            if error.code != 404:
+                await asyncio.sleep(_FAILURE_DELAY)
+        except CircuitOpenError as error:
+            await asyncio.sleep(max(error.retry_in, self.interval))
+        except Exception:
+            logging.exception("Could not prefetch a random hero")
+            await asyncio.sleep(_FAILURE_DELAY)
+        finally:
+            self._pending -= 1
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            if len(self._heroes) + self._pending >= self.size:
+                self._wake.clear()
+                # Woken up when a hero is taken, or when the oldest one gets outdated
+                timeout = (
+                    self._heroes[0][0] + self.max_age - time.monotonic() if self._heroes else None
+                )
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._drop_outdated()
+                continue
+            self._pending += 1
+            fetch = asyncio.create_task(self._fetch())
+            self._fetches.add(fetch)
+            fetch.add_done_callback(self._fetches.discard)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,61 @@
+import itertools
+from typing import Dict, List, Tuple
+
+from .models import PartialTeam
+
+TEAMS_PER_PAGE = 10
+
+_versions = itertools.count(1)
+
+
+def render_team_line(place: int, team: PartialTeam) -> str:
+    return f"`{place}` : [`{team.name}`](https://hacksquad.dev/team/{team.slug}) with a score of **{team.score}** PRs  (Slug: `{team.slug}`)"
+
+
+class LeaderboardRanking:
+    """
+    The teams of a leaderboard, ranked once per refresh, with their pages already rendered.
+
+    The leaderboard list itself is left untouched, as other commands keep reading it.
+    """
+
+    def __init__(self, teams: List[PartialTeam]) -> None:
+        self.version = next(_versions)
+        "Increases every time a ranking is built"
+
+        self.teams: List[Tuple[int, PartialTeam]] = list(
+            enumerate(sorted(teams, key=lambda team: team.score, reverse=True), 1)
+        )
+        "The (place, team) pairs, best team first"
+
+        self.places: Dict[str, int] = {team.slug: place for place, team in self.teams}
+        "The place of each team, by slug"
+
+        self.pages: List[str] = [
+            "\n".join(
+                render_team_line(place, team)
+                for place, team in self.teams[start : start + TEAMS_PER_PAGE]
+            )
+            for start in range(0, len(self.teams), TEAMS_PER_PAGE)
+        ] or ["No team has joined the leaderboard yet."]
+        "The description of each page"
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def page(self, page: int) -> Tuple[int, str]:
+        """
+        Get a page of the leaderboard, the last one if `page` is too big.
+
+        Parameters
+        ----------
+        page : int
+            The page number, starting at 1.
+
+        Returns
+        -------
+        Tuple[int, str]
+            The number of the returned page and its description.
+        """
+        page = max(1, min(page, len(self.pages)))
+        return page, self.pages[page - 1]
@@ -0,0 +1,215 @@
+import asyncio
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from hacksquad_bot.utils.singleflight import SingleFlight
+
+T = TypeVar("T")
+IndexT = TypeVar("IndexT")
+
+MAX_CHOICES = 25
+"Discord does not accept more choices than this in an autocomplete response"
+
+RECENT_SEARCHES = 256
+"How many search results each fuzzy search engine remembers"
+
+
+def normalize(text: str) -> str:
+    return text.casefold()
+
+
+def _ngrams(key: str, n: int) -> Iterable[str]:
+    return {key[i : i + n] for i in range(len(key) - n + 1)}
+
+
+class AutocompleteIndex:
+    """
+    A search index over (name, value) pairs, built once and queried on every keystroke.
+
+    Names are normalized ahead of time. Prefix matches are found with a binary search over the
+    sorted names, infix matches through bigram and trigram postings. Prefix matches are ranked
+    first.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, str]]) -> None:
+        self.names: List[str] = []
+        self.values: List[str] = []
+        self._keys: List[str] = []
+        for name, value in items:
+            self.names.append(name)
+            self.values.append(value)
+            self._keys.append(normalize(name))
+
+        # Positions of the entries, sorted by their normalized name
+        self._sorted = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+        self._sorted_keys = [self._keys[position] for position in self._sorted]
+
+        postings: Dict[str, array] = {}
+        for position, key in enumerate(self._keys):
+            for ngram in (*_ngrams(key, 2), *_ngrams(key, 3)):
+                if (posting := postings.get(ngram)) is None:
+                    posting = postings[ngram] = array("I")
+                posting.append(position)
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _prefix_matches(self, query: str, limit: int) -> List[int]:
+        start = bisect_left(self._sorted_keys, query)
+        matches: List[int] = []
+        for i in range(start, min(start + limit, len(self._sorted_keys))):
+            if not self._sorted_keys[i].startswith(query):
+                break
+            matches.append(self._sorted[i])
+        return matches
+
+    def _infix_candidates(self, query: str) -> Iterable[int]:
+        if len(query) < 2:
+            # Single characters match a lot, so the scan stops early
+            return range(len(self._keys))
+
+        postings = [self._postings.get(ngram) for ngram in _ngrams(query, min(len(query), 3))]
+        if not all(postings):
+            return ()
+        return min(postings, key=len)  # type: ignore
+
+    def search(self, query: str, limit: int = MAX_CHOICES) -> List[Tuple[str, str]]:
+        """
+        Return up to `limit` (name, value) pairs whose name contains `query`.
+        """
+        query = normalize(query)
+        if not query:
+            return list(zip(self.names[:limit], self.values[:limit]))
+
+        positions = self._prefix_matches(query, limit)
+        if len(positions) < limit:
+            seen = set(positions)
+            for position in self._infix_candidates(query):
+                if position not in seen and query in self._keys[position]:
+                    positions.append(position)
+                    if len(positions) >= limit:
+                        break
+
+        return [(self.names[position], self.values[position]) for position in positions]
+
+
+class FuzzySearchEngine:
+    """
+    Fuzzy search over (name, slug) pairs.
+
+    Both fields are preprocessed once, so each query only pays for the batched scoring of
+    rapidfuzz. An entry's score is the best score among its fields.
+    The most recent results are kept, since the engine is rebuilt whenever the data changes.
+    Searches can run from several threads at once.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, str]]) -> None:
+        # rapidfuzz is only imported once an engine gets built, which keeps it out of the startup
+        from rapidfuzz.utils import default_process
+
+        self.names: List[str] = []
+        self.slugs: List[str] = []
+        for name, slug in items:
+            self.names.append(name)
+            self.slugs.append(slug)
+
+        self._fields = (
+            [default_process(name) for name in self.names],
+            [default_process(slug) for slug in self.slugs],
+        )
+        self._recent: "OrderedDict[Tuple[str, int, float], List[Tuple[str, str, float]]]" = (
+            OrderedDict()
+        )
+        # Guards the recent results, the scoring itself runs without it
+        self._recent_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(
+        self, query: str, limit: int = 10, score_cutoff: float = 50
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Return up to `limit` (name, slug, score) tuples, best match first.
+        """
+        from rapidfuzz import fuzz, process
+        from rapidfuzz.utils import default_process
+
+        query = default_process(query)
+        if not query:
+            return []
+
+        recent_key = (query, limit, score_cutoff)
+        with self._recent_lock:
+            if (recent := self._recent.get(recent_key)) is not None:
+                self._recent.move_to_end(recent_key)
+                return recent
+
+        scores: Dict[int, float] = {}
+        for choices in self._fields:
+            for _, score, position in process.extract(
+                query,
+                choices,
+                scorer=fuzz.WRatio,
+                processor=None,
+                limit=limit,
+                score_cutoff=score_cutoff,
+            ):
+                if score > scores.get(position, -1):
+                    scores[position] = score
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = [(self.names[position], self.slugs[position], score) for position, score in best]
+
+        with self._recent_lock:
+            self._recent[recent_key] = results
+            if len(self._recent) > RECENT_SEARCHES:
+                self._recent.popitem(last=False)
+        return results
+
+
+class DerivedIndex(Generic[T, IndexT]):
+    """
+    Keep an index derived from a cached payload, rebuilt in a thread whenever the payload changes.
+
+    The index is rebuilt when `update` is called by a cache refresh. Readers get the latest index
+    built, even when their payload is newer: its refresh is already rebuilding it, and building it
+    on the event loop instead would block the bot. Only the first index is waited for.
+    """
+
+    def __init__(self, builder: Callable[[T], IndexT]) -> None:
+        self._builder = builder
+        self._source: Optional[T] = None
+        self._index: Optional[IndexT] = None
+        self._started = 0
+        "Number of builds started, used to order them"
+        self._installed = 0
+        "Number of the build the current index comes from"
+        self._first_build = SingleFlight()
+
+    async def update(self, source: T) -> IndexT:
+        if source is self._source and self._index is not None:
+            return self._index
+        self._started += 1
+        build = self._started
+        index = await asyncio.to_thread(self._builder, source)
+        # Builds may finish out of order, an index is never replaced by an older one
+        if build > self._installed:
+            self._source, self._index, self._installed = source, index, build
+        assert self._index is not None
+        return self._index
+
+    def peek(self) -> Optional[IndexT]:
+        """
+        Get the latest index built, if any, without waiting for one.
+        """
+        return self._index
+
+    async def get(self, source: T) -> IndexT:
+        if self._index is None:
+            return await self._first_build.do("derived_index", lambda: self.update(source))
+        return self._index
@@ -1,345 +1,713 @@
-import ast
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import time
 from datetime import datetime, timedelta
-from enum import Enum, auto
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+from urllib.parse import urlsplit
 
 import aiohttp
-from dateutil.parser import isoparse
 from discord import Color
 
+from hacksquad_bot.utils import fastjson
+from hacksquad_bot.utils.cache import Cache, CacheEntry, CacheNamespace, CacheState
+from hacksquad_bot.utils.governor import CircuitOpenError, Governor
+from hacksquad_bot.utils.http import SessionPool, Validators
+from hacksquad_bot.utils.metrics import METRICS, MetricFamily, Sample
 from hacksquad_bot.utils.objects import Singleton
+from hacksquad_bot.utils.persistence import CACHE_SNAPSHOT_INTERVAL, CacheSnapshot, SnapshotEntry
+from hacksquad_bot.utils.shared_cache import (
+    CacheBackend,
+    RedisError,
+    SharedEntry,
+    SignatureError,
+    create_backend,
+    lock_token,
+)
+from hacksquad_bot.utils.singleflight import SingleFlight
 
-HACKSQUAD_COLOR = Color.from_rgb(255, 0, 149)
-
-
-class ResponseError(Exception):
-    """Something went wrong with the response"""
-
-    code: int
-
-    def __init__(self, status_code: int) -> None:
-        self.code = status_code
-
-
-class User(TypedDict):
-    created_at: datetime
-    "When the user has been created"
-
-    id: str
-    "Unique ID of the user"
-
-    name: str
-    "The name of the user"
-
-    email_verified: bool
-    "If the user's email has been verified"
-
-    image: str
-    "An URL to the user's GitHub's image"
+from .models import NovuContributor, NovuContributorMini, PartialTeam, Team
 
-    moderator: bool
-    "If the user is a moderator of the event"
+T = TypeVar("T")
 
-    handle: str
-    "The GitHub handle/name"
-
-    team_id: str
-    "ID of team the user has joined"
-
-    disqualified: bool
-    "If the user has been disqualified during the event"
+HACKSQUAD_COLOR = Color.from_rgb(255, 0, 149)
 
-    github_user_id: Optional[Any]
-    "An unknown value"
+HACKSQUAD_URL = (os.environ.get("HACKSQUAD_URL") or "https://www.hacksquad.dev").rstrip("/")
+"Base URL of the HackSquad API, overridable to point the bot at a local stand-in"
 
+NOVU_CONTRIBUTORS_URL = (
+    os.environ.get("NOVU_CONTRIBUTORS_URL") or "https://contributors.novu.co"
+).rstrip("/")
+"Base URL of the Novu contributors API, overridable to point the bot at a local stand-in"
 
-class PartialTeam(TypedDict):
-    place: Optional[int]
-    "The place of the team in the leaderboard"
+HACKSQUAD_HOST = urlsplit(HACKSQUAD_URL).netloc
+NOVU_CONTRIBUTORS_HOST = urlsplit(NOVU_CONTRIBUTORS_URL).netloc
 
-    id: str
-    "The team's unique ID"
+NAMESPACE_HOSTS = {
+    "leaderboard": HACKSQUAD_HOST,
+    "team": HACKSQUAD_HOST,
+    "contributor": NOVU_CONTRIBUTORS_HOST,
+    "contributors_mini": NOVU_CONTRIBUTORS_HOST,
+}
+"The upstream host each cache namespace is loaded from"
 
-    name: str
-    "The team's name"
+SHARED_LOCK_TIMEOUT = 30.0
+"How long (in seconds) a process waits for another one to load an entry before loading it too"
 
-    score: int
-    "The team's score/total PRs"
+SHARED_LOCK_POLL_INTERVAL = 0.1
+"How often (in seconds) the shared cache is checked while another process loads an entry"
 
-    slug: str
-    "The unique slug of the team"
+SHARED_CACHE_ERRORS = (
+    OSError,
+    sqlite3.Error,
+    RedisError,
+    asyncio.IncompleteReadError,
+    pickle.UnpicklingError,
+    SignatureError,
+)
+"Failures of the shared cache, after which entries are loaded without it"
 
+CACHE_STALE_TIME = timedelta(seconds=float(os.environ.get("CACHE_STALE_SECONDS") or 24 * 3600))
+"How long an expired entry can still be served while it is being refreshed in the background"
 
-class PRStatus(Enum):
-    ACCEPTED = auto()
-    DELETED = auto()
+CACHE_HOT_TIME = timedelta(seconds=float(os.environ.get("CACHE_HOT_SECONDS") or 3600))
+"How recently an entry must have been used to be proactively refreshed"
 
 
-class PR(TypedDict):
-    id: str
-    "ID of pull request in HackSquad"
+# Read at once from a response body left over by a streaming decoder
+_DRAIN_CHUNK_SIZE = 64 * 1024
 
-    created_at: datetime
-    "When the PR has been created"
 
-    title: str
-    "The PR's title"
+class NotModified(Exception):
+    """The upstream data did not change since it has been cached"""
 
-    url: str
-    "The PR's URL"
+    reason: str
+    "`not_modified` if upstream answered 304 Not Modified, `same_content` if it sent the same body"
 
-    status: PRStatus
+    def __init__(self, reason: str) -> None:
+        self.reason = reason
 
 
-class Team(PartialTeam):
-    owner_id: str
-    "The ID of the owner of the team"
+class ResponseError(Exception):
+    """Something went wrong with the response"""
 
-    owner: Optional[User]
-    "The owner, as a User object. Can be optional."
+    code: int
 
-    prs: List[PR]
-    "The PRs realized by the team"
+    retry_after: Optional[float]
+    "How long (in seconds) the server asked to wait before retrying, if it did"
 
-    github_team_id: Optional[Any]
-    "An unknown value"
+    def __init__(self, status_code: int, retry_after: Optional[float] = None) -> None:
+        self.code = status_code
+        self.retry_after = retry_after
 
-    allow_auto_assign: bool
-    "If the team allows auto assignment of members"
 
-    disqualified: bool
-    "If the team has been disqualified during the event"
+def _upstream_failure(error: Exception) -> Optional[float]:
+    """
+    Tell the governor whether an error comes from an unhealthy host, and how long to wait.
+    """
+    if isinstance(error, ResponseError):
+        if error.code == 429 or error.code >= 500:
+            return error.retry_after or 0
+        return None
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+        return 0
+    return None
 
-    users: List[User]
 
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        # HTTP dates are allowed too, they are not worth honoring precisely
+        return None
 
-class NovuPR(TypedDict):
-    gh_api_url: str
-    url: str
-    pr_number: int
-    state: str
-    locked: bool
-    title: str
-    created_at: datetime
-    updated_at: Optional[datetime]
-    closed_at: Optional[datetime]
-    merged_at: Optional[datetime]
 
+class _DigestReader:
+    """
+    Read a response body while hashing it.
+    """
 
-class NovuContributor(TypedDict):
-    github: str
-    name: Optional[str]
-    avatar_url: str
-    total_last_3_months_pulls: Optional[int]
-    total_pulls: Optional[int]
-    bio: Optional[str]
-    created_at: datetime
-    pulls: List[NovuPR]
+    def __init__(self, stream: aiohttp.StreamReader) -> None:
+        self.stream = stream
+        self.hash = hashlib.blake2b(digest_size=16)
 
+    async def read(self, n: int = -1) -> bytes:
+        chunk = await self.stream.read(n)
+        self.hash.update(chunk)
+        return chunk
 
-class NovuContributorMini(TypedDict):
-    _id: str
-    github: str
-    name: Optional[str]
-    avatar_url: str
-    total_pulls: Optional[int]
 
+Fetched = Tuple[Any, Validators]
+"Data loaded from upstream, and what tells whether it changed on the next load"
 
-class RequesterCachedAttribute(TypedDict):
-    cached_at: datetime
-    data: Any
-    allowed_time: Optional[timedelta]
+RefreshListener = Callable[[str, Any], Awaitable[None]]
+"A coroutine function called with the key and the new data of a refreshed cache entry"
 
 
 class Requester(Singleton):
-    _cache: Dict[str, RequesterCachedAttribute] = {}
-    _cache_team: Dict[str, RequesterCachedAttribute] = {}
-
-    async def _make_request(self, url: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise ResponseError(response.status)
-                return await response.json()
+    _cache = Cache(
+        CacheNamespace.from_env(
+            "leaderboard", ttl=timedelta(minutes=30), stale_time=CACHE_STALE_TIME
+        ),
+        CacheNamespace.from_env(
+            "contributors_mini", ttl=timedelta(hours=12), stale_time=CACHE_STALE_TIME
+        ),
+        CacheNamespace.from_env(
+            "team",
+            ttl=timedelta(minutes=30),
+            stale_time=CACHE_STALE_TIME,
+            max_entries=1000,
+            max_bytes=64 * 1024 * 1024,
+        ),
+        CacheNamespace.from_env(
+            "contributor",
+            ttl=timedelta(minutes=30),
+            stale_time=CACHE_STALE_TIME,
+            max_entries=1000,
+            max_bytes=64 * 1024 * 1024,
+        ),
+    )
+    _sessions: Optional[SessionPool] = None
+    _shared: Optional[CacheBackend] = create_backend()
+    _governor = Governor(_upstream_failure)
+    _in_flight = SingleFlight()
+    _background_tasks: Set["asyncio.Task[Any]"] = set()
+    _refresh_listeners: Dict[str, List[RefreshListener]] = {}
+    _snapshot: Optional[CacheSnapshot] = CacheSnapshot() if CACHE_SNAPSHOT_INTERVAL > 0 else None
+    _snapshot_lock: Optional[asyncio.Lock] = None
+
+    async def start(self) -> None:
+        """
+        Open the pooled HTTP sessions to the upstream APIs.
+        """
+        if Requester._sessions is None:
+            Requester._sessions = SessionPool()
+        Requester._sessions.start(HACKSQUAD_HOST, NOVU_CONTRIBUTORS_HOST)
+        METRICS.add_collector("requester", self._collect_metrics)
+
+    async def close(self) -> None:
+        """
+        Close the pooled HTTP sessions. They will be reopened by `start` or on the next request.
+        """
+        if Requester._sessions is not None:
+            await Requester._sessions.close()
+        if Requester._shared is not None:
+            await Requester._shared.close()
+
+    async def _make_request(self, url: str, validators: Optional[Validators] = None) -> Fetched:
+        return await self._governor.for_url(url).call(
+            lambda: self._send_request(url, validators=validators)
+        )
 
-    def _allow_cache_use(self, entry_name: str) -> bool:
-        if not self._cache.get(entry_name):
-            return False
+    async def _make_list_request(
+        self,
+        url: str,
+        key: str,
+        project: Callable[[Any], T],
+        validators: Optional[Validators] = None,
+    ) -> Tuple[List[T], Validators]:
+        """
+        Request a JSON object and return the items of its array `key`, passed through `project`.
+
+        When streaming is enabled, items are decoded and projected one by one while the response is
+        downloaded, so that the whole payload is never held in memory at once.
+        """
+        if not fastjson.STREAMING:
+            result, validators = await self._make_request(url, validators)
+            return [project(item) for item in result[key]], validators
+
+        async def decode(reader: fastjson.AsyncReader) -> List[T]:
+            return [project(item) async for item in fastjson.iter_array(reader, key)]
+
+        return await self._governor.for_url(url).call(
+            lambda: self._send_request(url, decode, validators)
+        )
 
-        cached_at = self._cache[entry_name]["cached_at"]
+    async def _send_request(
+        self,
+        url: str,
+        decode: Optional[Callable[[fastjson.AsyncReader], Awaitable[Any]]] = None,
+        validators: Optional[Validators] = None,
+    ) -> Fetched:
+        """
+        Send a GET request, conditional if the validators of the cached data are given.
+
+        Raises
+        ------
+        NotModified
+            The data did not change since the validators have been received.
+        """
+        if Requester._sessions is None:
+            Requester._sessions = SessionPool()
+        host = urlsplit(url).netloc
+        started_at = time.perf_counter()
+        status = "error"
+        headers = validators.conditional_headers() if validators else None
+        try:
+            async with Requester._sessions.for_url(url).get(url, headers=headers) as response:
+                status = str(response.status)
+                if response.status == 304 and validators is not None:
+                    raise NotModified("not_modified")
+                if response.status != 200:
+                    raise ResponseError(
+                        response.status, _retry_after(response.headers.get("Retry-After"))
+                    )
+                reader = _DigestReader(response.content)
+                if decode is None:
+                    body = await reader.read()
+                    # Identical bytes are not even parsed
+                    if validators is not None and validators.digest == reader.hash.hexdigest():
+                        raise NotModified("same_content")
+                    data = fastjson.loads(body)
+                else:
+                    data = await decode(reader)
+                    # Read what is left, so that the digest is complete and the connection reused
+                    while await reader.read(_DRAIN_CHUNK_SIZE):
+                        pass
+                    if validators is not None and validators.digest == reader.hash.hexdigest():
+                        raise NotModified("same_content")
+                return data, Validators.from_response(response.headers, reader.hash.hexdigest())
+        finally:
+            METRICS.increment("upstream_responses_total", host=host, status=status)
+            METRICS.observe(
+                "upstream_request_duration_seconds", time.perf_counter() - started_at, host=host
+            )
 
-        if allowed_cache_time := self._cache[entry_name]["allowed_time"]:
-            invalid_at = cached_at + allowed_cache_time
+    @staticmethod
+    def _flight_key(namespace: str, key: str) -> str:
+        return f"{namespace}:{key}" if key else namespace
+
+    async def _load(self, namespace: str, key: str) -> Any:
+        """
+        Fetch an entry, from the shared cache if any or from upstream, and store it in the cache.
+
+        If the cached entry did not change upstream, it is only made fresh again: its data is
+        kept and the refresh listeners are not called.
+        """
+        cache = self._cache[namespace]
+        cached = cache.peek(key)
+        if self._shared is None:
+            known = (cached["data"], cached["validators"]) if cached else (None, None)
+            data, validators = await self._fetch_if_changed(namespace, key, *known)
+            cached_at = allowed_time = None
         else:
-            invalid_at = cached_at + timedelta(minutes=30)
-
-        # Cached data is invalid if it's been there since 30 minutes
-        return invalid_at >= datetime.now()
-
-    def _allow_cache_team_use(self, team_slug: str) -> bool:
-        if not self._cache_team.get(team_slug):
-            return False
+            entry = await self._load_shared(namespace, key, cached)
+            data, validators = entry.data, entry.validators
+            cached_at = datetime.fromtimestamp(entry.cached_at)
+            allowed_time = timedelta(seconds=entry.allowed_time)
+
+        if (
+            cached is not None
+            and validators is not None
+            and validators == cached["validators"]
+            and cache.revalidate(key, cached_at=cached_at, allowed_time=allowed_time)
+        ):
+            return cached["data"]
+
+        # Derived data is rebuilt before the new entry becomes visible to the readers
+        await self._notify_refresh(namespace, key, data)
+        cache.set(key, data, cached_at=cached_at, allowed_time=allowed_time, validators=validators)
+        return data
+
+    async def _load_shared(
+        self, namespace: str, key: str, cached: Optional[CacheEntry] = None
+    ) -> SharedEntry:
+        """
+        Get a fresh entry from the shared cache. If there is none, fetch it while holding its
+        refresh lock, so that a single process fetches it while the others wait for the result.
+        If the shared cache fails, the entry is fetched without it.
+
+        The expired shared entry, or else the `cached` local one, is revalidated if possible.
+        """
+        shared = self._shared
+        assert shared is not None
+        lock, token = self._flight_key(namespace, key), lock_token()
+        owned = False
+        expired: Optional[SharedEntry] = None
+        try:
+            if (entry := await shared.get(namespace, key)) is not None and entry.fresh:
+                return entry
+            expired = entry
+            deadline = time.monotonic() + SHARED_LOCK_TIMEOUT
+            while not (owned := await shared.acquire(lock, token, SHARED_LOCK_TIMEOUT)):
+                if time.monotonic() >= deadline:
+                    # The owner is taking too long, fetch it ourselves
+                    break
+                await asyncio.sleep(SHARED_LOCK_POLL_INTERVAL)
+                if (entry := await shared.get(namespace, key)) is not None and entry.fresh:
+                    return entry
+                expired = entry or expired
+        except SHARED_CACHE_ERRORS as error:
+            logging.warning('Shared cache unavailable to load "%s": %r', lock, error)
+
+        if expired is not None and expired.validators is not None:
+            known: Tuple[Any, Optional[Validators]] = (expired.data, expired.validators)
+        elif cached is not None:
+            known = (cached["data"], cached["validators"])
+        else:
+            known = (None, None)
 
-        cached_at = self._cache_team[team_slug]["cached_at"]
-        invalid_at = cached_at + timedelta(minutes=30)
+        try:
+            entry = SharedEntry(
+                time.time(),
+                self._cache[namespace].ttl.total_seconds(),
+                *await self._fetch_if_changed(namespace, key, *known),
+            )
+            try:
+                await shared.set(
+                    namespace,
+                    key,
+                    entry,
+                    entry.allowed_time + self._cache[namespace].stale_time.total_seconds(),
+                )
+            except SHARED_CACHE_ERRORS as error:
+                logging.warning('Could not share cache entry "%s": %r', lock, error)
+            return entry
+        finally:
+            if owned:
+                try:
+                    await shared.release(lock, token)
+                except SHARED_CACHE_ERRORS as error:
+                    logging.warning('Could not release the refresh lock of "%s": %r', lock, error)
+
+    async def _fetch(
+        self, namespace: str, key: str, validators: Optional[Validators] = None
+    ) -> Fetched:
+        if namespace == "leaderboard":
+            fetched = await self._load_leaderboard(validators)
+        elif namespace == "contributors_mini":
+            fetched = await self._load_contributors_mini(validators)
+        elif namespace == "team":
+            fetched = await self._load_team(key, validators)
+        elif namespace == "contributor":
+            fetched = await self._load_contributor(key, validators)
+        else:
+            raise KeyError(namespace)
+        return fetched
+
+    async def _fetch_if_changed(
+        self, namespace: str, key: str, data: Any, validators: Optional[Validators]
+    ) -> Fetched:
+        """
+        Fetch an entry, unless it did not change since `data` has been received along with
+        `validators`, in which case these are returned as is.
+        """
+        if validators is None:
+            return await self._fetch(namespace, key)
+        try:
+            fetched = await self._fetch(namespace, key, validators)
+        except NotModified as error:
+            METRICS.increment(
+                "upstream_revalidations_total", namespace=namespace, outcome=error.reason
+            )
+            return data, validators
+        METRICS.increment("upstream_revalidations_total", namespace=namespace, outcome="changed")
+        return fetched
+
+    def add_refresh_listener(self, namespace: str, listener: RefreshListener) -> None:
+        """
+        Register a coroutine function to be awaited every time an entry of `namespace` is loaded.
+        Used to rebuild data derived from the cache once per refresh instead of once per use.
+        """
+        self._refresh_listeners.setdefault(namespace, []).append(listener)
+
+    def remove_refresh_listener(self, namespace: str, listener: RefreshListener) -> None:
+        listeners = self._refresh_listeners.get(namespace, [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    async def _notify_refresh(self, namespace: str, key: str, data: Any) -> None:
+        for listener in list(self._refresh_listeners.get(namespace, [])):
+            try:
+                await listener(key, data)
+            except Exception:
+                logging.exception('Refresh listener of "%s" failed', namespace)
+
+    async def _cached(self, namespace: str, key: str = "") -> Any:
+        """
+        Return the cached entry, loading it if missing.
+        A stale entry is returned right away while it gets refreshed in the background.
+        """
+        with METRICS.phase("upstream"):
+            return await self._get_cached(namespace, key)
+
+    async def _get_cached(self, namespace: str, key: str) -> Any:
+        host = NAMESPACE_HOSTS[namespace]
+        available = self._governor.for_host(host).available()
+        # While the host is down, anything we still have beats an error, even past its stale time
+        state, entry = self._cache[namespace].get(key, keep_expired=not available)
+        if state is CacheState.MISSING:
+            if not available:
+                if entry is not None:
+                    return entry["data"]
+                raise CircuitOpenError(host, 0)
+            return await self._in_flight.do(
+                self._flight_key(namespace, key), lambda: self._load(namespace, key)
+            )
 
-        # Cached data is invalid if it's been there since 30 minutes
-        return invalid_at >= datetime.now()
+        assert entry is not None
+        if state is CacheState.STALE:
+            self._refresh_in_background(namespace, key)
+        return entry["data"]
+
+    def _refresh_in_background(self, namespace: str, key: str) -> None:
+        flight_key = self._flight_key(namespace, key)
+        if self._in_flight.in_flight(flight_key):
+            return
+        if not self._governor.for_host(NAMESPACE_HOSTS[namespace]).available():
+            # Keep serving the stale entry until the host recovers
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._in_flight.do(flight_key, lambda: self._load(namespace, key))
+            except Exception:
+                logging.exception('Could not refresh cache entry "%s"', flight_key)
+
+        task = asyncio.create_task(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def expire(self, namespace: str, key: str = "") -> None:
+        """
+        Mark an entry as stale. Unlike `invalidate`, it keeps being served until it gets refreshed,
+        with a conditional request if it has validators.
+        """
+        self._cache[namespace].revalidate(key, allowed_time=timedelta(0))
+
+    async def refresh(self, namespace: str, key: str = "") -> Any:
+        """
+        Load an entry from upstream now, whether it is cached or not.
+        """
+        return await self._in_flight.do(
+            self._flight_key(namespace, key), lambda: self._load(namespace, key)
+        )
 
-    async def fetch_leaderboard(self) -> List[PartialTeam]:
-        if self._allow_cache_use("leaderboard"):
-            return self._cache["leaderboard"]["data"]
-
-        result = await self._make_request("https://www.hacksquad.dev/api/leaderboard")
-
-        final_result = [
-            PartialTeam(
-                place=None,
-                id=info["id"],
-                name=info["name"],
-                score=info["score"],
-                slug=info["slug"],
+    def invalidate(self, namespace: Optional[str] = None, key: Optional[str] = None) -> None:
+        """
+        Drop cached entries: a single one, a whole namespace, or everything.
+        """
+        self._cache.invalidate(namespace, key)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return self._cache.stats()
+
+    def _collect_metrics(self) -> List[MetricFamily]:
+        cache = self._cache.stats()
+        flights = self._in_flight.stats()
+        upstreams = self._governor.stats()
+        return [
+            MetricFamily(
+                f"cache_{name}_total",
+                "counter",
+                f"Cache {name.replace('_', ' ')}, by namespace",
+                [
+                    Sample({"namespace": namespace}, stats[name])
+                    for namespace, stats in cache.items()
+                ],
             )
-            for info in result["teams"]
+            for name in ("hits", "stale_hits", "misses", "evictions", "expirations")
+        ] + [
+            MetricFamily(
+                "cache_entries",
+                "gauge",
+                "Cached entries, by namespace",
+                [Sample({"namespace": ns}, stats["entries"]) for ns, stats in cache.items()],
+            ),
+            MetricFamily(
+                "cache_bytes",
+                "gauge",
+                "Approximate size of the cached entries, by namespace",
+                [Sample({"namespace": ns}, stats["bytes"]) for ns, stats in cache.items()],
+            ),
+            MetricFamily(
+                "upstream_loads_total",
+                "counter",
+                "Cache loads really sent upstream, by namespace",
+                [Sample({"namespace": ns}, stats["executions"]) for ns, stats in flights.items()],
+            ),
+            MetricFamily(
+                "upstream_loads_coalesced_total",
+                "counter",
+                "Cache loads that joined an in-flight one, by namespace",
+                [Sample({"namespace": ns}, stats["coalesced"]) for ns, stats in flights.items()],
+            ),
+            MetricFamily(
+                "upstream_circuit_open",
+                "gauge",
+                "Whether the circuit of an upstream host is open, by host",
+                [
+                    Sample({"host": host}, int(stats["state"] != "CLOSED"))
+                    for host, stats in upstreams.items()
+                ],
+            ),
         ]
-        self._cache["leaderboard"] = {
-            "cached_at": datetime.now(),
-            "data": final_result,
-            "allowed_time": None,
-        }
-        return final_result
 
-    async def fetch_team(self, slug: str) -> Team:
-        if self._allow_cache_team_use(slug):
-            return self._cache_team[slug]["data"]
-
-        result = await self._make_request(f"https://www.hacksquad.dev/api/team/?id={slug}")
-        info = result["team"]
-
-        # Get owner as User object
-        owner = None
-        for user in info["users"]:
-            if user["id"] == info["ownerId"]:
-                owner = User(
-                    created_at=isoparse(user["createdAt"]),
-                    id=user["id"],
-                    name=user["name"],
-                    email_verified=user["emailVerified"],
-                    image=user["image"],
-                    moderator=user["moderator"],
-                    handle=user["handle"],
-                    team_id=user["teamId"],
-                    disqualified=user["disqualified"],
-                    github_user_id=user["githubUserId"],
+    def upstream_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The state of the governor of every upstream host that has been requested.
+        """
+        return self._governor.stats()
+
+    def peek(self, namespace: str, key: str = "") -> Any:
+        """
+        Get cached data without loading it nor touching the cache counters.
+        """
+        entry = self._cache[namespace].peek(key)
+        return entry["data"] if entry else None
+
+    def peek_all(self, namespace: str) -> List[Tuple[str, Any]]:
+        """
+        Get the (key, data) of every cached entry of a namespace, like `peek`.
+        """
+        return [(key, entry["data"]) for key, entry in self._cache[namespace].items()]
+
+    async def restore_snapshot(self) -> int:
+        """
+        Fill the cache from the last snapshot, keeping the original age of the entries.
+
+        Returns
+        -------
+        int
+            The number of restored entries.
+        """
+        if self._snapshot is None:
+            return 0
+
+        entries = await asyncio.to_thread(self._snapshot.load)
+        for entry in entries:
+            if entry.namespace in self._cache:
+                self._cache[entry.namespace].set(
+                    entry.key,
+                    entry.data,
+                    cached_at=entry.cached_at,
+                    allowed_time=entry.allowed_time,
+                    validators=entry.validators,
                 )
-
-        # Convert the str list to a Python list & cleanup
-        info["prs"] = ast.literal_eval(info["prs"])
-
-        # Get all PRs as PR object
-        prs = [
-            PR(
-                id=pr["id"],
-                created_at=isoparse(pr["createdAt"]),
-                title=pr["title"],
-                url=pr["url"],
-                status=(
-                    PRStatus.DELETED
-                    if pr.get("status", "ACCEPTED") == "DELETED"
-                    else PRStatus.ACCEPTED
-                ),
+        # Entries that became too old while the bot was offline are not worth keeping
+        self._cache.purge_expired()
+        return sum(len(namespace) for namespace in self._cache)
+
+    async def save_snapshot(self) -> int:
+        """
+        Write the entries that changed since the last snapshot, from a thread.
+
+        Returns
+        -------
+        int
+            The number of written entries.
+        """
+        if self._snapshot is None:
+            return 0
+
+        if Requester._snapshot_lock is None:
+            Requester._snapshot_lock = asyncio.Lock()
+        entries = [
+            SnapshotEntry(
+                namespace=namespace.name,
+                key=key,
+                cached_at=entry["cached_at"],
+                allowed_time=entry["allowed_time"],
+                data=entry["data"],
+                validators=entry["validators"],
             )
-            for pr in info["prs"]
+            for namespace in self._cache
+            for key, entry in namespace.items()
         ]
-
-        users = [
-            User(
-                created_at=isoparse(user["createdAt"]),
-                id=user["id"],
-                name=user["name"],
-                email_verified=user["emailVerified"],
-                image=user["image"],
-                moderator=user["moderator"],
-                handle=user["handle"],
-                team_id=user["teamId"],
-                disqualified=user["disqualified"],
-                github_user_id=user["githubUserId"],
-            )
-            for user in info["users"]
+        async with Requester._snapshot_lock:
+            return await asyncio.to_thread(self._snapshot.save, entries)
+
+    async def refresh_hot_entries(self, ahead: timedelta) -> int:
+        """
+        Refresh the recently used entries that expire within `ahead`, so that users don't have to.
+        Entries that are too old to be served are dropped on the way, unless their host is down.
+
+        Returns
+        -------
+        int
+            The number of refreshed entries.
+        """
+        for namespace in self._cache:
+            # Entries of a host that is down are kept, to be served until it recovers
+            if self._governor.for_host(NAMESPACE_HOSTS[namespace.name]).available():
+                namespace.purge_expired()
+
+        now = datetime.now()
+        to_refresh: List[Tuple[str, str]] = [
+            (namespace.name, key)
+            for namespace in self._cache
+            for key, entry in namespace.items()
+            if entry["used_at"] + CACHE_HOT_TIME >= now
+            and namespace.invalid_at(entry) <= now + ahead
+            and self._governor.for_host(NAMESPACE_HOSTS[namespace.name]).available()
         ]
 
-        team = Team(
-            place=None,
-            id=info["id"],
-            name=info["name"],
-            score=info["score"],
-            slug=info["slug"],
-            owner_id=info["ownerId"],
-            owner=owner,
-            prs=prs,
-            github_team_id=info["githubTeamId"],
-            allow_auto_assign=info["allowAutoAssign"],
-            disqualified=info["disqualified"],
-            users=users,
+        results = await asyncio.gather(
+            *(
+                self._in_flight.do(
+                    self._flight_key(namespace, key),
+                    lambda namespace=namespace, key=key: self._load(namespace, key),
+                )
+                for namespace, key in to_refresh
+            ),
+            return_exceptions=True,
+        )
+        for (namespace, key), result in zip(to_refresh, results):
+            if isinstance(result, Exception):
+                logging.warning(
+                    'Could not refresh cache entry "%s": %r',
+                    self._flight_key(namespace, key),
+                    result,
+                )
+        return len(to_refresh)
+
+    async def fetch_leaderboard(self) -> List[PartialTeam]:
+        return await self._cached("leaderboard")
+
+    async def _load_leaderboard(
+        self, validators: Optional[Validators] = None
+    ) -> Tuple[List[PartialTeam], Validators]:
+        return await self._make_list_request(
+            f"{HACKSQUAD_URL}/api/leaderboard", "teams", PartialTeam.from_payload, validators
+        )
+
+    async def fetch_team(self, slug: str) -> Team:
+        return await self._cached("team", slug)
+
+    async def _load_team(
+        self, slug: str, validators: Optional[Validators] = None
+    ) -> Tuple[Team, Validators]:
+        result, validators = await self._make_request(
+            f"{HACKSQUAD_URL}/api/team/?id={slug}", validators
         )
-        self._cache_team[team["slug"]] = {
-            "cached_at": datetime.now(),
-            "data": team,
-            "allowed_time": None,
-        }
-        return team
+        return Team.from_payload(result["team"]), validators
 
     async def fetch_contributor(self, github: str) -> NovuContributor:
-        contrib = await self._make_request(f"https://contributors.novu.co/contributor/{github}")
+        return await self._cached("contributor", github)
+
+    async def _load_contributor(
+        self, github: str, validators: Optional[Validators] = None
+    ) -> Tuple[NovuContributor, Validators]:
+        contrib, validators = await self._make_request(
+            f"{NOVU_CONTRIBUTORS_URL}/contributor/{github}", validators
+        )
         if contrib is None:
             raise ResponseError(404)
 
-        return NovuContributor(
-            github=contrib["github"],
-            name=contrib.get("name"),
-            avatar_url=contrib["avatar_url"],
-            total_last_3_months_pulls=contrib.get("totalLast3MonthsPulls"),
-            total_pulls=contrib.get("totalPulls"),
-            bio=contrib["bio"],
-            created_at=isoparse(contrib["created_at"]),
-            pulls=[
-                NovuPR(
-                    gh_api_url=pull["url"],
-                    url=pull["html_url"],
-                    pr_number=pull["number"],
-                    state=pull["state"],
-                    locked=pull["locked"],
-                    title=pull["title"],
-                    created_at=isoparse(pull["created_at"]),
-                    updated_at=isoparse(pull["updated_at"]) if pull["updated_at"] else None,
-                    closed_at=isoparse(pull["closed_at"]) if pull["closed_at"] else None,
-                    merged_at=isoparse(pull["merged_at"]) if pull["merged_at"] else None,
-                )
-                for pull in contrib["pulls"]
-            ],
-        )
+        return NovuContributor.from_payload(contrib), validators
 
     async def fetch_contributors_mini(self) -> List[NovuContributorMini]:
-        # I do not think that we would get much of a performance benefit from this but leaving it here all the same
-        if self._allow_cache_use("contributors_mini"):
-            return self._cache["contributors_mini"]["data"]
-
-        result = await self._make_request("https://contributors.novu.co/contributors-mini")
-
-        contributors = [
-            NovuContributorMini(
-                _id=contributor["_id"],
-                github=contributor["github"],
-                avatar_url=contributor["avatar_url"],
-                name=contributor.get("name"),
-                total_pulls=contributor.get("totalPulls"),
-            )
-            for contributor in result["list"]
-        ]
-
-        self._cache["contributors_mini"] = {
-            "cached_at": datetime.now(),
-            "data": contributors,
-            "allowed_time": timedelta(hours=12),
-        }
-        return contributors
+        return await self._cached("contributors_mini")
+
+    async def _load_contributors_mini(
+        self, validators: Optional[Validators] = None
+    ) -> Tuple[List[NovuContributorMini], Validators]:
+        return await self._make_list_request(
+            f"{NOVU_CONTRIBUTORS_URL}/contributors-mini",
+            "list",
+            NovuContributorMini.from_payload,
+            validators,
+        )
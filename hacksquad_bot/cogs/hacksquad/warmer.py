@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Set
+
+from hacksquad_bot.utils.governor import CircuitOpenError
+from hacksquad_bot.utils.metrics import METRICS
+
+from .ranking import LeaderboardRanking
+from .utils import Requester
+
+TEAM_WARMER_TOP = int(os.environ.get("TEAM_WARMER_TOP") or 20)
+"How many of the best teams have their details kept warm. 0 disables the warmer."
+
+TEAM_WARMER_MAX_CHANGED = int(os.environ.get("TEAM_WARMER_MAX_CHANGED") or 50)
+"How many teams whose score changed are refetched per leaderboard refresh, best ones first"
+
+TEAM_WARMER_CONCURRENCY = int(os.environ.get("TEAM_WARMER_CONCURRENCY") or 4)
+"How many team details are fetched at the same time"
+
+
+class TeamWarmer:
+    """
+    Fetch the details of the teams likely to be looked at after each leaderboard refresh: the
+    best teams, and the teams whose score changed.
+
+    A team whose score did not change is not refetched. A team whose score changed has its
+    cached details marked as outdated, so that they are served stale until refreshed, then
+    refetched if it is among the best `max_changed` of them. Refreshes arriving while teams are
+    being fetched are coalesced.
+    """
+
+    def __init__(
+        self,
+        *,
+        top: int = TEAM_WARMER_TOP,
+        max_changed: int = TEAM_WARMER_MAX_CHANGED,
+        concurrency: int = TEAM_WARMER_CONCURRENCY,
+    ) -> None:
+        self.top = top
+        self.max_changed = max_changed
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        self._scores: Dict[str, int] = {}
+        "The score of every team in the last leaderboard, by slug"
+
+        self._ranking: Optional[LeaderboardRanking] = None
+        self._changed: Set[str] = set()
+        "Slugs of the teams whose score changed and that have not been refetched yet"
+
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def notify(self, ranking: LeaderboardRanking) -> None:
+        """
+        Compare the scores with the previous leaderboard, and warm the teams in the background.
+        """
+        if self.top <= 0:
+            return
+        scores: Dict[str, int] = {}
+        for _, team in ranking.teams:
+            scores[team.slug] = team.score
+            if (previous := self._scores.get(team.slug)) is None:
+                # Without a previous leaderboard, like after a restart, cached details are
+                # compared instead
+                cached = Requester().peek("team", team.slug)
+                previous = team.score if cached is None else cached.score
+            if previous != team.score:
+                self._changed.add(team.slug)
+        self._scores = scores
+        self._changed.intersection_update(scores)
+
+        self._ranking = ranking
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _warm(self, slug: str) -> Optional[bool]:
+        """
+        Fetch the details of a team. Returns whether it succeeded, None if the API is unavailable.
+        """
+        async with self._semaphore:
+            try:
+                await Requester().refresh("team", slug)
+            except CircuitOpenError:
+                return None
+            except Exception as error:
+                logging.warning('Could not warm team "%s": %r', slug, error)
+                return False
+            return True
+
+    async def _run(self) -> None:
+        while (ranking := self._ranking) is not None:
+            self._ranking = None
+            changed, self._changed = self._changed, set()
+
+            for slug in changed:
+                Requester().expire("team", slug)
+            METRICS.increment("team_warmer_total", len(changed), action="expired")
+
+            # The best teams are fetched if they changed or are missing from the cache, the
+            # other changed teams best first
+            to_fetch = [
+                team.slug
+                for _, team in ranking.teams[: self.top]
+                if team.slug in changed or Requester().peek("team", team.slug) is None
+            ]
+            to_fetch.extend(
+                [team.slug for _, team in ranking.teams[self.top :] if team.slug in changed][
+                    : self.max_changed
+                ]
+            )
+            if not to_fetch:
+                continue
+
+            results = await asyncio.gather(*(self._warm(slug) for slug in to_fetch))
+            METRICS.increment("team_warmer_total", results.count(True), action="fetched")
+            if unavailable := results.count(None):
+                logging.warning(
+                    "Could not warm %s teams, the HackSquad API is unavailable", unavailable
+                )
+            logging.debug(
+                "Warmed %s teams, %s changed since the last leaderboard",
+                len(to_fetch),
+                len(changed),
+            )
@@ -1,15 +1,37 @@
-from typing import Optional
+import time
+from typing import Dict, List, Literal, Optional
 
 from discord import Guild
 from discord.ext import commands
 
 from hacksquad_bot.main import Context, HackSquadBot
+from hacksquad_bot.utils.metrics import METRICS, Histogram
 
 
 class InternalCommands(commands.Cog):
     def __init__(self, bot: HackSquadBot) -> None:
         self.bot = bot
 
+    async def cog_load(self) -> None:
+        if self.bot.cluster:
+            self.bot.cluster.add_handler("load", self.bot.load_extension)
+            self.bot.cluster.add_handler("reload", self.bot.reload_extension)
+            self.bot.cluster.add_handler("unload", self.bot.unload_extension)
+
+    async def cog_unload(self) -> None:
+        if self.bot.cluster:
+            for operation in ("load", "reload", "unload"):
+                self.bot.cluster.remove_handler(operation)
+
+    def _broadcast(self, operation: str, extension: str) -> str:
+        """
+        Run the extension operation on the other clusters, if any.
+        """
+        if not self.bot.cluster or self.bot.cluster.cluster_count < 2:
+            return ""
+        self.bot.cluster.broadcast(operation, name=extension)
+        return f" Broadcast to the {self.bot.cluster.cluster_count - 1} other clusters."
+
     @commands.command(name="load")
     async def cmd_load_extension(self, ctx: Context, *, cog_name: str):
         """
@@ -31,7 +53,8 @@ class InternalCommands(commands.Cog):
         except Exception as e:
             await ctx.send(f"Could not load cog due to an unexpected error:\n```py\n{e}```")
             return
-        await ctx.send(f"Succesfully loaded `{cog_name}`.")
+        broadcast = self._broadcast("load", f"hacksquad_bot.cogs.{cog_name}")
+        await ctx.send(f"Succesfully loaded `{cog_name}`.{broadcast}")
 
     @commands.command(name="reload")
     async def cmd_reload_extension(self, ctx: Context, *, cog_name: str):
@@ -54,7 +77,8 @@ class InternalCommands(commands.Cog):
         except Exception as e:
             await ctx.send(f"Could not reload cog due to an unexpected error:\n```py\n{e}```")
             return
-        await ctx.send(f"Succesfully reloaded `{cog_name}`.")
+        broadcast = self._broadcast("reload", f"hacksquad_bot.cogs.{cog_name}")
+        await ctx.send(f"Succesfully reloaded `{cog_name}`.{broadcast}")
 
     @commands.command(name="unload")
     async def cmd_unload_extension(self, ctx: Context, *, cog_name: str):
@@ -72,26 +96,110 @@ class InternalCommands(commands.Cog):
         except Exception as e:
             await ctx.send(f"Could not unload cog due to an unexpected error:\n```py\n{e}```")
             return
-        await ctx.send(f"Succesfully unloaded `{cog_name}`.")
+        broadcast = self._broadcast("unload", f"hacksquad_bot.cogs.{cog_name}")
+        await ctx.send(f"Succesfully unloaded `{cog_name}`.{broadcast}")
 
     @commands.is_owner()
     @commands.command(name="sync")
-    async def cmd_sync(self, ctx: Context, *, guild: Optional[Guild]):
+    async def cmd_sync(
+        self, ctx: Context, guild: Optional[Guild] = None, force: Optional[Literal["force"]] = None
+    ):
         """
-        Sync slash commands globally or in a server.
+        Sync slash commands globally or in a server, if they changed since the last sync.
+
+        Parameters
+        ----------
+        guild : Optional[Guild]
+            The server to sync, global commands are synced if omitted.
+        force : Optional[Literal["force"]]
+            Sync even if nothing changed.
         """
         msg = await ctx.send(
             f"Syncing slash commands for guild {guild.name}..."
             if guild
             else "Syncing slash commands... Please wait, this might take a while..."
         )
-        await self.bot.tree.sync(guild=guild)
+        result = await self.bot.command_syncer.sync(guild, force=force is not None)
+        if not result.synced:
+            await msg.edit(content="Slash commands did not change, nothing to sync.")
+            return
         await msg.edit(
-            content=f"Successfully synced slash for guild {guild.name}"
+            content=f"Successfully synced slash for guild {guild.name}: {result.describe()}"
             if guild
-            else "Successfully synced slash!"
+            else f"Successfully synced slash: {result.describe()}"
         )
 
+    @commands.is_owner()
+    @commands.command(name="upstreams")
+    async def cmd_upstreams(self, ctx: Context):
+        """
+        Show the state of the governor of every upstream API host.
+        """
+        # Imported here, since reloading the extension replaces the Requester and its governor
+        from hacksquad_bot.cogs.hacksquad.utils import Requester
+
+        stats = Requester().upstream_stats()
+        if not stats:
+            await ctx.send("No upstream host has been requested yet.")
+            return
+        lines = [
+            f"**{host}**: " + ", ".join(f"{name}=`{value}`" for name, value in host_stats.items())
+            for host, host_stats in stats.items()
+        ]
+        await ctx.send("\n".join(lines))
+
+    @commands.is_owner()
+    @commands.command(name="metrics")
+    async def cmd_metrics(self, ctx: Context):
+        """
+        Show where the time goes: app command latencies, upstream requests, cache efficiency.
+        """
+        # Imported here, since reloading the extension replaces the Requester and its cache
+        from hacksquad_bot.cogs.hacksquad.utils import Requester
+
+        lines = ["**App commands** (count, p50/p95 per phase)"]
+        durations = METRICS.histograms.get("app_command_duration_seconds", {})
+        per_command: Dict[str, Dict[str, Histogram]] = {}
+        for labels, histogram in durations.items():
+            labels_dict = dict(labels)
+            per_command.setdefault(labels_dict["command"], {})[labels_dict["phase"]] = histogram
+        for command, phases in sorted(per_command.items()):
+            timings = ", ".join(
+                f"{phase} {h.quantile(0.5) * 1000:g}/{h.quantile(0.95) * 1000:g}ms"
+                for phase, h in phases.items()
+            )
+            lines.append(f"`/{command}` ({phases['total'].count}): {timings}")
+
+        lines.append("**Upstream** (responses by status, p50/p95)")
+        responses: Dict[str, List[str]] = {}
+        for labels, count in METRICS.counters.get("upstream_responses_total", {}).items():
+            labels_dict = dict(labels)
+            responses.setdefault(labels_dict["host"], []).append(
+                f"{labels_dict['status']}: {count:g}"
+            )
+        for labels, h in METRICS.histograms.get("upstream_request_duration_seconds", {}).items():
+            host = dict(labels)["host"]
+            lines.append(
+                f"`{host}`: {', '.join(responses.get(host, []))}, "
+                f"{h.quantile(0.5) * 1000:g}/{h.quantile(0.95) * 1000:g}ms"
+            )
+
+        lines.append("**Cache** (hits/stale/misses)")
+        for namespace, stats in Requester().cache_stats().items():
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            ratio = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0
+            lines.append(
+                f"`{namespace}`: {stats['hits']}/{stats['stale_hits']}/{stats['misses']} "
+                f"({ratio:.0%} served from cache)"
+            )
+
+        minutes = max(time.time() - METRICS.started_at, 1) / 60
+        lines.append("**Autocomplete**")
+        for labels, count in METRICS.counters.get("autocomplete_total", {}).items():
+            lines.append(f"`/{dict(labels)['command']}`: {count:g} ({count / minutes:.1f}/min)")
+
+        await ctx.send("\n".join(lines)[:2000])
+
 
 async def setup(bot: HackSquadBot):
     cog = InternalCommands(bot)
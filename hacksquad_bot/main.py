@@ -1,9 +1,20 @@
+import asyncio
 import logging
 import os
+from typing import TYPE_CHECKING, Any, List, Optional
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 
+if TYPE_CHECKING:
+    from hacksquad_bot.cluster import ClusterClient
+
+from hacksquad_bot.utils.command_sync import COMMAND_SYNC_AT_STARTUP, CommandSyncer
+from hacksquad_bot.utils.gateway import GatewayProfile, peak_rss_mib
+from hacksquad_bot.utils.metrics import METRICS, METRICS_PORT, MetricFamily, MetricsServer, Sample
+from hacksquad_bot.utils.startup import STARTUP
+
 DESCRIPTION = """
 Hey there! I am the discord.py version of the HackSquad Bot! Nice to meeeeeeeet you!
 """
@@ -11,23 +22,166 @@ EXTENSIONS = (
     "internal_commands",
     "cogs.hacksquad",
 )
+"Loaded concurrently at startup, they must not depend on each other being loaded"
+
+DEV_EXTENSIONS = tuple(
+    extension.strip()
+    for extension in (os.environ.get("DEV_EXTENSIONS") or "").split(",")
+    if extension.strip()
+)
+"Extra extensions loaded at startup, like `jishaku`. Left out by default to start faster."
+
+# Prefix commands (including jishaku's) are read from messages, app commands need no intent
+PREFIX_COMMAND_INTENTS = discord.Intents(
+    guild_messages=True, dm_messages=True, message_content=True
+)
+EXTENSION_INTENTS = {
+    "internal_commands": PREFIX_COMMAND_INTENTS,
+    "cogs.hacksquad": discord.Intents(guilds=True),
+    "jishaku": PREFIX_COMMAND_INTENTS,
+}
+"The gateway intents each extension relies on"
+
+
+class HackSquadCommandTree(app_commands.CommandTree["HackSquadBot"]):
+    """
+    A command tree timing every app command and counting autocompletions.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        command = interaction.command.qualified_name if interaction.command else "unknown"
+        STARTUP.log("first_interaction")
+        if interaction.type is discord.InteractionType.autocomplete:
+            METRICS.increment("autocomplete_total", command=command)
+        else:
+            # Runs in the same task as the command, so the timer is visible to the callbacks
+            interaction.extras["timer"] = METRICS.start_command()
+        return True
+
+    async def on_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        if timer := interaction.extras.pop("timer", None):
+            command = interaction.command.qualified_name if interaction.command else "unknown"
+            METRICS.finish_command(command, timer, "error")
+        await super().on_error(interaction, error)
 
 
 class HackSquadBot(commands.AutoShardedBot):
-    def __init__(self) -> None:
+    def __init__(self, *, cluster: Optional["ClusterClient"] = None, **options: Any) -> None:
+        required = discord.Intents.none()
+        for extension in (*EXTENSIONS, *DEV_EXTENSIONS):
+            required |= EXTENSION_INTENTS.get(extension, discord.Intents.none())
+        self.gateway_profile = GatewayProfile.from_env(required)
+
         super().__init__(
             command_prefix=os.environ.get("PREFIX") or "!",
             description=DESCRIPTION,
-            intents=discord.Intents.all(),
+            tree_cls=HackSquadCommandTree,
+            **self.gateway_profile.client_options(),
+            **options,
         )
+        self.cluster = cluster
+        "The IPC channel to the other clusters, when running as one of them"
+        self._ready_reported = False
+        self.metrics_server = MetricsServer() if METRICS_PORT else None
+        self.command_syncer = CommandSyncer(self.tree)
+        METRICS.add_collector("startup", self._collect_startup_metrics)
+        STARTUP.mark("import")
+
+    @staticmethod
+    def _collect_startup_metrics() -> List[MetricFamily]:
+        return [
+            MetricFamily(
+                "startup_phase_seconds",
+                "gauge",
+                "Duration of the startup phases, by the milestone ending them",
+                [Sample({"phase": phase}, duration) for phase, duration in STARTUP.phases()],
+            )
+        ]
+
+    async def _load_extension(self, name: str) -> None:
+        try:
+            await self.load_extension(name)
+        except Exception:
+            logging.exception('Could not load "%s" due to an error', name)
+
+    async def _sync_commands(self) -> None:
+        try:
+            results = await self.command_syncer.sync_known()
+        except Exception:
+            # Commands already synced keep working, this is not worth failing the startup
+            logging.exception("Could not sync the app commands")
+            return
+        for result in results:
+            logging.info("App commands of the %s scope: %s", result.scope, result.describe())
 
     async def setup_hook(self) -> None:
-        for extension in EXTENSIONS:
+        # Called by `login`, once logged in
+        STARTUP.mark("login")
+
+        # Imported here since the cog package imports this module
+        from hacksquad_bot.cogs.hacksquad.utils import Requester
+
+        if self.cluster:
+            self.cluster.start(asyncio.get_running_loop())
+
+        await Requester().start()
+        # Restored before any extension is loaded, so the first interactions are served warm
+        if restored := await Requester().restore_snapshot():
+            logging.info("Restored %s cache entries from the last snapshot", restored)
+        STARTUP.mark("restore")
+
+        await asyncio.gather(
+            *(self._load_extension(f"hacksquad_bot.{extension}") for extension in EXTENSIONS),
+            *(self._load_extension(extension) for extension in DEV_EXTENSIONS),
+        )
+        STARTUP.log("extensions")
+
+        # A single cluster syncs, the commands are the same everywhere
+        if COMMAND_SYNC_AT_STARTUP and (not self.cluster or self.cluster.cluster_id == 0):
+            await self._sync_commands()
+
+        if self.metrics_server:
             try:
-                await self.load_extension(f"hacksquad_bot.{extension}")
-            except Exception:
-                logging.exception('Could not load "%s" due to an error', extension)
-        await self.load_extension("jishaku")
+                await self.metrics_server.start()
+            except OSError:
+                logging.exception("Could not start the metrics endpoint")
+
+    async def close(self) -> None:
+        from hacksquad_bot.cogs.hacksquad.utils import Requester
+
+        await super().close()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        try:
+            await Requester().save_snapshot()
+        except Exception:
+            logging.exception("Could not snapshot the cache")
+        await Requester().close()
+
+    async def on_ready(self) -> None:
+        if self._ready_reported:
+            return
+        self._ready_reported = True
+        STARTUP.log("ready")
+        rss = peak_rss_mib()
+        logging.info(
+            'Ready with the "%s" gateway profile (intents %s) after %.1fs: %s guilds, %s cached'
+            " members, peak RSS %s MiB",
+            self.gateway_profile.name,
+            self.gateway_profile.intents.value,
+            STARTUP.milestones["ready"],
+            len(self.guilds),
+            sum(len(guild.members) for guild in self.guilds),
+            f"{rss:.0f}" if rss is not None else "unknown",
+        )
+
+    async def on_app_command_completion(
+        self, interaction: discord.Interaction, command: app_commands.Command
+    ) -> None:
+        if timer := interaction.extras.pop("timer", None):
+            METRICS.finish_command(command.qualified_name, timer, "success")
 
     async def on_command_error(  # type: ignore
         self,
@@ -0,0 +1,331 @@
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from enum import Enum, auto
+from typing import Any, Dict, Iterator, Optional, Tuple, TypedDict
+
+# Sequences longer than this get their size extrapolated from a sample of their items
+_SIZE_SAMPLE = 64
+
+
+def approximate_size(obj: Any) -> int:
+    """
+    Roughly estimate the memory used by a payload made of dicts, lists, tuples and scalars.
+
+    Long sequences are sampled, which keeps this cheap for lists of thousands of records.
+    """
+    if isinstance(obj, Enum):
+        # Enum members are shared singletons, they do not weight on the payload
+        return 0
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(approximate_size(k) + approximate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(obj) if isinstance(obj, (set, frozenset)) else obj
+        if len(items) <= _SIZE_SAMPLE:
+            return size + sum(approximate_size(item) for item in items)
+        step = len(items) / _SIZE_SAMPLE
+        sampled = sum(approximate_size(items[int(i * step)]) for i in range(_SIZE_SAMPLE))
+        return size + sampled * len(items) // _SIZE_SAMPLE
+    if hasattr(obj, "__slots__"):
+        return size + sum(
+            approximate_size(getattr(obj, slot))
+            for klass in type(obj).__mro__
+            for slot in klass.__dict__.get("__slots__", ())
+            if hasattr(obj, slot)
+        )
+    if hasattr(obj, "__dict__"):
+        return size + approximate_size(vars(obj))
+    return size
+
+
+class CacheState(Enum):
+    MISSING = auto()
+    FRESH = auto()
+    STALE = auto()
+
+
+class CacheEntry(TypedDict):
+    cached_at: datetime
+    "When the data has been stored"
+
+    data: Any
+    "The cached data"
+
+    allowed_time: timedelta
+    "How long the data is considered fresh"
+
+    used_at: datetime
+    "The last time the entry has been read"
+
+    size: int
+    "The approximate size of the data, in bytes"
+
+    validators: Any
+    "What tells whether the data changed upstream since it has been stored, if anything"
+
+
+class CacheNamespace:
+    """
+    A bounded TTL + LRU cache for a single kind of data.
+
+    Entries are fresh for `ttl`, can then be served stale for `stale_time` while being refreshed,
+    and are dropped afterwards. When `max_entries` or `max_bytes` is exceeded, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl: timedelta,
+        stale_time: timedelta = timedelta(0),
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.stale_time = stale_time
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        name: str,
+        *,
+        ttl: timedelta,
+        stale_time: timedelta = timedelta(0),
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> "CacheNamespace":
+        """
+        Create a namespace whose limits can be overridden with the `CACHE_<NAME>_TTL`,
+        `CACHE_<NAME>_MAX_ENTRIES` and `CACHE_<NAME>_MAX_BYTES` environment variables.
+        """
+        prefix = f"CACHE_{name.upper()}_"
+        if value := os.environ.get(f"{prefix}TTL"):
+            ttl = timedelta(seconds=float(value))
+        if value := os.environ.get(f"{prefix}MAX_ENTRIES"):
+            max_entries = int(value) or None
+        if value := os.environ.get(f"{prefix}MAX_BYTES"):
+            max_bytes = int(value) or None
+        return cls(
+            name, ttl=ttl, stale_time=stale_time, max_entries=max_entries, max_bytes=max_bytes
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def items(self) -> Iterator[Tuple[str, CacheEntry]]:
+        return iter(list(self._entries.items()))
+
+    def invalid_at(self, entry: CacheEntry) -> datetime:
+        return entry["cached_at"] + entry["allowed_time"]
+
+    def _state_of(self, entry: CacheEntry, now: datetime) -> CacheState:
+        invalid_at = self.invalid_at(entry)
+        if invalid_at >= now:
+            return CacheState.FRESH
+        if invalid_at + self.stale_time >= now:
+            return CacheState.STALE
+        return CacheState.MISSING
+
+    def get(
+        self, key: str, *, keep_expired: bool = False
+    ) -> Tuple[CacheState, Optional[CacheEntry]]:
+        """
+        Look an entry up, marking it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry.
+        keep_expired : bool
+            Whether an entry too old to be served is kept and returned anyway, as `MISSING`, for
+            callers that have nothing better to serve.
+
+        Returns
+        -------
+        Tuple[CacheState, Optional[CacheEntry]]
+            The state of the entry and the entry itself, if it can be used.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return CacheState.MISSING, None
+
+        now = datetime.now()
+        state = self._state_of(entry, now)
+        if state is CacheState.MISSING:
+            self.misses += 1
+            if keep_expired:
+                return state, entry
+            self._remove(key)
+            self.expirations += 1
+            return state, None
+
+        if state is CacheState.FRESH:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        entry["used_at"] = now
+        self._entries.move_to_end(key)
+        return state, entry
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """
+        Get an entry without touching its recency nor the counters.
+        """
+        return self._entries.get(key)
+
+    def set(
+        self,
+        key: str,
+        data: Any,
+        *,
+        cached_at: Optional[datetime] = None,
+        allowed_time: Optional[timedelta] = None,
+        validators: Any = None,
+    ) -> CacheEntry:
+        now = datetime.now()
+        previous = self._entries.get(key)
+        if previous is not None:
+            self._remove(key)
+
+        entry = CacheEntry(
+            cached_at=cached_at or now,
+            data=data,
+            allowed_time=self.ttl if allowed_time is None else allowed_time,
+            # A refresh is not a use: keep the last time a user asked for this entry
+            used_at=previous["used_at"] if previous else now,
+            size=approximate_size(data),
+            validators=validators,
+        )
+        self._entries[key] = entry
+        self.total_bytes += entry["size"]
+        self._evict()
+        return entry
+
+    def revalidate(
+        self,
+        key: str,
+        *,
+        cached_at: Optional[datetime] = None,
+        allowed_time: Optional[timedelta] = None,
+    ) -> Optional[CacheEntry]:
+        """
+        Restart the freshness of an entry, its data being known to be still up to date: it stays
+        fresh for `allowed_time`, or is stale right away with a zero `allowed_time`. The data is
+        kept as is, so that anything derived from it stays valid.
+
+        Returns
+        -------
+        Optional[CacheEntry]
+            The revalidated entry, None if it is not cached anymore.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry["cached_at"] = cached_at or datetime.now()
+        entry["allowed_time"] = self.ttl if allowed_time is None else allowed_time
+        return entry
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Drop an entry, or every entry of the namespace if no key is given.
+        """
+        if key is None:
+            self._entries.clear()
+            self.total_bytes = 0
+        elif key in self._entries:
+            self._remove(key)
+
+    def purge_expired(self) -> int:
+        """
+        Drop the entries that are too old to be served, even stale.
+
+        Returns
+        -------
+        int
+            The number of dropped entries.
+        """
+        now = datetime.now()
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if self._state_of(entry, now) is CacheState.MISSING
+        ]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry["size"]
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it is bigger than the limit on its own
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class Cache:
+    """
+    A group of cache namespaces, accessible by name.
+    """
+
+    def __init__(self, *namespaces: CacheNamespace) -> None:
+        self._namespaces = {namespace.name: namespace for namespace in namespaces}
+
+    def __getitem__(self, name: str) -> CacheNamespace:
+        return self._namespaces[name]
+
+    def __iter__(self) -> Iterator[CacheNamespace]:
+        return iter(self._namespaces.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._namespaces
+
+    def invalidate(self, name: Optional[str] = None, key: Optional[str] = None) -> None:
+        if name is None:
+            for namespace in self:
+                namespace.invalidate()
+        else:
+            self[name].invalidate(key)
+
+    def purge_expired(self) -> int:
+        return sum(namespace.purge_expired() for namespace in self)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {namespace.name: namespace.stats() for namespace in self}
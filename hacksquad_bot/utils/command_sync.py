@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import discord
+from discord import app_commands
+
+COMMAND_SYNC_PATH = os.environ.get("COMMAND_SYNC_PATH") or "command_sync.json"
+"Where the hashes of the last synced commands are remembered"
+
+COMMAND_SYNC_AT_STARTUP = os.environ.get("COMMAND_SYNC_AT_STARTUP") == "1"
+"Whether the commands are synced at startup, globally and in the servers synced before"
+
+GLOBAL_SCOPE = "global"
+
+# discord.py 2.4 started passing the tree to the command serializers, the pinned 2.1 does not
+_SERIALIZE_WITH_TREE = "tree" in inspect.signature(app_commands.Command.to_dict).parameters
+
+
+def _hash(value: Any) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _scope(guild: Optional[discord.abc.Snowflake]) -> str:
+    return GLOBAL_SCOPE if guild is None else str(guild.id)
+
+
+class SyncResult(NamedTuple):
+    scope: str
+    "`global` or the ID of the server"
+
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    synced: bool
+    "Whether Discord has been called, which is only the case when something changed"
+
+    def describe(self) -> str:
+        if not self.synced:
+            return "no change"
+        parts = [
+            f"{label} {', '.join(sorted(names))}"
+            for label, names in (
+                ("added", self.added),
+                ("changed", self.changed),
+                ("removed", self.removed),
+            )
+            if names
+        ]
+        return "; ".join(parts) or "forced, no change"
+
+
+class CommandSyncer:
+    """
+    Sync the app commands of a scope only when they changed since the last sync.
+
+    Each command is serialized to the payload Discord receives, and hashed. The hashes of the
+    last sync are kept in a JSON file per application, so comparing them tells which commands
+    were added, changed or removed without calling Discord.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, path: str = COMMAND_SYNC_PATH) -> None:
+        self.tree = tree
+        self.path = path
+        self._lock = asyncio.Lock()
+
+    async def _hashes(self, guild: Optional[discord.abc.Snowflake]) -> Dict[str, str]:
+        translator = self.tree.translator
+        hashes: Dict[str, str] = {}
+        for command in self.tree.get_commands(guild=guild):
+            # Serialized like `CommandTree.sync` does
+            tree = (self.tree,) if _SERIALIZE_WITH_TREE else ()
+            if translator:
+                payload = await command.get_translated_payload(*tree, translator)
+            else:
+                payload = command.to_dict(*tree)
+            hashes[f"{payload.get('type', 1)}:{command.name}"] = _hash(payload)
+        return hashes
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        """
+        The command hashes of every scope synced by this application, per scope.
+        """
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as file:
+            stored = json.load(file)
+        application_id = str(self.tree.client.application_id)
+        return stored.get(application_id, {})
+
+    def _save(self, scopes: Dict[str, Dict[str, str]]) -> None:
+        stored: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                stored = json.load(file)
+        stored[str(self.tree.client.application_id)] = scopes
+        # Written aside then moved, so that a crash cannot leave a truncated file behind
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(stored, file, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    async def _load_scopes(self) -> Dict[str, Dict[str, str]]:
+        try:
+            return await asyncio.to_thread(self._load)
+        except (OSError, ValueError):
+            logging.exception("Could not load the synced command hashes, syncing everything")
+            return {}
+
+    async def sync(
+        self, guild: Optional[discord.abc.Snowflake] = None, *, force: bool = False
+    ) -> SyncResult:
+        """
+        Sync the commands of a server, or the global ones, if they changed since the last sync.
+        """
+        async with self._lock:
+            scopes = await self._load_scopes()
+            scope = _scope(guild)
+            previous = scopes.get(scope)
+            current = await self._hashes(guild)
+
+            known = previous or {}
+            added = [key.split(":", 1)[1] for key in current if key not in known]
+            changed = [
+                key.split(":", 1)[1]
+                for key, value in current.items()
+                if key in known and known[key] != value
+            ]
+            removed = [key.split(":", 1)[1] for key in known if key not in current]
+            # Nothing is known about a scope never synced from here, it may hold stale commands
+            if not force and previous is not None and not (added or changed or removed):
+                return SyncResult(scope, [], [], [], synced=False)
+
+            await self.tree.sync(guild=guild)
+            scopes[scope] = current
+            try:
+                await asyncio.to_thread(self._save, scopes)
+            except OSError:
+                logging.exception("Could not save the synced command hashes")
+            return SyncResult(scope, added, changed, removed, synced=True)
+
+    async def sync_known(self) -> List[SyncResult]:
+        """
+        Sync the global commands and those of the servers synced before, where they changed.
+        """
+        scopes = await self._load_scopes()
+        guilds: List[Optional[discord.abc.Snowflake]] = [None]
+        guilds.extend(discord.Object(int(scope)) for scope in scopes if scope != GLOBAL_SCOPE)
+        return [await self.sync(guild) for guild in guilds]
@@ -0,0 +1,221 @@
+import codecs
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Protocol, Tuple, Union
+
+_BACKENDS: Dict[str, Callable[[Union[str, bytes]], Any]] = {"json": json.loads}
+
+try:
+    import orjson  # type: ignore
+
+    _BACKENDS["orjson"] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import ujson  # type: ignore
+
+    _BACKENDS["ujson"] = ujson.loads
+except ImportError:
+    pass
+
+BACKEND = os.environ.get("JSON_BACKEND") or next(
+    (name for name in ("orjson", "ujson") if name in _BACKENDS), "json"
+)
+"The JSON library used to decode payloads. Can be forced with the `JSON_BACKEND` variable."
+
+if BACKEND not in _BACKENDS:
+    raise RuntimeError(f'JSON backend "{BACKEND}" is not installed')
+
+loads: Callable[[Union[str, bytes]], Any] = _BACKENDS[BACKEND]
+
+
+# Streaming
+
+STREAMING = os.environ.get("JSON_STREAMING") == "1"
+"""
+Whether large arrays are decoded while they are downloaded, enabled with `JSON_STREAMING=1`.
+It uses about 40% less peak memory, but can take up to twice as long as decoding the whole
+payload at once with orjson.
+"""
+
+try:
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None
+
+STREAM_BACKEND = os.environ.get("JSON_STREAM_BACKEND") or ("ijson" if ijson else "json")
+"""
+The JSON library used to decode arrays while they are downloaded: ijson (with its C backend
+when available) or json. Can be forced with the `JSON_STREAM_BACKEND` variable.
+"""
+
+if STREAM_BACKEND not in ("ijson", "json") or (STREAM_BACKEND == "ijson" and ijson is None):
+    raise RuntimeError(f'JSON stream backend "{STREAM_BACKEND}" is not installed')
+
+_WHITESPACE = " \t\n\r"
+_SKIP_WHITESPACE = re.compile(r"[ \t\n\r]*").match
+_NUMBER_TAIL = re.compile(r"[0-9eE.+-]*\Z").match
+"Matches what may be the rest of a number cut by the end of a chunk, like `e` after `1`"
+
+
+def _may_go_on(value: Any, text: str, end: int) -> bool:
+    """
+    Whether a value decoded up to `end` may be longer, once more text is read.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _NUMBER_TAIL(text, end) is not None
+    return end == len(text)
+
+
+class AsyncReader(Protocol):
+    async def read(self, n: int = -1) -> bytes:
+        ...
+
+
+class _Buffer:
+    """
+    The text received so far and not consumed yet, decoded from a byte stream.
+    """
+
+    def __init__(self, reader: AsyncReader, chunk_size: int) -> None:
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.position = 0
+        self.eof = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    async def fill(self) -> None:
+        """
+        Read the next chunk, dropping the consumed text.
+        """
+        if self.eof:
+            raise ValueError("Truncated JSON payload")
+        chunk = await self.reader.read(self.chunk_size)
+        self.eof = not chunk
+        self.text = self.text[self.position :] + self._decoder.decode(chunk, final=self.eof)
+        self.position = 0
+
+    async def peek(self) -> str:
+        """
+        Skip whitespace and return the next character, without consuming it.
+        """
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            await self.fill()
+
+    async def expect(self, characters: str) -> str:
+        character = await self.peek()
+        if character not in characters:
+            raise ValueError(f"Expected one of {characters!r} in JSON payload, got {character!r}")
+        self.position += 1
+        return character
+
+    def items(self, decoder: json.JSONDecoder) -> Tuple[List[Any], bool]:
+        """
+        Decode the array items that are complete in the buffer, in a single synchronous pass.
+        Must be called past the opening bracket, and before an item.
+
+        Returns
+        -------
+        Tuple[List[Any], bool]
+            The decoded items, and whether the end of the array has been reached.
+        """
+        items: List[Any] = []
+        text, position = self.text, self.position
+        try:
+            while True:
+                position = _SKIP_WHITESPACE(text, position).end()
+                start = position
+                value, position = decoder.raw_decode(text, position)
+                if not self.eof and _may_go_on(value, text, position):
+                    position = start
+                    return items, False
+                position = _SKIP_WHITESPACE(text, position).end()
+                if position == len(text):
+                    # The separator is needed to tell that the item is not cut, like a number
+                    position = start
+                    return items, False
+                items.append(value)
+                separator = text[position]
+                position += 1
+                if separator == "]":
+                    return items, True
+                if separator != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON payload, got {separator!r}")
+        except json.JSONDecodeError:
+            # Most likely an item cut by the end of the chunk
+            if self.eof:
+                raise
+            position = start
+            return items, False
+        finally:
+            self.position = position
+
+    async def value(self, decoder: json.JSONDecoder) -> Any:
+        """
+        Decode the next value, reading more of the stream until it is complete.
+        """
+        await self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                # Most likely cut by the end of the chunk
+                if self.eof:
+                    raise
+                await self.fill()
+                continue
+            # A number may go on in the next chunk
+            if not self.eof and _may_go_on(value, self.text, end):
+                await self.fill()
+                continue
+            self.position = end
+            return value
+
+
+async def _iter_array_json(reader: AsyncReader, key: str, chunk_size: int) -> AsyncIterator[Any]:
+    buffer = _Buffer(reader, chunk_size)
+    decoder = json.JSONDecoder()
+    await buffer.expect("{")
+    if await buffer.peek() == "}":
+        raise KeyError(key)
+    while True:
+        name = await buffer.value(decoder)
+        await buffer.expect(":")
+        if name != key:
+            # Other members are expected to be small, they are decoded and dropped
+            await buffer.value(decoder)
+        else:
+            await buffer.expect("[")
+            if await buffer.peek() == "]":
+                return
+            while True:
+                items, done = buffer.items(decoder)
+                for item in items:
+                    yield item
+                if done:
+                    return
+                await buffer.fill()
+        if await buffer.expect(",}") == "}":
+            raise KeyError(key)
+
+
+async def iter_array(
+    reader: AsyncReader, key: str, *, chunk_size: int = 64 * 1024
+) -> AsyncIterator[Any]:
+    """
+    Decode the items of the array `key` of a JSON object one by one, while it is read from
+    `reader`. Only one item is fully decoded at a time, instead of the whole payload.
+    """
+    if STREAM_BACKEND == "ijson":
+        async for item in ijson.items_async(reader, f"{key}.item", use_float=True):
+            yield item
+        return
+    async for item in _iter_array_json(reader, key, chunk_size):
+        yield item
@@ -0,0 +1,94 @@
+import os
+import sys
+from typing import Any, Dict, NamedTuple, Optional
+
+import discord
+
+GATEWAY_PROFILE = os.environ.get("GATEWAY_PROFILE") or "minimal"
+"The gateway profile to connect with: minimal, members or full"
+
+
+class GatewayProfile(NamedTuple):
+    """
+    What the bot receives from the gateway and keeps in its cache.
+    """
+
+    name: str
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    chunk_guilds_at_startup: bool
+    max_messages: Optional[int]
+    "How many messages are cached, None disables the message cache"
+
+    @classmethod
+    def build(cls, name: str, required: discord.Intents) -> "GatewayProfile":
+        """
+        Build a profile on top of the intents the loaded extensions require.
+
+        - `minimal`: only the required intents, no member nor message cache, no chunking
+        - `members`: adds the members intent, members are cached as they are seen
+        - `full`: every intent, every member is cached and chunked at startup
+        """
+        if name == "minimal":
+            return cls(
+                name,
+                required | discord.Intents(guilds=True),
+                discord.MemberCacheFlags.none(),
+                chunk_guilds_at_startup=False,
+                max_messages=None,
+            )
+        if name == "members":
+            intents = required | discord.Intents(guilds=True, members=True)
+            return cls(
+                name,
+                intents,
+                discord.MemberCacheFlags.from_intents(intents),
+                chunk_guilds_at_startup=False,
+                max_messages=1000,
+            )
+        if name == "full":
+            return cls(
+                name,
+                discord.Intents.all(),
+                discord.MemberCacheFlags.all(),
+                chunk_guilds_at_startup=True,
+                max_messages=1000,
+            )
+        raise ValueError(f'Unknown gateway profile "{name}", expected minimal, members or full')
+
+    @classmethod
+    def from_env(cls, required: discord.Intents) -> "GatewayProfile":
+        """
+        Build the profile named by `GATEWAY_PROFILE`. `GATEWAY_CHUNK_GUILDS` (0 or 1) and
+        `GATEWAY_MAX_MESSAGES` (0 disables the message cache) override the profile's choices.
+        """
+        profile = cls.build(GATEWAY_PROFILE, required)
+        if value := os.environ.get("GATEWAY_CHUNK_GUILDS"):
+            # Chunking is only possible with the members intent
+            profile = profile._replace(
+                chunk_guilds_at_startup=value == "1" and profile.intents.members
+            )
+        if value := os.environ.get("GATEWAY_MAX_MESSAGES"):
+            profile = profile._replace(max_messages=int(value) or None)
+        return profile
+
+    def client_options(self) -> Dict[str, Any]:
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+            "max_messages": self.max_messages,
+        }
+
+
+def peak_rss_mib() -> Optional[float]:
+    """
+    The peak resident memory of the process, if the platform reports it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in KiB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
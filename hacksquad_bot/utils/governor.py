@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import random
+import time
+from enum import Enum, auto
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from hacksquad_bot.utils.http import _env_float, _env_int
+
+T = TypeVar("T")
+
+FailureClassifier = Callable[[Exception], Optional[float]]
+"""
+Tell whether an exception means the upstream host is failing.
+
+Returns `None` if it does not (the request was wrong, not the host), otherwise the minimum
+delay (in seconds) before retrying, `0` if the host did not ask for one.
+"""
+
+
+class GovernorSettings(NamedTuple):
+    rate: float = 10.0
+    "Sustained number of requests per second sent to a host"
+
+    burst: int = 20
+    "Number of requests that can be sent at once after an idle period"
+
+    max_concurrency: int = 10
+    "Maximum number of requests in flight to a host"
+
+    max_retries: int = 3
+    "How many times a failed request is retried"
+
+    backoff_base: float = 0.5
+    "Delay (in seconds) before the first retry, doubled for every following one"
+
+    backoff_max: float = 10.0
+    "Maximum delay (in seconds) between two retries"
+
+    failure_threshold: int = 5
+    "Number of consecutive failures opening the circuit"
+
+    open_time: float = 30.0
+    "How long (in seconds) the circuit stays open before a trial request is let through"
+
+    @classmethod
+    def from_env(cls) -> "GovernorSettings":
+        """
+        Build the settings from the `UPSTREAM_*` environment variables, falling back to the
+        defaults.
+        """
+        defaults = cls._field_defaults
+        return cls(
+            rate=_env_float("UPSTREAM_RATE", defaults["rate"]),
+            burst=_env_int("UPSTREAM_BURST", defaults["burst"]),
+            max_concurrency=_env_int("UPSTREAM_MAX_CONCURRENCY", defaults["max_concurrency"]),
+            max_retries=_env_int("UPSTREAM_MAX_RETRIES", defaults["max_retries"]),
+            backoff_base=_env_float("UPSTREAM_BACKOFF_BASE", defaults["backoff_base"]),
+            backoff_max=_env_float("UPSTREAM_BACKOFF_MAX", defaults["backoff_max"]),
+            failure_threshold=_env_int(
+                "UPSTREAM_FAILURE_THRESHOLD", defaults["failure_threshold"]
+            ),
+            open_time=_env_float("UPSTREAM_OPEN_TIME", defaults["open_time"]),
+        )
+
+
+class CircuitState(Enum):
+    CLOSED = auto()
+    "The host is healthy, requests go through"
+
+    OPEN = auto()
+    "The host is failing, requests fail fast"
+
+    HALF_OPEN = auto()
+    "A trial request is checking whether the host recovered"
+
+
+class CircuitOpenError(Exception):
+    """The upstream host is unhealthy, the request has not been sent"""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"{host} is unavailable, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """
+    Allow `rate` acquisitions per second on average, and up to `burst` at once.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostGovernor:
+    """
+    Control the requests sent to a single upstream host.
+
+    Requests are rate limited by a token bucket and their concurrency is bounded. Failed requests
+    are retried with a jittered exponential backoff. After `failure_threshold` consecutive
+    failures the circuit opens and requests fail fast with `CircuitOpenError` for `open_time`
+    seconds, then a single trial request decides whether the circuit closes again.
+    """
+
+    def __init__(
+        self, host: str, settings: GovernorSettings, is_failure: FailureClassifier
+    ) -> None:
+        self.host = host
+        self.settings = settings
+        self.is_failure = is_failure
+
+        self.bucket = TokenBucket(settings.rate, settings.burst)
+        self._semaphore = asyncio.Semaphore(settings.max_concurrency)
+        self.in_flight = 0
+
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+        self.requests = 0
+        "Number of requests sent to the host, retries included"
+
+        self.failures = 0
+        "Number of requests that failed because of the host"
+
+        self.retries = 0
+        "Number of retried requests"
+
+        self.rejected = 0
+        "Number of requests not sent because the circuit was open"
+
+    def available(self) -> bool:
+        """
+        Whether a request would currently be let through.
+        """
+        if self.state is CircuitState.CLOSED:
+            return True
+        if self.state is CircuitState.OPEN:
+            return self._retry_in() <= 0
+        return not self._trial_running
+
+    def _retry_in(self) -> float:
+        return self._opened_at + self.settings.open_time - time.monotonic()
+
+    def _admit(self) -> bool:
+        """
+        Check the circuit before sending a request.
+
+        Returns
+        -------
+        bool
+            Whether the request is the trial of a half-open circuit.
+        """
+        if self.state is CircuitState.OPEN:
+            if self._retry_in() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, self._retry_in())
+            self.state = CircuitState.HALF_OPEN
+
+        if self.state is CircuitState.HALF_OPEN:
+            if self._trial_running:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, 0)
+            self._trial_running = True
+            return True
+        return False
+
+    def _record_success(self) -> None:
+        if self.state is not CircuitState.CLOSED:
+            logging.info("Upstream %s recovered, closing its circuit", self.host)
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+
+    def _record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state is CircuitState.HALF_OPEN or (
+            self.state is CircuitState.CLOSED
+            and self.consecutive_failures >= self.settings.failure_threshold
+        ):
+            logging.warning(
+                "Upstream %s failed %s times in a row, opening its circuit for %ss",
+                self.host,
+                self.consecutive_failures,
+                self.settings.open_time,
+            )
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+    def _backoff(self, attempt: int, minimum: float) -> float:
+        # "Full jitter": spreads the retries of every waiting caller over the whole window
+        ceiling = min(self.settings.backoff_max, self.settings.backoff_base * 2**attempt)
+        return max(minimum, random.uniform(0, ceiling))
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Send a request through the governor, retrying it while the host fails.
+
+        Raises
+        ------
+        CircuitOpenError
+            The host is unhealthy, nothing has been sent.
+        """
+        attempt = 0
+        while True:
+            trial = self._admit()
+            try:
+                await self.bucket.acquire()
+                async with self._semaphore:
+                    self.requests += 1
+                    self.in_flight += 1
+                    try:
+                        result = await request()
+                    finally:
+                        self.in_flight -= 1
+            except Exception as error:
+                delay = self.is_failure(error)
+                if delay is None:
+                    # The host answered properly, the request itself was not right
+                    self._record_success()
+                    raise
+                self._record_failure()
+                if self.state is CircuitState.OPEN or attempt >= self.settings.max_retries:
+                    raise
+            else:
+                self._record_success()
+                return result
+            finally:
+                if trial:
+                    self._trial_running = False
+
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, delay))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.name,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": max(self._retry_in(), 0) if self.state is CircuitState.OPEN else 0,
+            "tokens": round(self.bucket.tokens, 2),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+
+class Governor:
+    """
+    Holds one `HostGovernor` per upstream host, created on first use.
+    """
+
+    def __init__(
+        self, is_failure: FailureClassifier, settings: Optional[GovernorSettings] = None
+    ) -> None:
+        self.is_failure = is_failure
+        self.settings = settings or GovernorSettings.from_env()
+        self._hosts: Dict[str, HostGovernor] = {}
+
+    def for_host(self, host: str) -> HostGovernor:
+        governor = self._hosts.get(host)
+        if governor is None:
+            governor = self._hosts[host] = HostGovernor(host, self.settings, self.is_failure)
+        return governor
+
+    def for_url(self, url: str) -> HostGovernor:
+        return self.for_host(urlsplit(url).netloc)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host: governor.stats() for host, governor in self._hosts.items()}
@@ -0,0 +1,131 @@
+import os
+from typing import Dict, Mapping, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class HTTPSettings(NamedTuple):
+    pool_limit: int = 100
+    "Maximum number of simultaneous connections of a session"
+
+    pool_limit_per_host: int = 20
+    "Maximum number of simultaneous connections to a single host"
+
+    dns_cache_ttl: int = 300
+    "How long (in seconds) resolved DNS entries are kept"
+
+    keepalive_timeout: float = 30.0
+    "How long (in seconds) an idle connection is kept open"
+
+    total_timeout: float = 15.0
+    "Maximum duration (in seconds) of a whole request"
+
+    connect_timeout: float = 5.0
+    "Maximum duration (in seconds) to acquire a connection"
+
+    @classmethod
+    def from_env(cls) -> "HTTPSettings":
+        """
+        Build the settings from the `HTTP_*` environment variables, falling back to the defaults.
+        """
+        return cls(
+            pool_limit=_env_int("HTTP_POOL_LIMIT", cls._field_defaults["pool_limit"]),
+            pool_limit_per_host=_env_int(
+                "HTTP_POOL_LIMIT_PER_HOST", cls._field_defaults["pool_limit_per_host"]
+            ),
+            dns_cache_ttl=_env_int("HTTP_DNS_CACHE_TTL", cls._field_defaults["dns_cache_ttl"]),
+            keepalive_timeout=_env_float(
+                "HTTP_KEEPALIVE_TIMEOUT", cls._field_defaults["keepalive_timeout"]
+            ),
+            total_timeout=_env_float("HTTP_TOTAL_TIMEOUT", cls._field_defaults["total_timeout"]),
+            connect_timeout=_env_float(
+                "HTTP_CONNECT_TIMEOUT", cls._field_defaults["connect_timeout"]
+            ),
+        )
+
+
+class Validators(NamedTuple):
+    """
+    What tells whether an upstream response changed since it has been cached.
+    """
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    digest: Optional[str] = None
+    "A hash of the body, for upstreams that send neither an ETag nor a Last-Modified date"
+
+    @classmethod
+    def from_response(cls, headers: Mapping[str, str], digest: str) -> "Validators":
+        return cls(headers.get("ETag"), headers.get("Last-Modified"), digest)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        The headers asking upstream to answer 304 Not Modified if nothing changed.
+        """
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class SessionPool:
+    """
+    Holds one long-lived, keep-alive `aiohttp.ClientSession` per upstream host.
+
+    Sessions are created by `start` (or lazily on first use) and must be closed with `close`.
+    """
+
+    def __init__(self, settings: Optional[HTTPSettings] = None) -> None:
+        self.settings = settings or HTTPSettings.from_env()
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.settings.pool_limit,
+            limit_per_host=self.settings.pool_limit_per_host,
+            ttl_dns_cache=self.settings.dns_cache_ttl,
+            keepalive_timeout=self.settings.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.settings.total_timeout, connect=self.settings.connect_timeout
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    @property
+    def closed(self) -> bool:
+        return not self._sessions
+
+    def start(self, *hosts: str) -> None:
+        """
+        Open the sessions of the given hosts in advance.
+        Must be called from within a running event loop.
+        """
+        for host in hosts:
+            self.for_host(host)
+
+    def for_host(self, host: str) -> aiohttp.ClientSession:
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            session = self._sessions[host] = self._create_session()
+        return session
+
+    def for_url(self, url: str) -> aiohttp.ClientSession:
+        return self.for_host(urlsplit(url).netloc)
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
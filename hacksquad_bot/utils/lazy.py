@@ -0,0 +1,50 @@
+from typing import Any, Callable, Generic, Iterator, List, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class LazyList(Sequence[T], Generic[T]):
+    """
+    A read-only list whose items are built from their raw form on first access.
+
+    Useful for long payloads where a command only needs a few items: the others are never built.
+    """
+
+    __slots__ = ("raw", "_factory", "_items")
+
+    def __init__(self, raw: List[Any], factory: Callable[[Any], T]) -> None:
+        self.raw = raw
+        self._factory = factory
+        self._items: List[Optional[T]] = [None] * len(raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def _get(self, index: int) -> T:
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = self._factory(self.raw[index])
+        return item
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:  # type: ignore
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self.raw)))]
+        if index < 0:
+            index += len(self.raw)
+        if not 0 <= index < len(self.raw):
+            raise IndexError("LazyList index out of range")
+        return self._get(index)
+
+    def __iter__(self) -> Iterator[T]:
+        return (self._get(i) for i in range(len(self.raw)))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} of {len(self.raw)} items>"
+
+    def __getstate__(self):
+        # Only the raw items are worth persisting, the others can be rebuilt
+        return self.raw, self._factory
+
+    def __setstate__(self, state) -> None:
+        self.raw, self._factory = state
+        self._items = [None] * len(self.raw)
@@ -0,0 +1,300 @@
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+METRICS_HOST = os.environ.get("METRICS_HOST") or "127.0.0.1"
+"The interface the Prometheus endpoint listens on"
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT") or 0)
+"The port of the Prometheus endpoint. 0 disables it."
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"Upper bounds (in seconds) of the histogram buckets"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Sample(NamedTuple):
+    labels: Dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    type: str
+    "counter, gauge or histogram"
+
+    help: str
+    samples: List[Sample]
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+"A function reporting metrics that are already tracked elsewhere, only called when rendering"
+
+
+class Histogram:
+    """
+    Count observations into fixed buckets, as Prometheus does.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # The last slot counts the observations above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        seen = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            seen += count
+            yield bound, seen
+
+
+class CommandTimer:
+    """
+    Split the duration of an app command into phases.
+
+    Whatever is not spent in a named phase is accounted as `render`, which includes sending the
+    response.
+    """
+
+    __slots__ = ("started_at", "phases")
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, duration: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+
+_current_timer: ContextVar[Optional[CommandTimer]] = ContextVar("command_timer", default=None)
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """
+    An in-process registry of counters and histograms.
+
+    Recording a value is a dict lookup and an addition. Metrics kept elsewhere (like the cache
+    counters) are reported by collectors, which only run when the metrics are rendered.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: Dict[str, Collector] = {}
+
+    def describe(self, name: str, help: str) -> None:
+        self._help[name] = help
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        series = self.counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = _labels(labels)
+        if (histogram := series.get(key)) is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def add_collector(self, name: str, collector: Collector) -> None:
+        """
+        Register a collector, replacing the one previously registered under the same name.
+        """
+        self._collectors[name] = collector
+
+    def remove_collector(self, name: str) -> None:
+        self._collectors.pop(name, None)
+
+    # App commands
+
+    def start_command(self) -> CommandTimer:
+        """
+        Start timing the app command handled by the current task.
+        """
+        timer = CommandTimer()
+        _current_timer.set(timer)
+        return timer
+
+    def finish_command(self, command: str, timer: CommandTimer, status: str) -> None:
+        total = time.perf_counter() - timer.started_at
+        self.increment("app_commands_total", command=command, status=status)
+        self.observe("app_command_duration_seconds", total, command=command, phase="total")
+        for phase, duration in timer.phases.items():
+            self.observe("app_command_duration_seconds", duration, command=command, phase=phase)
+        self.observe(
+            "app_command_duration_seconds",
+            max(total - sum(timer.phases.values()), 0),
+            command=command,
+            phase="render",
+        )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Account the time spent in the block to a phase of the current app command, if any.
+        """
+        timer = _current_timer.get()
+        if timer is None:
+            yield
+            return
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer.add(name, time.perf_counter() - started_at)
+
+    # Rendering
+
+    def collect(self) -> List[MetricFamily]:
+        families = [
+            MetricFamily(
+                name,
+                "counter",
+                self._help.get(name, ""),
+                [Sample(dict(labels), value) for labels, value in series.items()],
+            )
+            for name, series in self.counters.items()
+        ]
+        for name, collector in list(self._collectors.items()):
+            try:
+                families.extend(collector())
+            except Exception:
+                logging.exception('Metrics collector "%s" failed', name)
+        return families
+
+    def render_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for sample in family.samples:
+                lines.append(f"{family.name}{_format_labels(sample.labels)} {sample.value}")
+
+        for name, series in self.histograms.items():
+            lines.append(f"# HELP {name} {self._help.get(name, '')}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                for bound, count in histogram.cumulative():
+                    bucket_labels = {
+                        **dict(labels),
+                        "le": "+Inf" if bound == float("inf") else str(bound),
+                    }
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{name}_sum{_format_labels(dict(labels))} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(dict(labels))} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+    )
+
+
+METRICS = Metrics()
+"The metrics of the bot"
+
+METRICS.describe("app_commands_total", "App command invocations, by outcome")
+METRICS.describe("app_command_duration_seconds", "App command duration, split by phase")
+METRICS.describe("autocomplete_total", "Autocomplete requests, by command")
+METRICS.describe("upstream_responses_total", "Upstream responses, by host and status code")
+METRICS.describe("upstream_request_duration_seconds", "Upstream request duration, by host")
+METRICS.describe(
+    "upstream_revalidations_total",
+    "Conditional reloads of cache entries, by namespace and outcome",
+)
+METRICS.describe("random_hero_pool_total", "Random heroes taken from the pool, or missing")
+METRICS.describe("team_warmer_total", "Team details expired or fetched by the warmer")
+
+
+class MetricsServer:
+    """
+    Serve the metrics in the Prometheus text format on `/metrics`.
+    """
+
+    def __init__(
+        self, metrics: Metrics = METRICS, *, host: str = METRICS_HOST, port: int = METRICS_PORT
+    ) -> None:
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner: Optional["web.AppRunner"] = None
+
+    async def _handle(self, _: "web.Request") -> "web.Response":
+        from aiohttp import web
+
+        return web.Response(text=self.metrics.render_prometheus(), content_type="text/plain")
+
+    async def start(self) -> None:
+        # The web server is only imported when the endpoint is enabled
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
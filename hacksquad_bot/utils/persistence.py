@@ -0,0 +1,137 @@
+import logging
+import os
+import pickle
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+CACHE_SNAPSHOT_PATH = os.environ.get("CACHE_SNAPSHOT_PATH") or "cache.sqlite3"
+"Where the cache snapshot is stored"
+
+CACHE_SNAPSHOT_INTERVAL = float(os.environ.get("CACHE_SNAPSHOT_INTERVAL") or 300)
+"How often (in seconds) the cache is snapshotted. 0 disables the snapshots."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    cached_at REAL NOT NULL,
+    allowed_time REAL NOT NULL,
+    payload BLOB NOT NULL,
+    validators BLOB,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SnapshotEntry(NamedTuple):
+    namespace: str
+    key: str
+    cached_at: datetime
+    allowed_time: timedelta
+    data: Any
+    validators: Any = None
+
+
+class CacheSnapshot:
+    """
+    Persist cache entries to a SQLite file so that a restarted bot starts warm.
+
+    The methods are blocking and meant to be run in a thread. Only the entries that changed
+    since the last save are serialized and written.
+    """
+
+    def __init__(self, path: str = CACHE_SNAPSHOT_PATH) -> None:
+        self.path = path
+        self._saved: Dict[Tuple[str, str], datetime] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(_SCHEMA)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(cache_entries)")]
+        if "validators" not in columns:
+            # Snapshots written before validators were kept
+            connection.execute("ALTER TABLE cache_entries ADD COLUMN validators BLOB")
+        return connection
+
+    def save(self, entries: Iterable[SnapshotEntry]) -> int:
+        """
+        Write the given entries, and drop the stored ones that are not part of them anymore.
+
+        Returns
+        -------
+        int
+            The number of written entries.
+        """
+        current: Dict[Tuple[str, str], datetime] = {}
+        rows: List[Tuple[str, str, float, float, bytes, Optional[bytes]]] = []
+        for entry in entries:
+            identifier = (entry.namespace, entry.key)
+            current[identifier] = entry.cached_at
+            if self._saved.get(identifier) == entry.cached_at:
+                continue
+            rows.append(
+                (
+                    entry.namespace,
+                    entry.key,
+                    entry.cached_at.timestamp(),
+                    entry.allowed_time.total_seconds(),
+                    pickle.dumps(entry.data, protocol=pickle.HIGHEST_PROTOCOL),
+                    (
+                        None
+                        if entry.validators is None
+                        else pickle.dumps(entry.validators, protocol=pickle.HIGHEST_PROTOCOL)
+                    ),
+                )
+            )
+        removed = [identifier for identifier in self._saved if identifier not in current]
+
+        if rows or removed:
+            with self._connect() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                connection.executemany(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", removed
+                )
+            connection.close()
+
+        self._saved = current
+        return len(rows)
+
+    def load(self) -> List[SnapshotEntry]:
+        """
+        Read every stored entry. Entries that cannot be decoded anymore are skipped.
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT namespace, key, cached_at, allowed_time, payload, validators"
+                " FROM cache_entries"
+            ).fetchall()
+        finally:
+            connection.close()
+
+        entries: List[SnapshotEntry] = []
+        for namespace, key, cached_at, allowed_time, payload, validators in rows:
+            try:
+                data = pickle.loads(payload)
+                validators = validators and pickle.loads(validators)
+            except Exception:
+                logging.warning('Could not restore cache entry "%s:%s"', namespace, key)
+                continue
+            entry = SnapshotEntry(
+                namespace=namespace,
+                key=key,
+                cached_at=datetime.fromtimestamp(cached_at),
+                allowed_time=timedelta(seconds=allowed_time),
+                data=data,
+                validators=validators,
+            )
+            entries.append(entry)
+            self._saved[(namespace, key)] = entry.cached_at
+        return entries
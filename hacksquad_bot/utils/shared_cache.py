@@ -0,0 +1,426 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import pickle
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND") or ""
+"The cache shared between processes: memory, sqlite or redis. Empty keeps every cache local."
+
+CACHE_BACKEND_PATH = os.environ.get("CACHE_BACKEND_PATH") or "shared-cache.sqlite3"
+"The file of the sqlite backend"
+
+CACHE_BACKEND_URL = os.environ.get("CACHE_BACKEND_URL") or "redis://127.0.0.1:6379/0"
+"The server of the redis backend"
+
+CACHE_BACKEND_TIMEOUT = float(os.environ.get("CACHE_BACKEND_TIMEOUT") or 5)
+"How long (in seconds) the redis backend waits for a reply, connecting included"
+
+CACHE_BACKEND_SECRET = os.environ.get("CACHE_BACKEND_SECRET") or ""
+"""
+The key the entries of the sqlite and redis backends are signed with. Required by them: entries
+are pickled, and only the ones written by a bot knowing the key are unpickled.
+"""
+
+_SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+class SharedEntry(NamedTuple):
+    cached_at: float
+    "When the data has been fetched, as a UNIX timestamp"
+
+    allowed_time: float
+    "How long (in seconds) the data is considered fresh"
+
+    data: Any
+
+    validators: Any = None
+    "What tells whether the data changed upstream since it has been fetched, if anything"
+
+    @property
+    def fresh(self) -> bool:
+        return self.cached_at + self.allowed_time > time.time()
+
+
+class SignatureError(Exception):
+    """A shared entry has not been signed with our secret, it is not unpickled"""
+
+
+def _sign(secret: bytes, body: bytes) -> bytes:
+    return hmac.new(secret, body, hashlib.sha256).digest()
+
+
+def _dumps(entry: SharedEntry, secret: bytes) -> bytes:
+    body = pickle.dumps(tuple(entry), protocol=pickle.HIGHEST_PROTOCOL)
+    return _sign(secret, body) + body
+
+
+def _loads(payload: bytes, secret: bytes) -> SharedEntry:
+    signature, body = payload[:_SIGNATURE_SIZE], payload[_SIGNATURE_SIZE:]
+    if not hmac.compare_digest(signature, _sign(secret, body)):
+        raise SignatureError("The shared cache entry is not signed with CACHE_BACKEND_SECRET")
+    return SharedEntry(*pickle.loads(body))
+
+
+def _secret_key(secret: str, backend: str) -> bytes:
+    if not secret:
+        raise ValueError(f"The {backend} cache backend needs CACHE_BACKEND_SECRET to be set")
+    return secret.encode()
+
+
+class CacheBackend:
+    """
+    A cache shared by every process of the bot, sitting between their local caches and upstream.
+
+    Besides entries, backends hold expiring locks, so that a single process refreshes a key.
+    """
+
+    async def get(self, namespace: str, key: str) -> Optional[SharedEntry]:
+        raise NotImplementedError
+
+    async def set(self, namespace: str, key: str, entry: SharedEntry, expire_in: float) -> None:
+        """
+        Store an entry, dropped by the backend after `expire_in` seconds.
+        """
+        raise NotImplementedError
+
+    async def acquire(self, name: str, token: str, expire_in: float) -> bool:
+        """
+        Try to take the lock `name` without waiting. It is released after `expire_in` seconds
+        if its owner does not release it.
+        """
+        raise NotImplementedError
+
+    async def release(self, name: str, token: str) -> None:
+        """
+        Release the lock `name` if it is still owned by `token`.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Shares entries between the bots of a single process. Mostly useful for testing.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str], Tuple[float, SharedEntry]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, namespace: str, key: str) -> Optional[SharedEntry]:
+        stored = self._entries.get((namespace, key))
+        if stored is None:
+            return None
+        if stored[0] <= time.time():
+            del self._entries[(namespace, key)]
+            return None
+        return stored[1]
+
+    async def set(self, namespace: str, key: str, entry: SharedEntry, expire_in: float) -> None:
+        self._entries[(namespace, key)] = (time.time() + expire_in, entry)
+
+    async def acquire(self, name: str, token: str, expire_in: float) -> bool:
+        now = time.time()
+        owner = self._locks.get(name)
+        if owner is not None and owner[1] > now:
+            return False
+        self._locks[name] = (token, now + expire_in)
+        return True
+
+    async def release(self, name: str, token: str) -> None:
+        owner = self._locks.get(name)
+        if owner is not None and owner[0] == token:
+            del self._locks[name]
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS shared_locks (
+    name TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Shares entries between the processes of a host through a SQLite file.
+
+    Queries are blocking and run in a thread, each on its own connection.
+    """
+
+    def __init__(self, path: str = CACHE_BACKEND_PATH, secret: str = CACHE_BACKEND_SECRET) -> None:
+        self.path = path
+        self._secret = _secret_key(secret, "sqlite")
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit, transactions are opened explicitly when needed
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SQLITE_SCHEMA)
+            self._ready = True
+        return connection
+
+    def _get(self, namespace: str, key: str) -> Optional[SharedEntry]:
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT payload FROM shared_entries"
+                " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        finally:
+            connection.close()
+        return _loads(row[0], self._secret) if row else None
+
+    def _set(self, namespace: str, key: str, entry: SharedEntry, expire_in: float) -> None:
+        payload = _dumps(entry, self._secret)
+        connection = self._connect()
+        try:
+            now = time.time()
+            connection.execute(
+                "INSERT OR REPLACE INTO shared_entries VALUES (?, ?, ?, ?)",
+                (namespace, key, now + expire_in, payload),
+            )
+            connection.execute("DELETE FROM shared_entries WHERE expires_at <= ?", (now,))
+        finally:
+            connection.close()
+
+    def _acquire(self, name: str, token: str, expire_in: float) -> bool:
+        connection = self._connect()
+        try:
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "DELETE FROM shared_locks WHERE name = ? AND expires_at <= ?", (name, now)
+            )
+            acquired = (
+                connection.execute(
+                    "INSERT OR IGNORE INTO shared_locks VALUES (?, ?, ?)",
+                    (name, token, now + expire_in),
+                ).rowcount
+                == 1
+            )
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        return acquired
+
+    def _release(self, name: str, token: str) -> None:
+        connection = self._connect()
+        try:
+            connection.execute(
+                "DELETE FROM shared_locks WHERE name = ? AND token = ?", (name, token)
+            )
+        finally:
+            connection.close()
+
+    async def get(self, namespace: str, key: str) -> Optional[SharedEntry]:
+        return await asyncio.to_thread(self._get, namespace, key)
+
+    async def set(self, namespace: str, key: str, entry: SharedEntry, expire_in: float) -> None:
+        await asyncio.to_thread(self._set, namespace, key, entry, expire_in)
+
+    async def acquire(self, name: str, token: str, expire_in: float) -> bool:
+        return await asyncio.to_thread(self._acquire, name, token, expire_in)
+
+    async def release(self, name: str, token: str) -> None:
+        await asyncio.to_thread(self._release, name, token)
+
+
+class RedisError(Exception):
+    """The Redis server answered with an error, or did not answer in time"""
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shares entries between the processes of a cluster through a server speaking the Redis
+    protocol (RESP). Only `GET`, `SET` (with `PX` and `NX`), `DEL` and `SELECT` are used.
+    """
+
+    def __init__(
+        self,
+        url: str = CACHE_BACKEND_URL,
+        prefix: str = "hacksquad",
+        timeout: float = CACHE_BACKEND_TIMEOUT,
+        secret: str = CACHE_BACKEND_SECRET,
+    ) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.database = int(parts.path.strip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._secret = _secret_key(secret, "redis")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _key(self, *parts: str) -> bytes:
+        return ":".join((self.prefix, *parts)).encode()
+
+    @staticmethod
+    def _encode(*arguments: Any) -> bytes:
+        encoded = [
+            argument if isinstance(argument, bytes) else str(argument).encode()
+            for argument in arguments
+        ]
+        return b"*%d\r\n" % len(encoded) + b"".join(
+            b"$%d\r\n%s\r\n" % (len(argument), argument) for argument in encoded
+        )
+
+    async def _read_reply(self) -> Any:
+        assert self._reader is not None
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("The Redis server closed the connection")
+        kind, value = line[:1], line[1:-2]
+        if kind == b"+":
+            return value.decode()
+        if kind == b"-":
+            raise RedisError(value.decode())
+        if kind == b":":
+            return int(value)
+        if kind == b"$":
+            length = int(value)
+            if length == -1:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(value)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.database:
+            await self._send("SELECT", self.database)
+
+    async def _send(self, *arguments: Any) -> Any:
+        assert self._writer is not None
+        try:
+            self._writer.write(self._encode(*arguments))
+            await self._writer.drain()
+            return await self._read_reply()
+        except BaseException:
+            # A reply left unread would be taken for the reply of the next command
+            self._abort()
+            raise
+
+    async def _round_trip(self, *arguments: Any) -> Any:
+        if self._writer is None or self._writer.is_closing():
+            await self._connect()
+        return await self._send(*arguments)
+
+    async def execute(self, *arguments: Any) -> Any:
+        """
+        Send a command and return its reply, reconnecting once if the connection dropped.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # A single connection: commands are sent one at a time
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    return await asyncio.wait_for(self._round_trip(*arguments), self.timeout)
+                except asyncio.TimeoutError:
+                    # Not retried, a server this slow would hold every cache miss twice as long
+                    self._abort()
+                    raise RedisError(f"No reply from the Redis server within {self.timeout}s")
+                except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                    await self._disconnect()
+                    if attempt:
+                        raise
+
+    def _abort(self) -> Optional[asyncio.StreamWriter]:
+        """
+        Drop the connection without waiting for it to be closed.
+        """
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+        return writer
+
+    async def _disconnect(self) -> None:
+        writer = self._abort()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def get(self, namespace: str, key: str) -> Optional[SharedEntry]:
+        payload = await self.execute("GET", self._key("entry", namespace, key))
+        # Large payloads take a while to (de)serialize, which is done off the event loop
+        if payload is None:
+            return None
+        return await asyncio.to_thread(_loads, payload, self._secret)
+
+    async def set(self, namespace: str, key: str, entry: SharedEntry, expire_in: float) -> None:
+        await self.execute(
+            "SET",
+            self._key("entry", namespace, key),
+            await asyncio.to_thread(_dumps, entry, self._secret),
+            "PX",
+            max(int(expire_in * 1000), 1),
+        )
+
+    async def acquire(self, name: str, token: str, expire_in: float) -> bool:
+        reply = await self.execute(
+            "SET", self._key("lock", name), token, "NX", "PX", max(int(expire_in * 1000), 1)
+        )
+        return reply == "OK"
+
+    async def release(self, name: str, token: str) -> None:
+        # Not atomic, the lock expiring between the two commands is harmless: at worst a second
+        # process refreshes the same key
+        lock = self._key("lock", name)
+        if await self.execute("GET", lock) == token.encode():
+            await self.execute("DEL", lock)
+
+    async def close(self) -> None:
+        await self._disconnect()
+
+
+def create_backend(name: str = CACHE_BACKEND) -> Optional[CacheBackend]:
+    """
+    Create the backend named by `CACHE_BACKEND`, if any.
+    """
+    if not name:
+        return None
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f'Unknown cache backend "{name}", expected memory, sqlite or redis')
+
+
+def lock_token() -> str:
+    """
+    A token identifying a lock owner across processes and hosts.
+    """
+    return f"{os.getpid()}:{uuid.uuid4().hex}"
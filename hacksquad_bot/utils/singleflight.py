@@ -0,0 +1,65 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key into a single execution.
+
+    While a call for a key is in flight, every other caller for that key awaits the same
+    result instead of running the function again.
+    Keys are expected to look like `namespace` or `namespace:identifier`, the namespace being
+    used to group the recorded metrics.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.executions: "Counter[str]" = Counter()
+        "Number of times the function has really been executed, per namespace"
+
+        self.coalesced: "Counter[str]" = Counter()
+        "Number of calls that awaited an already in-flight execution, per namespace"
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.partition(":")[0]
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `func` unless a call with the same key is already in flight, then return its result.
+
+        The execution runs in its own task: a caller being cancelled does not cancel the
+        execution the other callers are waiting on.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions[self._namespace(key)] += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced[self._namespace(key)] += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every caller has been cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            namespace: {
+                "executions": self.executions[namespace],
+                "coalesced": self.coalesced[namespace],
+            }
+            for namespace in self.executions
+        }
@@ -0,0 +1,59 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Kept free of heavy imports: this module is imported first, to time the imports of the others
+
+
+class StartupProfile:
+    """
+    Timestamps of the startup milestones, relative to when this module got imported.
+
+    Each milestone ends a phase that started at the previous one, so a cold start can be broken
+    down into how long the imports, the login, the extensions and the gateway took.
+    """
+
+    MILESTONES = ("import", "login", "restore", "extensions", "ready", "first_interaction")
+    "In the order they are reached"
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.milestones: Dict[str, float] = {}
+
+    def mark(self, milestone: str) -> Optional[float]:
+        """
+        Record when a milestone is reached, returning the time since the start. Milestones are
+        only recorded the first time, later calls are ignored and return None.
+        """
+        if milestone in self.milestones:
+            return None
+        elapsed = self.milestones[milestone] = time.perf_counter() - self.started_at
+        return elapsed
+
+    def phases(self) -> List[Tuple[str, float]]:
+        """
+        The (milestone, duration) of the phases ended by the milestones reached so far.
+        """
+        phases: List[Tuple[str, float]] = []
+        previous = 0.0
+        for milestone in self.MILESTONES:
+            if (at := self.milestones.get(milestone)) is not None:
+                phases.append((milestone, at - previous))
+                previous = at
+        return phases
+
+    def report(self) -> str:
+        return ", ".join(f"{milestone} {duration:.2f}s" for milestone, duration in self.phases())
+
+    def log(self, milestone: str) -> None:
+        """
+        Mark a milestone and log the breakdown so far.
+        """
+        if (elapsed := self.mark(milestone)) is not None:
+            logging.info(
+                'Startup reached "%s" after %.2fs (%s)', milestone, elapsed, self.report()
+            )
+
+
+STARTUP = StartupProfile()
+"The startup milestones of this process"
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Any, Optional, Union
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO-8601 timestamp.
+
+    The usual `2022-10-01T10:00:00.000Z` format is handled by the fast `datetime.fromisoformat`,
+    anything else goes through dateutil's `isoparse`.
+    """
+    try:
+        if value.endswith("Z"):
+            return datetime.fromisoformat(f"{value[:-1]}+00:00")
+        return datetime.fromisoformat(value)
+    except ValueError:
+        # Imported on first use, most payloads never need it
+        from dateutil.parser import isoparse
+
+        return isoparse(value)
+
+
+class LazyTimestamp:
+    """
+    A descriptor exposing a timestamp that is stored raw in `slot`, and parsed on first access.
+
+    Models are often built from payloads where most timestamps are never read, so they are kept
+    as strings until something needs them.
+    """
+
+    def __init__(self, slot: str) -> None:
+        self.slot = slot
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if isinstance(value, str):
+            value = parse_timestamp(value) if value else None
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance: Any, value: Union[str, datetime, None]) -> None:
+        setattr(instance, self.slot, value)
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+from hacksquad_bot.utils.cache import Cache, CacheNamespace, CacheState, approximate_size
+
+HOUR = timedelta(hours=1)
+
+
+def make_namespace(**kwargs) -> CacheNamespace:
+    return CacheNamespace("test", ttl=HOUR, stale_time=HOUR, **kwargs)
+
+
+def test_entry_states():
+    namespace = make_namespace()
+    now = datetime.now()
+    namespace.set("fresh", 1)
+    namespace.set("stale", 2, cached_at=now - HOUR - timedelta(minutes=1))
+    namespace.set("expired", 3, cached_at=now - 3 * HOUR)
+
+    state, entry = namespace.get("fresh")
+    assert state is CacheState.FRESH and entry["data"] == 1
+    state, entry = namespace.get("stale")
+    assert state is CacheState.STALE and entry["data"] == 2
+    assert namespace.get("expired") == (CacheState.MISSING, None)
+    assert namespace.get("unknown") == (CacheState.MISSING, None)
+    assert "expired" not in namespace
+
+    assert namespace.stats()["hits"] == 1
+    assert namespace.stats()["stale_hits"] == 1
+    assert namespace.stats()["misses"] == 2
+    assert namespace.stats()["expirations"] == 1
+
+
+def test_allowed_time_overrides_ttl():
+    namespace = make_namespace()
+    namespace.set("short", 1, allowed_time=timedelta(0))
+    assert namespace.get("short")[0] is CacheState.STALE
+
+
+def test_least_recently_used_entries_are_evicted():
+    namespace = make_namespace(max_entries=2)
+    namespace.set("a", 1)
+    namespace.set("b", 2)
+    namespace.get("a")
+    namespace.set("c", 3)
+    assert "a" in namespace and "c" in namespace and "b" not in namespace
+    assert namespace.stats()["evictions"] == 1
+
+
+def test_size_limit_keeps_the_newest_entry():
+    namespace = make_namespace(max_bytes=1)
+    namespace.set("a", "x" * 100)
+    namespace.set("b", "y" * 100)
+    assert len(namespace) == 1 and "b" in namespace
+    assert namespace.total_bytes == approximate_size("y" * 100)
+
+
+def test_refresh_keeps_the_last_use():
+    namespace = make_namespace()
+    namespace.set("a", 1)
+    used_at = namespace.peek("a")["used_at"]
+    namespace.set("a", 2)
+    assert namespace.peek("a")["used_at"] == used_at
+    assert namespace.peek("a")["data"] == 2
+
+
+def test_peek_does_not_touch_counters():
+    namespace = make_namespace()
+    namespace.set("a", 1)
+    assert namespace.peek("a")["data"] == 1
+    assert namespace.peek("b") is None
+    assert namespace.stats()["hits"] == namespace.stats()["misses"] == 0
+
+
+def test_revalidate_keeps_the_data():
+    namespace = make_namespace()
+    data = [1, 2, 3]
+    namespace.set("a", data, cached_at=datetime.now() - 3 * HOUR, validators="v1")
+    entry = namespace.revalidate("a")
+    assert entry is not None and entry["data"] is data and entry["validators"] == "v1"
+    assert namespace.get("a")[0] is CacheState.FRESH
+    assert namespace.revalidate("unknown") is None
+
+
+def test_invalidate_and_purge():
+    namespace = make_namespace()
+    namespace.set("a", 1)
+    namespace.set("b", 2)
+    namespace.set("old", 3, cached_at=datetime.now() - 3 * HOUR)
+    assert namespace.purge_expired() == 1
+    namespace.invalidate("a")
+    assert list(key for key, _ in namespace.items()) == ["b"]
+    namespace.invalidate()
+    assert len(namespace) == 0 and namespace.total_bytes == 0
+
+
+def test_namespace_limits_from_env(monkeypatch):
+    monkeypatch.setenv("CACHE_TEST_TTL", "60")
+    monkeypatch.setenv("CACHE_TEST_MAX_ENTRIES", "5")
+    monkeypatch.setenv("CACHE_TEST_MAX_BYTES", "0")
+    namespace = CacheNamespace.from_env("test", ttl=HOUR, max_bytes=10)
+    assert namespace.ttl == timedelta(seconds=60)
+    assert namespace.max_entries == 5
+    assert namespace.max_bytes is None
+
+
+def test_cache_groups_namespaces():
+    cache = Cache(CacheNamespace("a", ttl=HOUR), CacheNamespace("b", ttl=HOUR))
+    cache["a"].set("key", 1)
+    cache["b"].set("key", 2)
+    cache.invalidate("a")
+    assert len(cache["a"]) == 0 and len(cache["b"]) == 1
+    assert set(cache.stats()) == {"a", "b"}
+
+
+def test_approximate_size_samples_long_lists():
+    items = [{"name": f"item {i}"} for i in range(1000)]
+    exact = approximate_size(items[:64]) * 1000 // 64
+    assert abs(approximate_size(items) - exact) / exact < 0.2
+
+
+def test_expired_entries_can_be_kept():
+    namespace = make_namespace()
+    namespace.set("old", 1, cached_at=datetime.now() - 3 * HOUR)
+    state, entry = namespace.get("old", keep_expired=True)
+    assert state is CacheState.MISSING and entry["data"] == 1
+    assert "old" in namespace
+    assert namespace.get("old") == (CacheState.MISSING, None)
+    assert "old" not in namespace
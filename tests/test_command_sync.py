@@ -0,0 +1,55 @@
+import asyncio
+
+import discord
+from discord import app_commands
+
+from hacksquad_bot.utils.command_sync import CommandSyncer
+
+
+def make_tree() -> app_commands.CommandTree:
+    client = discord.Client(intents=discord.Intents.none())
+    client._connection.application_id = 1234
+    tree = app_commands.CommandTree(client)
+
+    @tree.command(description="Pong!")
+    async def pong(interaction: discord.Interaction) -> None:
+        pass
+
+    @tree.context_menu(name="inspect")
+    async def inspect(interaction: discord.Interaction, user: discord.User) -> None:
+        pass
+
+    return tree
+
+
+def test_commands_are_only_synced_when_they_change(tmp_path, monkeypatch):
+    tree = make_tree()
+    synced = []
+
+    async def sync(*, guild=None):
+        synced.append(guild)
+        return []
+
+    monkeypatch.setattr(tree, "sync", sync)
+    syncer = CommandSyncer(tree, str(tmp_path / "command_sync.json"))
+
+    async def scenario():
+        first = await syncer.sync()
+        assert first.synced and sorted(first.added) == ["inspect", "pong"]
+        assert not (await syncer.sync()).synced
+
+        tree.get_command("pong").description = "Ping!"
+        changed = await syncer.sync()
+        assert changed.synced and changed.changed == ["pong"]
+
+        tree.remove_command("inspect", type=discord.AppCommandType.user)
+        removed = await syncer.sync()
+        assert removed.removed == ["inspect"]
+
+        assert (await syncer.sync(force=True)).synced
+        guild = discord.Object(42)
+        assert (await syncer.sync(guild)).synced
+        return [result.scope for result in await syncer.sync_known()]
+
+    assert asyncio.run(scenario()) == ["global", "42"]
+    assert len(synced) == 5
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from hacksquad_bot.utils import fastjson
+
+
+class ChunkedReader:
+    """
+    Serve a payload in chunks of random sizes, like a response stream.
+    """
+
+    def __init__(self, payload: bytes, max_chunk: int, seed: int) -> None:
+        self.payload = payload
+        self.position = 0
+        self.max_chunk = max_chunk
+        self.random = random.Random(seed)
+
+    async def read(self, n: int = -1) -> bytes:
+        size = self.random.randint(1, self.max_chunk)
+        if n >= 0:
+            size = min(size, n)
+        chunk = self.payload[self.position : self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+
+def decode(payload: bytes, key: str, max_chunk: int, seed: int = 0, chunk_size: int = 7):
+    async def collect():
+        reader = ChunkedReader(payload, max_chunk, seed)
+        return [item async for item in fastjson._iter_array_json(reader, key, chunk_size)]
+
+    return asyncio.run(collect())
+
+
+def random_item(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(8 if depth < 2 else 6)
+    if kind == 0:
+        return rng.randint(-(10**12), 10**12)
+    if kind == 1:
+        return rng.uniform(-1e6, 1e6)
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind in (3, 4, 5):
+        # Multi-byte characters and characters meaningful to the parser
+        alphabet = 'ab ,]}["\\:é€😀\n'
+        return "".join(rng.choice(alphabet) for _ in range(rng.randrange(12)))
+    if kind == 6:
+        return [random_item(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": random_item(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_payloads_match_json_loads(seed):
+    rng = random.Random(seed)
+    items = [random_item(rng) for _ in range(rng.randrange(30))]
+    document = {"before": random_item(rng), "list": items, "after": [1, 2]}
+    for indent in (None, 2):
+        payload = json.dumps(document, indent=indent, ensure_ascii=seed % 2 == 0).encode()
+        for max_chunk in (1, 2, 3, 5, 16, 4096):
+            assert decode(payload, "list", max_chunk, seed) == json.loads(payload)["list"]
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        (b'{"list": []}', []),
+        (b' { "list" : [ ] } ', []),
+        (b'{"list": [1, 23, 456]}', [1, 23, 456]),
+        (b'{"list": [1e10, -0.5, 12345678901234567890]}', [1e10, -0.5, 12345678901234567890]),
+        (b'{"list": [true, false, null]}', [True, False, None]),
+        (b'{"list": ["\\u00e9", "\\"]"]}', ["é", '"]']),
+        (b'{"other": {"list": [0]}, "list": [1]}', [1]),
+    ],
+)
+def test_edge_cases(payload, expected):
+    for max_chunk in (1, 2, 3, 64):
+        assert decode(payload, "list", max_chunk) == expected
+
+
+@pytest.mark.parametrize("payload", [b"{}", b'{"other": []}'])
+def test_missing_array(payload):
+    with pytest.raises(KeyError):
+        decode(payload, "list", 1)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b'{"list": [1, 2', b'{"list": [1, 2,', b'{"list": [1 2]}', b'{"list": {}}', b"[1]"],
+)
+def test_malformed_payloads(payload):
+    with pytest.raises(ValueError):
+        decode(payload, "list", 2)
+
+
+def test_active_backend():
+    payload = json.dumps({"list": [{"github": "a", "totalPulls": 1.5}, {"github": "é"}]}).encode()
+
+    async def collect():
+        reader = ChunkedReader(payload, 3, 0)
+        return [item async for item in fastjson.iter_array(reader, "list")]
+
+    assert asyncio.run(collect()) == json.loads(payload)["list"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ijson_backend_matches_json_loads(monkeypatch, seed):
+    ijson = pytest.importorskip("ijson")
+    monkeypatch.setattr(fastjson, "ijson", ijson)
+    monkeypatch.setattr(fastjson, "STREAM_BACKEND", "ijson")
+    rng = random.Random(seed)
+    items = [random_item(rng) for _ in range(rng.randrange(30))]
+    payload = json.dumps({"before": random_item(rng), "list": items, "after": [1]}).encode()
+
+    async def collect():
+        reader = ChunkedReader(payload, 5, seed)
+        return [item async for item in fastjson.iter_array(reader, "list")]
+
+    assert asyncio.run(collect()) == json.loads(payload)["list"]
@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+import pytest
+
+from hacksquad_bot.utils.governor import (
+    CircuitOpenError,
+    CircuitState,
+    Governor,
+    GovernorSettings,
+    HostGovernor,
+    TokenBucket,
+)
+
+SETTINGS = GovernorSettings(
+    rate=1000,
+    burst=1000,
+    max_retries=0,
+    backoff_base=0,
+    backoff_max=0,
+    failure_threshold=3,
+    open_time=60,
+)
+
+
+class Unhealthy(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+def classify(error: Exception):
+    return 0 if isinstance(error, Unhealthy) else None
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise Unhealthy()
+
+
+async def reject():
+    raise BadRequest()
+
+
+def make_governor(**settings) -> HostGovernor:
+    return HostGovernor("upstream", SETTINGS._replace(**settings), classify)
+
+
+def call(governor: HostGovernor, request):
+    return asyncio.run(governor.call(request))
+
+
+def open_circuit(governor: HostGovernor) -> None:
+    for _ in range(governor.settings.failure_threshold):
+        with pytest.raises(Unhealthy):
+            call(governor, fail)
+
+
+def test_circuit_opens_after_consecutive_failures():
+    governor = make_governor()
+    for _ in range(2):
+        with pytest.raises(Unhealthy):
+            call(governor, fail)
+    assert governor.state is CircuitState.CLOSED
+    with pytest.raises(Unhealthy):
+        call(governor, fail)
+    assert governor.state is CircuitState.OPEN
+    assert not governor.available()
+
+    with pytest.raises(CircuitOpenError) as error:
+        call(governor, succeed)
+    assert error.value.retry_in > 0
+    assert governor.stats()["rejected"] == 1
+
+
+def test_successes_reset_the_failures():
+    governor = make_governor()
+    for _ in range(5):
+        with pytest.raises(Unhealthy):
+            call(governor, fail)
+        assert call(governor, succeed) == "ok"
+    assert governor.state is CircuitState.CLOSED
+
+
+def test_request_errors_do_not_count_as_failures():
+    governor = make_governor()
+    for _ in range(5):
+        with pytest.raises(BadRequest):
+            call(governor, reject)
+    assert governor.state is CircuitState.CLOSED
+    assert governor.failures == 0
+
+
+def test_successful_trial_closes_the_circuit():
+    governor = make_governor()
+    open_circuit(governor)
+    governor._opened_at -= governor.settings.open_time
+    assert governor.available()
+    assert call(governor, succeed) == "ok"
+    assert governor.state is CircuitState.CLOSED
+
+
+def test_failed_trial_opens_the_circuit_again():
+    governor = make_governor()
+    open_circuit(governor)
+    governor._opened_at -= governor.settings.open_time
+    with pytest.raises(Unhealthy):
+        call(governor, fail)
+    assert governor.state is CircuitState.OPEN
+    assert not governor.available()
+
+
+def test_a_single_trial_runs_at_once():
+    governor = make_governor()
+    open_circuit(governor)
+    governor._opened_at -= governor.settings.open_time
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "ok"
+
+        trial = asyncio.create_task(governor.call(slow))
+        await asyncio.sleep(0)
+        assert governor.state is CircuitState.HALF_OPEN and not governor.available()
+        with pytest.raises(CircuitOpenError):
+            await governor.call(succeed)
+        release.set()
+        return await trial
+
+    assert asyncio.run(scenario()) == "ok"
+    assert governor.state is CircuitState.CLOSED
+
+
+def test_failures_are_retried():
+    governor = make_governor(max_retries=2)
+    attempts = []
+
+    async def flaky():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise Unhealthy()
+        return "ok"
+
+    assert call(governor, flaky) == "ok"
+    assert governor.retries == 2
+    assert governor.state is CircuitState.CLOSED
+
+
+def test_token_bucket_limits_bursts():
+    async def scenario():
+        bucket = TokenBucket(rate=100, burst=5)
+        started_at = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    # The 5 acquisitions past the burst wait for 5 tokens at 100 per second
+    assert asyncio.run(scenario()) >= 0.04
+
+
+def test_governor_keeps_one_host_governor_per_host():
+    governor = Governor(classify, SETTINGS)
+    assert governor.for_url("http://a.test/x") is governor.for_host("a.test")
+    assert governor.for_host("a.test") is not governor.for_host("b.test")
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from hacksquad_bot.cogs.hacksquad.live import LiveLeaderboardScheduler
+from hacksquad_bot.cogs.hacksquad.models import PartialTeam
+from hacksquad_bot.cogs.hacksquad.ranking import TEAMS_PER_PAGE, LeaderboardRanking
+
+
+def make_teams(scores):
+    return [
+        PartialTeam(place=None, id=slug, name=slug, score=score, slug=slug)
+        for slug, score in scores.items()
+    ]
+
+
+def test_ranking_is_a_versioned_snapshot():
+    teams = make_teams({f"team-{i}": i for i in range(25)})
+    ranking = LeaderboardRanking(teams)
+    assert [team.slug for team in teams][:2] == ["team-0", "team-1"]
+    assert ranking.places["team-24"] == 1
+    assert ranking.places["team-0"] == 25
+    assert len(ranking.pages) == 3
+    assert ranking.page(99)[0] == 3
+    assert ranking.page(1)[1].count("\n") == TEAMS_PER_PAGE - 1
+    assert LeaderboardRanking(teams).version > ranking.version
+    assert LeaderboardRanking([]).page(1) == (1, "No team has joined the leaderboard yet.")
+
+
+def test_live_leaderboards_only_look_at_a_ranking_once(tmp_path):
+    edited = []
+
+    async def edit(*, embed):
+        edited.append(embed.description)
+
+    message = SimpleNamespace(edit=edit)
+    channel = SimpleNamespace(get_partial_message=lambda _: message)
+    bot = SimpleNamespace(get_partial_messageable=lambda _: channel)
+    rendered = []
+
+    def render(ranking, page):
+        rendered.append(ranking.version)
+        return discord.Embed(description=ranking.page(page)[1])
+
+    async def main():
+        scheduler = LiveLeaderboardScheduler(
+            bot, render, edit_interval=0, path=str(tmp_path / "live.json")  # type: ignore
+        )
+        await scheduler.register(1, 10, 1, "")
+        first = LeaderboardRanking(make_teams({"a": 2, "b": 1}))
+        scheduler.notify(first)
+        await scheduler._flush()
+        await scheduler._flush()
+        assert (scheduler.edits, scheduler.skipped) == (1, 0)
+
+        # A new version with the same page is compared once, and not edited
+        scheduler.notify(LeaderboardRanking(make_teams({"a": 2, "b": 1})))
+        await scheduler._flush()
+        await scheduler._flush()
+        assert (scheduler.edits, scheduler.skipped) == (1, 1)
+
+        scheduler.notify(LeaderboardRanking(make_teams({"a": 2, "b": 3})))
+        await scheduler._flush()
+        assert scheduler.edits == 2
+
+    asyncio.run(main())
+    assert rendered == [rendered[0], rendered[0] + 2]
+    assert edited[-1].startswith("`1` : [`b`]")
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.mock_api import MockAPI, MockSettings
+from hacksquad_bot.cogs.hacksquad import utils
+from hacksquad_bot.cogs.hacksquad.utils import HACKSQUAD_HOST, Requester
+from hacksquad_bot.utils import fastjson
+from hacksquad_bot.utils.cache import CacheState
+from hacksquad_bot.utils.governor import CircuitState
+
+
+def test_expired_entries_are_served_while_the_host_is_down():
+    requester = Requester()
+    namespace = requester._cache["leaderboard"]
+    namespace.set("", ["old"], cached_at=datetime.now() - timedelta(days=30))
+    governor = requester._governor.for_host(HACKSQUAD_HOST)
+    governor.state = CircuitState.OPEN
+    governor._opened_at = time.monotonic()
+    try:
+        assert asyncio.run(requester.fetch_leaderboard()) == ["old"]
+        assert asyncio.run(requester.refresh_hot_entries(timedelta(0))) == 0
+        assert requester.peek("leaderboard") == ["old"]
+    finally:
+        governor.state = CircuitState.CLOSED
+        requester.invalidate()
+
+
+@pytest.mark.parametrize("validators", [True, False])
+@pytest.mark.parametrize("streaming", [True, False])
+def test_unchanged_entries_are_only_revalidated(monkeypatch, validators, streaming):
+    monkeypatch.setattr(fastjson, "STREAMING", streaming)
+    requester = Requester()
+    refreshes = []
+
+    async def listener(key, data):
+        refreshes.append(data)
+
+    async def scenario():
+        api = MockAPI(MockSettings(teams=500, contributors=10, latency=0, validators=validators))
+        hacksquad, _ = await api.start()
+        monkeypatch.setattr(utils, "HACKSQUAD_URL", hacksquad)
+        requester.add_refresh_listener("leaderboard", listener)
+        try:
+            leaderboard = await requester.fetch_leaderboard()
+            requester.expire("leaderboard")
+            assert await requester.refresh("leaderboard") is leaderboard
+            assert requester._cache["leaderboard"].get("")[0] is CacheState.FRESH
+            assert api.not_modified == (1 if validators else 0)
+            assert len(refreshes) == 1
+
+            api.leaderboard = api.leaderboard.replace('"Team 1 ', '"Team One ')
+            changed = await requester.refresh("leaderboard")
+            assert changed is not leaderboard and len(changed) == len(leaderboard)
+            assert len(refreshes) == 2
+        finally:
+            requester.remove_refresh_listener("leaderboard", listener)
+            requester.invalidate()
+            await requester.close()
+            await api.stop()
+
+    asyncio.run(scenario())
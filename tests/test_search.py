@@ -0,0 +1,82 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from hacksquad_bot.cogs.hacksquad import search
+from hacksquad_bot.cogs.hacksquad.search import AutocompleteIndex, DerivedIndex, FuzzySearchEngine
+
+TEAMS = [(f"Team {i} {('Rocket', 'Squad', 'Crew')[i % 3]}", f"team-{i}") for i in range(300)]
+
+
+def test_autocomplete_ranks_prefix_matches_first():
+    index = AutocompleteIndex([("Rocket Team", "a"), ("The Rockets", "b"), ("Squad", "c")])
+    assert index.search("rock") == [("Rocket Team", "a"), ("The Rockets", "b")]
+    assert index.search("SQ") == [("Squad", "c")]
+    assert index.search("xyz") == []
+    assert index.search("", limit=2) == [("Rocket Team", "a"), ("The Rockets", "b")]
+
+
+def test_fuzzy_search_finds_names_and_slugs():
+    engine = FuzzySearchEngine(TEAMS)
+    assert engine.search("Team 42 Rocket", limit=1)[0][:2] == ("Team 42 Rocket", "team-42")
+    assert engine.search("team-7", limit=1)[0][1] == "team-7"
+    assert engine.search("   ") == []
+
+
+def test_fuzzy_search_from_several_threads(monkeypatch):
+    # A tiny memory makes the threads evict each other's results all the time
+    monkeypatch.setattr(search, "RECENT_SEARCHES", 4)
+    engine = FuzzySearchEngine(TEAMS)
+    queries = [f"team {i % 20}" for i in range(800)]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda query: engine.search(query, 10), queries))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert all(results)
+    assert len(engine._recent) <= 4
+
+
+def test_derived_index_is_never_built_on_the_event_loop():
+    builds = []
+    gates = {source: threading.Event() for source in ("old", "new", "newer")}
+    gates["newer"].set()
+
+    def build(source):
+        gates[source].wait(5)
+        builds.append((source, threading.current_thread() is threading.main_thread()))
+        return source.upper()
+
+    async def main():
+        index = DerivedIndex(build)
+        # The first index is waited for, and built once for concurrent readers
+        first = asyncio.gather(index.get("old"), index.get("old"))
+        await asyncio.sleep(0.01)
+        gates["old"].set()
+        assert await first == ["OLD", "OLD"]
+        assert len(builds) == 1
+
+        # While a refresh rebuilds it, readers of either payload get the current index
+        gates["old"].clear()
+        update = asyncio.ensure_future(index.update("new"))
+        await asyncio.sleep(0.01)
+        assert await index.get("new") == "OLD"
+        assert await index.get("old") == "OLD"
+        gates["new"].set()
+        assert await update == "NEW"
+        assert await index.get("old") == "NEW"
+
+        # A build finishing late does not replace a newer index
+        late = asyncio.ensure_future(index.update("old"))
+        await asyncio.sleep(0.01)
+        assert await index.update("new") == "NEW"
+        assert await index.update("newer") == "NEWER"
+        gates["old"].set()
+        assert await late == "NEWER"
+        assert await index.get("old") == "NEWER"
+
+    asyncio.run(main())
+    assert not any(on_main_thread for _, on_main_thread in builds)
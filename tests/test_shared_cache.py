@@ -0,0 +1,164 @@
+import asyncio
+import pickle
+import time
+
+import pytest
+
+from benchmarks.resp_server import RESPServer
+from hacksquad_bot.utils.shared_cache import (
+    MemoryBackend,
+    RedisBackend,
+    RedisError,
+    SharedEntry,
+    SignatureError,
+    SQLiteBackend,
+    _loads,
+    _sign,
+)
+
+SECRET = "secret"
+
+
+async def with_backend(name, tmp_path, scenario):
+    if name == "memory":
+        backend = MemoryBackend()
+    elif name == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "shared.sqlite3"), SECRET)
+    else:
+        server = RESPServer()
+        port = await server.start()
+        backend = RedisBackend(f"redis://127.0.0.1:{port}/1", secret=SECRET)
+    try:
+        return await scenario(backend)
+    finally:
+        await backend.close()
+        if name == "redis":
+            await server.stop()
+
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_entries_expire(name, tmp_path):
+    async def scenario(backend):
+        entry = SharedEntry(time.time(), 60, {"teams": [1, 2]}, "validators")
+        await backend.set("leaderboard", "", entry, 0.05)
+        assert await backend.get("leaderboard", "") == entry
+        assert await backend.get("leaderboard", "other") is None
+        await asyncio.sleep(0.1)
+        assert await backend.get("leaderboard", "") is None
+
+    asyncio.run(with_backend(name, tmp_path, scenario))
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_locks_have_a_single_owner(name, tmp_path):
+    async def scenario(backend):
+        assert await backend.acquire("team:a", "first", 60)
+        assert not await backend.acquire("team:a", "second", 60)
+        assert await backend.acquire("team:b", "second", 60)
+
+        # Only the owner releases the lock
+        await backend.release("team:a", "second")
+        assert not await backend.acquire("team:a", "second", 60)
+        await backend.release("team:a", "first")
+        assert await backend.acquire("team:a", "second", 60)
+
+    asyncio.run(with_backend(name, tmp_path, scenario))
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_locks_expire(name, tmp_path):
+    async def scenario(backend):
+        assert await backend.acquire("team:a", "first", 0.05)
+        await asyncio.sleep(0.1)
+        assert await backend.acquire("team:a", "second", 60)
+
+    asyncio.run(with_backend(name, tmp_path, scenario))
+
+
+def test_entries_without_validators_are_still_read():
+    # Entries shared before the validators were added
+    body = pickle.dumps((1.0, 2.0, "data"))
+    entry = _loads(_sign(SECRET.encode(), body) + body, SECRET.encode())
+    assert entry == SharedEntry(1.0, 2.0, "data", None)
+
+
+class Payload:
+    unpickled = False
+
+    def __reduce__(self):
+        return setattr, (Payload, "unpickled", True)
+
+
+@pytest.mark.parametrize("name", ("sqlite", "redis"))
+def test_entries_not_signed_with_our_secret_are_not_unpickled(name, tmp_path):
+    async def scenario(backend):
+        await backend.set("leaderboard", "", SharedEntry(time.time(), 60, Payload()), 60)
+        backend._secret = b"another secret"
+        with pytest.raises(SignatureError):
+            await backend.get("leaderboard", "")
+
+    asyncio.run(with_backend(name, tmp_path, scenario))
+    assert not Payload.unpickled
+    body = pickle.dumps((1.0, 2.0, Payload()))
+    with pytest.raises(SignatureError):
+        _loads(bytes(32) + body, SECRET.encode())
+    with pytest.raises(SignatureError):
+        _loads(body, SECRET.encode())
+    assert not Payload.unpickled
+
+
+@pytest.mark.parametrize("backend", (SQLiteBackend, RedisBackend))
+def test_backends_storing_pickles_need_a_secret(backend):
+    with pytest.raises(ValueError):
+        backend(secret="")
+
+
+def test_redis_cancelled_command_does_not_shift_replies(tmp_path):
+    async def scenario(backend):
+        entry = SharedEntry(time.time(), 60, "data")
+        await backend.set("leaderboard", "", entry, 60)
+
+        # Cancelled once its command is written, before its reply is read
+        acquire = asyncio.create_task(backend.acquire("leaderboard", "token", 60))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        acquire.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await acquire
+
+        assert await backend.get("leaderboard", "") == entry
+
+    asyncio.run(with_backend("redis", tmp_path, scenario))
+
+
+def test_redis_reconnects_after_the_connection_dropped(tmp_path):
+    async def scenario(backend):
+        assert await backend.acquire("a", "token", 60)
+        backend._writer.transport.abort()
+        await asyncio.sleep(0)
+        assert not await backend.acquire("a", "token", 60)
+
+    asyncio.run(with_backend("redis", tmp_path, scenario))
+
+
+def test_redis_times_out_on_a_silent_server():
+    async def scenario():
+        async def silent(reader, writer):
+            await reader.read()
+            writer.close()
+
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        backend = RedisBackend(f"redis://127.0.0.1:{port}/0", timeout=0.1, secret=SECRET)
+        try:
+            with pytest.raises(RedisError):
+                await backend.get("leaderboard", "")
+        finally:
+            await backend.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
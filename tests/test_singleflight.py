@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from hacksquad_bot.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("team:a", load) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [1] * 5
+    assert flight.stats() == {"team": {"executions": 1, "coalesced": 4}}
+    assert not flight.in_flight("team:a")
+
+
+def test_different_keys_are_not_coalesced():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return object()
+
+        return await asyncio.gather(flight.do("team:a", load), flight.do("team:b", load))
+
+    first, second = asyncio.run(scenario())
+    assert first is not second
+
+
+def test_sequential_calls_run_again():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(None)
+            return len(calls)
+
+        return [await flight.do("leaderboard", load) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream")
+
+        return await asyncio.gather(
+            flight.do("leaderboard", load), flight.do("leaderboard", load), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert len(results) == 2
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def load():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(flight.do("leaderboard", load))
+        second = asyncio.create_task(flight.do("leaderboard", load))
+        await started.wait()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
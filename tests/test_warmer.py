@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+from hacksquad_bot.cogs.hacksquad.models import PartialTeam
+from hacksquad_bot.cogs.hacksquad.ranking import LeaderboardRanking
+from hacksquad_bot.cogs.hacksquad.utils import Requester
+from hacksquad_bot.cogs.hacksquad.warmer import TeamWarmer
+from hacksquad_bot.utils.cache import CacheState
+
+
+def make_ranking(scores):
+    return LeaderboardRanking(
+        [
+            PartialTeam(place=None, id=slug, name=slug, score=score, slug=slug)
+            for slug, score in scores.items()
+        ]
+    )
+
+
+def test_changed_teams_are_served_stale_until_refetched(monkeypatch):
+    requester = Requester()
+    refreshed = []
+
+    async def refresh(namespace, key=""):
+        refreshed.append(key)
+
+    monkeypatch.setattr(requester, "refresh", refresh)
+    namespace = requester._cache["team"]
+    for slug, score in (("a", 3), ("b", 2), ("c", 1)):
+        namespace.set(slug, SimpleNamespace(score=score))
+
+    async def scenario():
+        warmer = TeamWarmer(top=1, max_changed=0)
+        warmer.notify(make_ranking({"a": 3, "b": 2, "c": 1}))
+        await warmer._task
+        # The best team changed, and another one beyond the refetch cap
+        warmer.notify(make_ranking({"a": 4, "b": 1, "c": 1}))
+        await warmer._task
+
+    try:
+        asyncio.run(scenario())
+        assert refreshed == ["a"]
+        # Not refetched, but still served until it is
+        assert namespace.get("b") == (CacheState.STALE, namespace.peek("b"))
+        assert namespace.get("c")[0] is CacheState.FRESH
+    finally:
+        requester.invalidate()